@@ -0,0 +1,62 @@
+"""
+Compare single-pass detection against coarse-to-fine detection on a folder of photos.
+
+Usage: python -m benchmarks.coarse_to_fine <folder> [--max-edge 1600] [--refine]
+
+Faces found by the full-resolution path are used as the reference; a coarse
+face counts as recalled when it overlaps a reference box with IoU >= 0.5.
+"""
+import argparse
+import os
+import time
+from typing import List, Tuple
+from src.core.face_detector import FaceDetector, FaceLocation
+
+def box_iou(a: FaceLocation, b: FaceLocation) -> float:
+    inter_h = min(a.bottom, b.bottom) - max(a.top, b.top)
+    inter_w = min(a.right, b.right) - max(a.left, b.left)
+    if inter_h <= 0 or inter_w <= 0:
+        return 0.0
+    inter = inter_h * inter_w
+    area_a = (a.bottom - a.top) * (a.right - a.left)
+    area_b = (b.bottom - b.top) * (b.right - b.left)
+    return inter / float(area_a + area_b - inter)
+
+def run_detector(detector: FaceDetector, paths: List[str]) -> Tuple[float, List[List[FaceLocation]]]:
+    start = time.perf_counter()
+    results = [detector.detect_faces(p) for p in paths]
+    return time.perf_counter() - start, results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('folder')
+    parser.add_argument('--max-edge', type=int, default=1600)
+    parser.add_argument('--refine', action='store_true')
+    parser.add_argument('--iou', type=float, default=0.5)
+    args = parser.parse_args()
+
+    paths = [os.path.join(args.folder, f) for f in sorted(os.listdir(args.folder))
+             if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
+    if not paths:
+        parser.error(f"No images found in {args.folder}")
+
+    full_time, full_faces = run_detector(FaceDetector(), paths)
+    coarse = FaceDetector(detect_max_edge=args.max_edge, refine_small_faces=args.refine)
+    coarse_time, coarse_faces = run_detector(coarse, paths)
+
+    reference = sum(len(faces) for faces in full_faces)
+    recalled = 0
+    for ref, found in zip(full_faces, coarse_faces):
+        for face in ref:
+            if any(box_iou(face, other) >= args.iou for other in found):
+                recalled += 1
+
+    print(f"images:            {len(paths)}")
+    print(f"full-res:          {full_time:.2f}s ({len(paths) / full_time:.2f} img/s), {reference} faces")
+    print(f"coarse-to-fine:    {coarse_time:.2f}s ({len(paths) / coarse_time:.2f} img/s), "
+          f"{sum(len(f) for f in coarse_faces)} faces")
+    print(f"speedup:           {full_time / coarse_time:.2f}x")
+    print(f"recall vs full:    {recalled / reference if reference else 1.0:.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Generate a reproducible synthetic photo corpus for the benchmarks.
+
+Usage: python -m benchmarks.corpus <out_dir> [--count 200] [--size 3000x2000] [--faces DIR] [--seed 0]
+
+Each photo is a textured background with one or more face crops pasted at
+random positions and scales. Crops come from --faces (one image per
+identity, e.g. a handful of aligned face photos you are allowed to use);
+without it a fixed set of drawn faces is used. The HOG detector finds few
+or none of those, so timing runs should pass real crops (benchmarks.suite
+refuses a corpus without detected faces).
+The same arguments always produce byte-identical files.
+"""
+import argparse
+import json
+import os
+from dataclasses import dataclass, asdict
+from typing import List, Optional, Tuple
+import cv2
+import numpy as np
+from PIL import Image
+
+@dataclass
+class CorpusPhoto:
+    path: str
+    boxes: List[Tuple[int, int, int, int]]  # (top, right, bottom, left) of each pasted face
+    identities: List[int]  # which crop each face was made from
+
+def drawn_faces(count: int = 8, size: int = 256, seed: int = 1234) -> List[np.ndarray]:
+    """
+    Draw simple frontal faces, each with its own skin tone and proportions.
+    """
+    rng = np.random.default_rng(seed)
+    faces = []
+    for _ in range(count):
+        img = np.full((size, size, 3), 255, dtype=np.uint8)
+        tone = rng.uniform()
+        skin = tuple(int(c) for c in np.array([240, 205, 180]) * (1 - tone) + np.array([110, 70, 50]) * tone)
+        hair = tuple(int(c) for c in rng.integers(0, 90, 3))
+        cx, cy = size // 2, size // 2 + 10
+        ax, ay = int(size * rng.uniform(0.28, 0.34)), int(size * rng.uniform(0.36, 0.42))
+        cv2.ellipse(img, (cx, cy - ay // 2), (ax + 8, ay // 2 + 10), 0, 180, 360, hair, -1)
+        cv2.ellipse(img, (cx, cy), (ax, ay), 0, 0, 360, skin, -1)
+        eye_dx, eye_y = int(ax * rng.uniform(0.35, 0.5)), cy - int(ay * 0.2)
+        for side in (-1, 1):
+            cv2.ellipse(img, (cx + side * eye_dx, eye_y), (14, 8), 0, 0, 360, (255, 255, 255), -1)
+            cv2.circle(img, (cx + side * eye_dx, eye_y), 5, (40, 30, 20), -1)
+            cv2.line(img, (cx + side * eye_dx - 16, eye_y - 16), (cx + side * eye_dx + 16, eye_y - 18), hair, 4)
+        cv2.line(img, (cx, eye_y + 10), (cx - 6, cy + int(ay * 0.2)), (120, 80, 70), 2)
+        mouth_w = int(ax * rng.uniform(0.3, 0.45))
+        cv2.ellipse(img, (cx, cy + int(ay * 0.45)), (mouth_w, 10), 0, 0, 180, (150, 50, 60), 3)
+        faces.append(img)
+    return faces
+
+def load_faces(face_dir: str) -> List[np.ndarray]:
+    names = sorted(f for f in os.listdir(face_dir) if f.lower().endswith(('.png', '.jpg', '.jpeg')))
+    faces = []
+    for name in names:
+        with Image.open(os.path.join(face_dir, name)) as img:
+            faces.append(np.asarray(img.convert('RGB')))
+    return faces
+
+def _background(rng: np.random.Generator, width: int, height: int) -> np.ndarray:
+    # Two-colour gradient, a few blocks of "scenery" and sensor-like noise
+    top, bottom = rng.integers(0, 256, (2, 3))
+    ramp = np.linspace(0.0, 1.0, height)[:, None, None]
+    img = (top * (1 - ramp) + bottom * ramp) * np.ones((1, width, 1))
+    for _ in range(int(rng.integers(3, 9))):
+        x0, y0 = int(rng.integers(0, width)), int(rng.integers(0, height))
+        x1, y1 = x0 + int(rng.integers(width // 10, width // 2)), y0 + int(rng.integers(height // 10, height // 2))
+        img[y0:y1, x0:x1] = img[y0:y1, x0:x1] * 0.5 + rng.integers(0, 256, 3) * 0.5
+    img += rng.normal(0, 6, (height, width, 1))
+    return np.clip(img, 0, 255).astype(np.uint8)
+
+def generate_corpus(out_dir: str, count: int = 200, width: int = 3000, height: int = 2000,
+                    max_faces: int = 3, face_dir: Optional[str] = None, seed: int = 0,
+                    quality: int = 90) -> List[CorpusPhoto]:
+    """
+    Write count JPEGs to out_dir and return what was pasted where.
+    A corpus.json written alongside lets later runs reuse the files.
+    """
+    faces = load_faces(face_dir) if face_dir else drawn_faces()
+    if not faces:
+        raise ValueError(f"No face crops found in {face_dir}")
+    rng = np.random.default_rng(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    photos = []
+    for n in range(count):
+        img = _background(rng, width, height)
+        boxes, identities = [], []
+        for _ in range(int(rng.integers(1, max_faces + 1))):
+            identity = int(rng.integers(len(faces)))
+            crop = faces[identity]
+            side = int(rng.uniform(0.08, 0.3) * min(width, height))
+            scale = side / max(crop.shape[:2])
+            h, w = max(1, int(crop.shape[0] * scale)), max(1, int(crop.shape[1] * scale))
+            top, left = int(rng.integers(0, height - h)), int(rng.integers(0, width - w))
+            if any(top < b and top + h > t and left < r and left + w > l for t, r, b, l in boxes):
+                continue  # keep faces apart so every box is a clean ground truth
+            face = cv2.resize(crop, (w, h), interpolation=cv2.INTER_AREA).astype(np.float64)
+            face = np.clip(face * rng.uniform(0.8, 1.2), 0, 255)  # exposure jitter
+            img[top:top + h, left:left + w] = face.astype(np.uint8)
+            boxes.append((top, left + w, top + h, left))
+            identities.append(identity)
+        path = os.path.join(out_dir, f"photo_{n:05d}.jpg")
+        Image.fromarray(img).save(path, 'JPEG', quality=quality)
+        photos.append(CorpusPhoto(path=path, boxes=boxes, identities=identities))
+    with open(os.path.join(out_dir, 'corpus.json'), 'w', encoding='utf-8') as f:
+        json.dump({'count': count, 'width': width, 'height': height, 'max_faces': max_faces,
+                   'face_dir': face_dir, 'seed': seed, 'photos': [asdict(p) for p in photos]}, f)
+    return photos
+
+def load_or_generate(out_dir: str, **params) -> List[CorpusPhoto]:
+    """
+    Reuse the corpus in out_dir if it was generated with the same parameters.
+    """
+    manifest_path = os.path.join(out_dir, 'corpus.json')
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if all(manifest.get(key) == value for key, value in params.items()):
+            return [CorpusPhoto(p['path'], [tuple(b) for b in p['boxes']], p['identities'])
+                    for p in manifest['photos']]
+    return generate_corpus(out_dir, **params)
+
+def parse_size(text: str) -> Tuple[int, int]:
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('out_dir')
+    parser.add_argument('--count', type=int, default=200)
+    parser.add_argument('--size', type=parse_size, default=(3000, 2000), help="WIDTHxHEIGHT")
+    parser.add_argument('--max-faces', type=int, default=3)
+    parser.add_argument('--faces', default=None, help="folder of face crops, one per identity")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    photos = generate_corpus(args.out_dir, args.count, *args.size, max_faces=args.max_faces,
+                             face_dir=args.faces, seed=args.seed)
+    print(f"Wrote {len(photos)} photos with {sum(len(p.boxes) for p in photos)} faces to {args.out_dir}")
+
+if __name__ == '__main__':
+    main()
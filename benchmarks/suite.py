@@ -0,0 +1,249 @@
+"""
+Time every pipeline stage on a synthetic corpus and compare against a baseline.
+
+Usage: python -m benchmarks.suite [--count 100] [--size 3000x2000] [--out results.json]
+                                  [--baseline old.json] [--threshold 0.15]
+
+Stages: decode, quality, locate, encode (per photo), scan (end-to-end
+scan_folder), cluster (the final clustering pass alone), insert
+(process_single_photo), delete (remove_photo), search and thumbnail (cold
+and warm cache). The per-photo stages follow the pipeline's reduced-resolution
+decode; each also runs on a full-resolution decode as <stage>_full, and the
+ratio is reported under "speedups". Results are JSON with per-stage count,
+total, mean, p50, p95 and rate; with --baseline the run exits non-zero when
+any stage's mean is more than threshold slower than in the baseline file.
+
+Every stage after decode needs faces to work on, so a corpus in which the
+detector finds none is an error; pass --faces with real face crops if the
+drawn ones are not detected.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import asdict
+from typing import Dict, List, Optional
+import numpy as np
+from src.core.clustering import CLUSTER_BACKENDS, cluster_faces
+from src.core.face_detector import DEFAULT_PROFILE, DETECTION_PROFILES, FaceDetector
+from src.core.face_recognizer import FaceRecognizer
+from src.core.face_store import FaceStore
+from src.core.quality import QualityFilter, score_image
+from src.core.thumbnail_cache import ThumbnailCache
+from .corpus import load_or_generate, parse_size
+
+PER_PHOTO_STAGES = ('decode', 'quality', 'locate', 'encode')
+
+class StageTimer:
+    """
+    Collects wall-clock samples per named stage.
+    """
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+
+    @contextmanager
+    def time(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples.setdefault(stage, []).append(time.perf_counter() - start)
+
+    def summary(self) -> Dict[str, dict]:
+        result = {}
+        for stage, samples in self.samples.items():
+            values = np.asarray(samples)
+            result[stage] = {
+                'count': len(values),
+                'total_s': float(values.sum()),
+                'mean_ms': float(values.mean() * 1000),
+                'p50_ms': float(np.percentile(values, 50) * 1000),
+                'p95_ms': float(np.percentile(values, 95) * 1000),
+                'per_s': float(len(values) / values.sum()) if values.sum() > 0 else None,
+            }
+        return result
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(args) -> dict:
+    corpus_dir = args.corpus or os.path.join(tempfile.gettempdir(), 'kwikpic_bench_corpus')
+    width, height = args.size
+    photos = load_or_generate(corpus_dir, count=args.count, width=width, height=height,
+                              max_faces=args.max_faces, face_dir=args.faces, seed=args.seed)
+    paths = [p.path for p in photos]
+    # Hold some photos back to time incremental inserts into an existing library
+    held_out = paths[-args.inserts:] if args.inserts else []
+    library = paths[:len(paths) - len(held_out)]
+    timer = StageTimer()
+    detector = FaceDetector(detect_max_edge=args.max_edge, refine_small_faces=args.max_edge is not None,
+                            profile=args.profile)
+
+    # Per-photo stages, single process so the samples are per call. The pipeline's
+    # reduced decode is timed against decoding everything at full resolution.
+    encodings = []
+    for path in library:
+        with timer.time('decode'):
+            image, scale = detector.load_for_detection(path)
+        with timer.time('quality'):
+            score_image(image)
+        with timer.time('locate'):
+            locations = detector.locate_faces(image, scale)
+        with timer.time('encode'):
+            faces, _, _ = detector.encode_scaled(image, scale, locations, path)
+        encodings.extend(face.encoding for face in faces)
+        with timer.time('decode_full'):
+            image = detector.load_image(path)
+        with timer.time('quality_full'):
+            score_image(image)
+        with timer.time('locate_full'):
+            locations = detector.locate_faces(image)
+        with timer.time('encode_full'):
+            detector.encode_faces(image, locations)
+    if not encodings:
+        # Timing empty stages would make any baseline comparison meaningless
+        raise SystemExit(f"No faces found in {len(library)} corpus photos with the {args.profile} profile; "
+                         f"pass --faces with a folder of real face crops")
+
+    with tempfile.TemporaryDirectory() as work:
+        scan_dir = os.path.join(work, 'library')
+        os.makedirs(scan_dir)
+        for path in library:
+            target = os.path.join(scan_dir, os.path.basename(path))
+            try:
+                os.link(path, target)
+            except OSError:
+                shutil.copy(path, target)
+        recognizer = FaceRecognizer(detector=detector, workers=args.workers, clustering=args.clustering,
+                                    incremental=args.incremental,
+                                    quality=QualityFilter() if args.skip_low_quality else None,
+                                    thumbnails=ThumbnailCache(os.path.join(work, 'thumbs'), size=64),
+                                    store=FaceStore(os.path.join(work, 'faces')))
+        with timer.time('scan'):
+            recognizer.scan_folder(scan_dir, publish_interval=float('inf'))
+
+        with timer.time('cluster'):
+            _, cluster_report = cluster_faces(np.stack(encodings), recognizer.similarity_threshold,
+                                              args.clustering, measure_memory=True)
+
+        for path in held_out:
+            with timer.time('insert'):
+                recognizer.process_single_photo(path)
+
+        queries = np.stack(encodings[:args.queries])
+        for query in queries:
+            with timer.time('search'):
+                recognizer.search(query[None, :])
+
+        face_ids = recognizer.store.face_ids()[:args.thumbnails]
+        # Thumbnails written during the scan are dropped from memory to time the disk path too
+        recognizer.thumbnails.clear_memory()
+        for face_id in face_ids:
+            with timer.time('thumbnail_cold'):
+                recognizer.face_thumbnail(face_id)
+        for face_id in face_ids:
+            with timer.time('thumbnail_warm'):
+                recognizer.face_thumbnail(face_id)
+
+        for path in held_out + library[:args.deletes]:
+            with timer.time('delete'):
+                recognizer.remove_photo(path, forget=False)
+
+    stages = timer.summary()
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'corpus': {'count': args.count, 'size': f"{width}x{height}", 'max_faces': args.max_faces,
+                       'faces': args.faces, 'seed': args.seed},
+            'faces_found': len(encodings),
+            'workers': args.workers,
+            'max_edge': args.max_edge,
+            'profile': args.profile,
+            'incremental': args.incremental,
+            'skip_low_quality': args.skip_low_quality,
+            'clustering': asdict(cluster_report),
+        },
+        'stages': stages,
+        'speedups': {stage: stages[f"{stage}_full"]['mean_ms'] / stages[stage]['mean_ms']
+                     for stage in PER_PHOTO_STAGES if stages.get(stage, {}).get('mean_ms')},
+    }
+
+def compare(current: dict, baseline: dict, threshold: float, min_delta_ms: float = 0.05) -> List[str]:
+    """
+    Return one line per stage that got slower than baseline by more than threshold.
+    Stages that moved by less than min_delta_ms are timer noise and never count.
+    """
+    regressions = []
+    print(f"{'stage':<16}{'baseline ms':>14}{'current ms':>14}{'change':>10}", file=sys.stderr)
+    for stage, stats in current['stages'].items():
+        base = baseline.get('stages', {}).get(stage)
+        if base is None or not base['mean_ms']:
+            print(f"{stage:<16}{'-':>14}{stats['mean_ms']:>14.2f}{'new':>10}", file=sys.stderr)
+            continue
+        change = stats['mean_ms'] / base['mean_ms'] - 1.0
+        print(f"{stage:<16}{base['mean_ms']:>14.2f}{stats['mean_ms']:>14.2f}{change:>+10.1%}", file=sys.stderr)
+        if change > threshold and stats['mean_ms'] - base['mean_ms'] > min_delta_ms:
+            regressions.append(f"{stage}: {base['mean_ms']:.2f}ms -> {stats['mean_ms']:.2f}ms ({change:+.1%})")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=100)
+    parser.add_argument('--size', type=parse_size, default=(3000, 2000), help="WIDTHxHEIGHT")
+    parser.add_argument('--max-faces', type=int, default=3)
+    parser.add_argument('--faces', default=None, help="folder of face crops, one per identity")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--corpus', default=None, help="where to keep the generated corpus")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--max-edge', type=int, default=1600, help="0 to locate at full resolution")
+    parser.add_argument('--profile', choices=sorted(DETECTION_PROFILES), default=DEFAULT_PROFILE)
+    parser.add_argument('--clustering', choices=CLUSTER_BACKENDS, default='auto')
+    parser.add_argument('--incremental', action='store_true', help="time inserts and deletes in incremental mode")
+    parser.add_argument('--skip-low-quality', action='store_true', help="scan with the quality filter on")
+    parser.add_argument('--inserts', type=int, default=10)
+    parser.add_argument('--deletes', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--thumbnails', type=int, default=50)
+    parser.add_argument('--out', default=None, help="write results JSON here (default: stdout)")
+    parser.add_argument('--baseline', default=None, help="results JSON from an earlier commit")
+    parser.add_argument('--threshold', type=float, default=0.15, help="allowed slowdown, 0.15 = 15%%")
+    parser.add_argument('--min-delta-ms', type=float, default=0.05, help="ignore smaller absolute changes")
+    args = parser.parse_args()
+    if args.max_edge == 0:
+        args.max_edge = None
+
+    results = run(args)
+    print(f"{'stage':<10}{'full ms':>10}{'reduced ms':>12}{'speedup':>9}", file=sys.stderr)
+    for stage, speedup in results['speedups'].items():
+        print(f"{stage:<10}{results['stages'][stage + '_full']['mean_ms']:>10.1f}"
+              f"{results['stages'][stage]['mean_ms']:>12.1f}{speedup:>8.1f}x", file=sys.stderr)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1)
+    else:
+        json.dump(results, sys.stdout, indent=1)
+        print()
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print("Regressions over threshold:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,11 @@
 import sys
 import os
-import psutil
+import multiprocessing
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtCore import Qt
 from src.ui.main_window import MainWindow
 from src.ui.tray_icon import TrayIcon
+from src.core.detection_engine import set_process_priority_low
 
 def add_to_startup():
     try:
@@ -22,19 +23,6 @@ def add_to_startup():
     except Exception as e:
         print(f"Failed to add to startup: {e}")
 
-def set_process_priority_low():
-    try:
-        # Get the current process
-        process = psutil.Process(os.getpid())
-        # Set to low priority (BELOW_NORMAL_PRIORITY_CLASS in Windows)
-        if sys.platform == 'win32':
-            process.nice(psutil.BELOW_NORMAL_PRIORITY_CLASS)
-        else:
-            # For Unix-like systems
-            process.nice(10)
-    except Exception as e:
-        print(f"Failed to set process priority: {e}")
-
 def main():
     add_to_startup()
     # Enable high DPI scaling
@@ -53,6 +41,7 @@ def main():
     # Create system tray icon
     tray_icon = TrayIcon(window)
     tray_icon.show()
+    window.tray_icon = tray_icon
     
     # Set process priority to low
     set_process_priority_low()
@@ -71,4 +60,6 @@ def main():
     sys.exit(app.exec_())
 
 if __name__ == '__main__':
+    # Needed for the detection worker processes in the frozen .exe
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,248 @@
+"""
+Headless command line front end for the face organizer.
+
+Usage:
+  python -m src.core scan FOLDER [FOLDER ...] [-o people.json|people.csv]
+  python -m src.core watch FOLDER [-o people.json|people.csv]
+  python -m src.core organize WATCH_FOLDER OUTPUT_FOLDER [--mode hardlink]
+
+Nothing here imports PyQt5, so it runs on machines without a display.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from typing import List, Optional
+from .face_detector import (DEFAULT_DETECT_MAX_EDGE, DEFAULT_PROFILE, DETECTION_PROFILES, FaceDetector,
+                            default_detector)
+from .face_index import FaceIndex
+from .face_store import FaceStore
+from .clustering import CLUSTER_BACKENDS
+from .quality import QualityFilter
+from .face_recognizer import FaceRecognizer
+from .folder_scanner import ScanRules
+from .metrics import metrics, MetricsWriter
+from .output_layout import OUTPUT_MODES
+
+def build_recognizer(args) -> FaceRecognizer:
+    detector = FaceDetector(detect_max_edge=args.max_edge, refine_small_faces=args.max_edge is not None,
+                            min_face_size=args.min_face_size, profile=args.profile)
+    quality = QualityFilter(min_blur=args.min_blur) if args.skip_low_quality else None
+    index = None if args.no_index else FaceIndex(args.index, signature=detector.signature,
+                                                 quality_signature=quality.signature if quality else "")
+    store = FaceStore(args.store) if args.store else None  # else one per library, opened by the scan
+    return FaceRecognizer(similarity_threshold=args.threshold, index=index,
+                          workers=args.workers, detector=detector, store=store,
+                          clustering=args.clustering, incremental=args.incremental, quality=quality)
+
+def people_records(recognizer: FaceRecognizer) -> List[dict]:
+    people = sorted(recognizer.get_all_people(), key=lambda p: len(p.photo_paths), reverse=True)
+    return [{
+        'id': person.id,
+        'name': person.name,
+        'faces': len(person.face_indices),
+        'photos': sorted(person.photo_paths),
+    } for person in people]
+
+def write_people(recognizer: FaceRecognizer, output_path: str):
+    """
+    Write one record per person (JSON) or one row per person and photo (CSV).
+    The file is replaced atomically, so a reader never sees half of it.
+    """
+    records = people_records(recognizer)
+    tmp_path = f"{output_path}.tmp"
+    if output_path.lower().endswith('.csv'):
+        with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['person_id', 'name', 'photo_path'])
+            for record in records:
+                for photo_path in record['photos']:
+                    writer.writerow([record['id'], record['name'], photo_path])
+    else:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'people': records}, f, indent=1)
+    os.replace(tmp_path, output_path)
+
+class Throughput:
+    """
+    Running photo and face counts, reported as rates since start.
+    """
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.photos = 0
+
+    def report(self, recognizer: FaceRecognizer) -> str:
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        faces = recognizer.face_count()
+        line = (f"{self.photos} photos, {faces} faces, {len(recognizer.people)} people in {elapsed:.1f}s "
+                f"({self.photos / elapsed:.2f} img/s, {faces / elapsed:.2f} faces/s)")
+        if recognizer.index is not None:
+            hits, misses = recognizer.index.counts()
+            line += f", index {hits} hits / {misses} misses"
+        return line
+
+def scan(args, recognizer: FaceRecognizer, throughput: Throughput):
+    rules = ScanRules(exclude=ScanRules().exclude + args.exclude, include=args.include,
+                      recursive=not args.no_recursive)
+    last_report = 0.0
+
+    def progress(done: int, found: int):
+        nonlocal last_report
+        throughput.photos = done
+        now = time.perf_counter()
+        if not args.quiet and now - last_report >= args.report_interval:
+            last_report = now
+            print(f"[{done}/{found}] {throughput.report(recognizer)}", file=sys.stderr)
+
+    recognizer.scan_folders(args.folders, progress_callback=progress, rules=rules,
+                            publish_interval=float('inf'))
+    print(throughput.report(recognizer), file=sys.stderr)
+    if recognizer.last_cluster_report is not None and not args.quiet:
+        print(f"Clustering {recognizer.last_cluster_report.describe()}", file=sys.stderr)
+    if args.output:
+        write_people(recognizer, args.output)
+
+def cmd_scan(args) -> int:
+    recognizer = build_recognizer(args)
+    scan(args, recognizer, Throughput())
+    if not args.output:
+        json.dump({'people': people_records(recognizer)}, sys.stdout, indent=1)
+        print()
+    return 0
+
+def cmd_watch(args) -> int:
+    from .folder_monitor import FolderMonitor
+    from .ingestion import IngestionService
+    recognizer = build_recognizer(args)
+    throughput = Throughput()
+    scan(args, recognizer, throughput)
+    ingestion = IngestionService(recognizer)
+    moves = []
+    deletions = []
+
+    def on_changes(changed, deleted, moved):
+        # Runs on the watcher thread; the main loop applies everything
+        moves.extend(moved)
+        deletions.extend(deleted)
+        for path in changed:
+            ingestion.submit(path)
+
+    monitors = [FolderMonitor(folder, ingestion.submit, lambda path: deletions.append(path),
+                              batch_callback=on_changes) for folder in args.folders]
+    ingestion.start()
+    for monitor in monitors:
+        monitor.start()
+    print(f"Watching {', '.join(args.folders)} (Ctrl+C to stop)", file=sys.stderr)
+    last_report = time.perf_counter()
+    try:
+        while True:
+            time.sleep(0.25)
+            changed = False
+            while moves:
+                old_path, new_path, is_directory = moves.pop(0)
+                if is_directory:
+                    recognizer.move_folder(old_path, new_path)
+                elif not recognizer.move_photo(old_path, new_path):
+                    ingestion.submit(new_path)
+                changed = True
+            while deletions:
+                changed |= recognizer.remove_photo(deletions.pop(0))
+            for result in ingestion.commit(max_items=200):
+                if result.error is not None:
+                    print(f"Error processing {result.path}: {result.error}", file=sys.stderr)
+                else:
+                    throughput.photos += 1
+                changed = True
+            if changed and args.output:
+                write_people(recognizer, args.output)
+            now = time.perf_counter()
+            if not args.quiet and now - last_report >= args.report_interval:
+                last_report = now
+                stats = ingestion.stats()
+                print(f"{throughput.report(recognizer)}, backlog "
+                      f"{stats.queued + stats.spilled + stats.in_flight + stats.ready}, lag {stats.lag:.1f}s",
+                      file=sys.stderr)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for monitor in monitors:
+            monitor.stop()
+        ingestion.stop()
+    return 0
+
+def cmd_organize(args) -> int:
+    from .photo_service import PhotoService
+    service = PhotoService(args.watch_folder, args.output_folder, similarity_threshold=args.threshold,
+                           workers=args.workers, output_mode=args.mode, detector=default_detector(args.profile))
+    print(f"Organizing {args.watch_folder} into {args.output_folder} ({args.mode}), Ctrl+C to stop",
+          file=sys.stderr)
+    service.start()
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m src.core', description=__doc__.strip().splitlines()[0])
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--workers', type=int, default=None, help="detection processes (default: CPUs - 1)")
+    common.add_argument('--threshold', type=float, default=0.5, help="face distance for the same person")
+    common.add_argument('--quiet', action='store_true', help="no progress lines on stderr")
+    common.add_argument('--report-interval', type=float, default=5.0, help="seconds between progress lines")
+    common.add_argument('--metrics', default=None,
+                        help="write stage timings to this file (.prom for Prometheus text, else JSON lines)")
+    common.add_argument('--metrics-interval', type=float, default=10.0, help="seconds between metrics writes")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    recognizer_opts = argparse.ArgumentParser(add_help=False, parents=[common])
+    recognizer_opts.add_argument('folders', nargs='+')
+    recognizer_opts.add_argument('-o', '--output', help="write people to this .json or .csv file")
+    recognizer_opts.add_argument('--index', default=None, help="detection cache database (default: in home)")
+    recognizer_opts.add_argument('--no-index', action='store_true', help="don't read or write the cache")
+    recognizer_opts.add_argument('--store', default=None, help="face encoding store folder (default: one per library in home)")
+    recognizer_opts.add_argument('--max-edge', type=int, default=DEFAULT_DETECT_MAX_EDGE,
+                                 help="locate faces on a copy this large (0 for full resolution)")
+    recognizer_opts.add_argument('--profile', choices=sorted(DETECTION_PROFILES), default=DEFAULT_PROFILE,
+                                 help="detection speed/accuracy: Haar+5-point, HOG+68-point, or CNN with jitter")
+    recognizer_opts.add_argument('--clustering', choices=CLUSTER_BACKENDS, default='auto',
+                                 help="final clustering pass: exact DBSCAN or a bounded-memory k-NN graph")
+    recognizer_opts.add_argument('--incremental', action='store_true',
+                                 help="watch: re-cluster only changed neighbourhoods, matching a full DBSCAN")
+    recognizer_opts.add_argument('--skip-low-quality', action='store_true',
+                                 help="don't detect faces in blurry, black, blown-out or blank photos")
+    recognizer_opts.add_argument('--min-blur', type=float, default=QualityFilter.min_blur,
+                                 help="with --skip-low-quality, the lowest blur score still detected")
+    recognizer_opts.add_argument('--min-face-size', type=int, default=0,
+                                 help="ignore faces smaller than this many pixels")
+    recognizer_opts.add_argument('--include', action='append', default=[], help="file name glob to keep")
+    recognizer_opts.add_argument('--exclude', action='append', default=[], help="file or folder glob to skip")
+    recognizer_opts.add_argument('--no-recursive', action='store_true', help="only the top-level folders")
+
+    sub.add_parser('scan', parents=[recognizer_opts], help="cluster the photos in folders once")
+    sub.add_parser('watch', parents=[recognizer_opts],
+                   help="scan, then keep the people up to date as folders change")
+    organize = sub.add_parser('organize', parents=[common], help="sort a watch folder into per-person folders")
+    organize.add_argument('watch_folder')
+    organize.add_argument('output_folder')
+    organize.add_argument('--mode', choices=OUTPUT_MODES, default='hardlink')
+    organize.add_argument('--profile', choices=sorted(DETECTION_PROFILES), default=DEFAULT_PROFILE,
+                          help="detection speed/accuracy, see scan --help")
+    organize.set_defaults(threshold=0.6)
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if getattr(args, 'max_edge', None) == 0:
+        args.max_edge = None
+    writer = None
+    if args.metrics:
+        writer = MetricsWriter(metrics, args.metrics, interval=args.metrics_interval)
+        writer.start()
+    try:
+        if args.command == 'scan':
+            return cmd_scan(args)
+        if args.command == 'watch':
+            return cmd_watch(args)
+        return cmd_organize(args)
+    finally:
+        if writer is not None:
+            writer.stop()
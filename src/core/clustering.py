@@ -0,0 +1,328 @@
+import time
+import tracemalloc
+import numpy as np
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+from sklearn.cluster import DBSCAN
+
+CLUSTER_BACKENDS = ('auto', 'dbscan', 'components', 'whispers')
+# 'auto' keeps exact DBSCAN up to this many faces and switches to the graph above it
+AUTO_GRAPH_THRESHOLD = 20000
+
+@dataclass
+class ClusterReport:
+    backend: str
+    faces: int
+    clusters: int
+    seconds: float
+    peak_bytes: Optional[int] = None  # Peak memory allocated while clustering, when traced
+
+    def describe(self) -> str:
+        text = f"{self.backend}: {self.faces} faces -> {self.clusters} clusters in {self.seconds:.2f}s"
+        if self.peak_bytes is not None:
+            text += f", peak {self.peak_bytes / (1024 * 1024):.0f} MB"
+        return text
+
+@dataclass
+class NeighborGraph:
+    """
+    Up to k nearest neighbours of every face within a radius, nearest first.
+    Missing neighbours are -1 with an infinite distance.
+    """
+    indices: np.ndarray  # (n, k) int32 rows of the encoding matrix
+    distances: np.ndarray  # (n, k) float32
+
+    @classmethod
+    def empty(cls, k: int = 32) -> "NeighborGraph":
+        return cls(np.full((0, k), -1, dtype=np.int32), np.full((0, k), np.inf, dtype=np.float32))
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def _ensure(self, size: int):
+        if size <= len(self.indices):
+            return
+        extra = max(size, 2 * len(self.indices), 1024) - len(self.indices)
+        k = self.indices.shape[1]
+        self.indices = np.concatenate([self.indices, np.full((extra, k), -1, dtype=np.int32)])
+        self.distances = np.concatenate([self.distances, np.full((extra, k), np.inf, dtype=np.float32)])
+
+    def insert(self, face_id: int, neighbours: np.ndarray, distances: np.ndarray):
+        """
+        Link a new face to its neighbours, keeping the k nearest on both sides.
+        """
+        k = self.indices.shape[1]
+        self._ensure(face_id + 1)
+        order = np.argsort(distances, kind='stable')[:k]
+        self.indices[face_id] = -1
+        self.distances[face_id] = np.inf
+        self.indices[face_id, :len(order)] = neighbours[order]
+        self.distances[face_id, :len(order)] = distances[order]
+        # The new face also enters the lists of neighbours it is closer to than their k-th
+        closer = distances < self.distances[neighbours, k - 1]
+        for row, distance in zip(neighbours[closer], distances[closer]):
+            slot = int(np.searchsorted(self.distances[row], distance))
+            self.indices[row, slot + 1:] = self.indices[row, slot:-1].copy()
+            self.distances[row, slot + 1:] = self.distances[row, slot:-1].copy()
+            self.indices[row, slot] = face_id
+            self.distances[row, slot] = distance
+
+    def remove(self, face_id: int, candidates: Optional[np.ndarray] = None):
+        """
+        Drop a face and every edge pointing at it; the lists it was in get one slot shorter.
+        Only faces within the radius can point at it, so callers that know its
+        cluster pass the members as candidates instead of scanning every row.
+        """
+        if face_id >= len(self.indices):
+            return
+        self.indices[face_id] = -1
+        self.distances[face_id] = np.inf
+        if candidates is None:
+            rows, slots = np.nonzero(self.indices == face_id)
+        else:
+            candidates = np.asarray(candidates, dtype=np.int64)
+            rows, slots = np.nonzero(self.indices[candidates] == face_id)
+            rows = candidates[rows]
+        for row, slot in zip(rows, slots):
+            self.indices[row, slot:-1] = self.indices[row, slot + 1:].copy()
+            self.distances[row, slot:-1] = self.distances[row, slot + 1:].copy()
+            self.indices[row, -1] = -1
+            self.distances[row, -1] = np.inf
+
+    def compact(self, remap: np.ndarray):
+        """
+        Follow a FaceStore.compact(): keep the rows of kept faces and renumber their neighbours.
+        """
+        kept = np.flatnonzero(remap[:len(self.indices)] >= 0)
+        indices = self.indices[kept]
+        linked = indices >= 0
+        indices[linked] = remap[indices[linked]]
+        self.indices, self.distances = indices, self.distances[kept]
+
+    def edges(self, eps: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Return (rows, cols, distances) of every stored edge within eps.
+        """
+        rows, slots = np.nonzero((self.indices >= 0) & (self.distances <= eps))
+        return rows, self.indices[rows, slots].astype(np.int64), self.distances[rows, slots]
+
+def _keep_nearest(sq: np.ndarray, hits: np.ndarray, rows: np.ndarray, cols: np.ndarray,
+                  k: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Candidate (row, col, squared distance) triples of a distance block, at
+    most k per row, given the block's hits as a mask and as coordinates.
+    """
+    if len(rows) > k * len(sq) and sq.shape[1] > k:
+        # Dense block (one big cluster): cut every row down to its k best first
+        best = np.argpartition(np.where(hits, sq, np.inf), k - 1, axis=1)[:, :k].ravel()
+        rows = np.repeat(np.arange(len(sq)), k)
+        keep = hits[rows, best]
+        rows, cols = rows[keep], best[keep]
+    return rows, cols, sq[rows, cols]
+
+def _merge(indices: np.ndarray, sq_dists: np.ndarray, rows: np.ndarray, cols: np.ndarray, values: np.ndarray):
+    """
+    Fold candidate neighbours into the running top-k lists of their rows.
+    """
+    k = indices.shape[1]
+    # Lists are sorted, so anything not closer than a row's current k-th neighbour can go
+    closer = values < sq_dists[rows, k - 1]
+    rows, cols, values = rows[closer], cols[closer], values[closer]
+    if not len(rows):
+        return
+    affected = np.unique(rows)
+    old_cols = indices[affected].ravel()
+    present = old_cols >= 0
+    rows = np.concatenate([np.repeat(affected, k)[present], rows])
+    cols = np.concatenate([old_cols[present], cols])
+    values = np.concatenate([sq_dists[affected].ravel()[present], values])
+    # Non-negative float32s order like their bit patterns, so (row, distance) packs into one sortable int64
+    order = np.argsort((rows.astype(np.int64) << 32) | values.astype(np.float32).view(np.int32))
+    rows, cols, values = rows[order], cols[order], values[order]
+    # Rank of every candidate within its row; the first k of each row survive
+    starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+    rank = np.arange(len(rows)) - np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+    keep = rank < k
+    indices[affected] = -1
+    sq_dists[affected] = np.inf
+    indices[rows[keep], rank[keep]] = cols[keep]
+    sq_dists[rows[keep], rank[keep]] = values[keep]
+
+def _shift(triples: Tuple[np.ndarray, np.ndarray, np.ndarray], row0: int, col0: int):
+    rows, cols, values = triples
+    return rows + row0, cols + col0, values
+
+def knn_graph(encodings: np.ndarray, k: int = 32, radius: float = np.inf,
+              block_size: int = 2048) -> NeighborGraph:
+    """
+    Build the k-nearest-neighbour graph block by block.
+
+    Only pairs of blocks on or above the diagonal are compared and each
+    comparison updates both sides, so every distance is computed once.
+    Working memory is one block_size x block_size distance block plus the
+    n x k result, whatever the number of faces.
+    """
+    encodings = np.asarray(encodings, dtype=np.float32)
+    n = len(encodings)
+    k = max(1, k)
+    indices = np.full((n, k), -1, dtype=np.int32)
+    sq_dists = np.full((n, k), np.inf, dtype=np.float32)
+    norms = np.einsum('ij,ij->i', encodings, encodings)
+    limit = radius * radius
+    for i0 in range(0, n, block_size):
+        i1 = min(i0 + block_size, n)
+        a = encodings[i0:i1] * -2.0  # folds the -2ab term of |a - b|^2 into the product
+        for j0 in range(i0, n, block_size):
+            j1 = min(j0 + block_size, n)
+            sq = a @ encodings[j0:j1].T
+            sq += norms[i0:i1, None]
+            sq += norms[None, j0:j1]
+            hits = sq <= limit
+            if i0 == j0:
+                np.fill_diagonal(hits, False)
+            if not hits.any():
+                continue  # Nobody in these two blocks is close; the usual case in a big library
+            rows, cols = np.nonzero(hits)
+            np.maximum(sq, 0.0, out=sq)
+            _merge(indices, sq_dists, *_shift(_keep_nearest(sq, hits, rows, cols, k), i0, j0))
+            if i0 != j0:
+                _merge(indices, sq_dists, *_shift(_keep_nearest(sq.T, hits.T, cols, rows, k), j0, i0))
+    return NeighborGraph(indices, np.sqrt(sq_dists))
+
+def component_labels(graph: NeighborGraph, eps: float) -> np.ndarray:
+    """
+    Connected components of the graph's edges within eps.
+
+    With min_samples=1 this is what DBSCAN computes, as long as no face has
+    more than k neighbours within eps whose only link to the rest is that face.
+    """
+    n = len(graph)
+    rows, cols, _ = graph.edges(eps)
+    adjacency = csr_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(n, n))
+    _, labels = connected_components(adjacency, directed=True, connection='weak')
+    return labels
+
+def chinese_whispers(graph: NeighborGraph, eps: float, iterations: int = 20, batches: int = 16,
+                     seed: int = 0) -> np.ndarray:
+    """
+    Chinese whispers over the graph's edges within eps, closer faces weighing more.
+
+    Each face takes the label with the highest total edge weight among its
+    neighbours. Faces are updated in random batches rather than strictly one
+    at a time, so every batch is a few vectorised operations.
+    """
+    n = len(graph)
+    rows, cols, dists = graph.edges(eps)
+    # The graph is directed (k nearest of each face); whispers need both directions
+    rows, cols = np.concatenate([rows, cols]), np.concatenate([cols, rows])
+    weights = np.tile(eps - dists + 1e-6, 2)
+    order = np.argsort(rows, kind='stable')
+    cols, weights = cols[order], weights[order]
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+    labels = np.arange(n)
+    rng = np.random.default_rng(seed)
+    for _ in range(iterations):
+        changed = 0
+        for batch in np.array_split(rng.permutation(n), batches):
+            counts = indptr[batch + 1] - indptr[batch]
+            batch = batch[counts > 0]
+            counts = counts[counts > 0]
+            if not len(batch):
+                continue
+            # Edge positions of every face in the batch, concatenated
+            offsets = np.repeat(indptr[batch] - np.r_[0, np.cumsum(counts)[:-1]], counts)
+            edge = offsets + np.arange(counts.sum())
+            node = np.repeat(batch, counts)
+            neighbour_labels = labels[cols[edge]]
+            key = np.lexsort((neighbour_labels, node))
+            node, neighbour_labels, w = node[key], neighbour_labels[key], weights[edge][key]
+            boundary = (node[1:] != node[:-1]) | (neighbour_labels[1:] != neighbour_labels[:-1])
+            group = np.flatnonzero(np.r_[True, boundary])
+            totals = np.add.reduceat(w, group)
+            g_node, g_label = node[group], neighbour_labels[group]
+            # Heaviest label per node: sort by node then weight descending, take the first
+            best = np.lexsort((-totals, g_node))
+            first = np.r_[True, g_node[best][1:] != g_node[best][:-1]]
+            winners, new_labels = g_node[best][first], g_label[best][first]
+            changed += int(np.count_nonzero(labels[winners] != new_labels))
+            labels[winners] = new_labels
+        if not changed:
+            break
+    return np.unique(labels, return_inverse=True)[1]
+
+def dbscan_labels(encodings: np.ndarray, eps: float) -> np.ndarray:
+    return DBSCAN(eps=eps, min_samples=1, metric='euclidean').fit(encodings).labels_
+
+def connected_pieces(graph: NeighborGraph, members: np.ndarray, encodings: np.ndarray,
+                     eps: float) -> List[np.ndarray]:
+    """
+    Split one cluster's faces into the pieces DBSCAN would make of them.
+
+    Stored edges are real distances within eps, so when they alone connect
+    every member the cluster is certainly whole. Only when they don't are
+    exact distances computed, among these members alone.
+    """
+    members = np.sort(np.asarray(members, dtype=np.int64))
+    if len(members) <= 1:
+        return [members]
+    neighbours = graph.indices[members].astype(np.int64)
+    pos = np.minimum(np.searchsorted(members, neighbours), len(members) - 1)
+    inside = (neighbours >= 0) & (graph.distances[members] <= eps) & (members[pos] == neighbours)
+    rows, slots = np.nonzero(inside)
+    adjacency = csr_matrix((np.ones(len(rows), dtype=np.int8), (rows, pos[rows, slots])),
+                           shape=(len(members), len(members)))
+    pieces, _ = connected_components(adjacency, directed=True, connection='weak')
+    if pieces == 1:
+        return [members]
+    labels = dbscan_labels(encodings[members], eps)
+    return [members[labels == label] for label in np.unique(labels)]
+
+def resolve_backend(backend: str, faces: int) -> str:
+    if backend not in CLUSTER_BACKENDS:
+        raise ValueError(f"Unknown clustering backend {backend!r}, expected one of {CLUSTER_BACKENDS}")
+    if backend == 'auto':
+        return 'dbscan' if faces <= AUTO_GRAPH_THRESHOLD else 'components'
+    return backend
+
+def cluster_faces(encodings: np.ndarray, eps: float, backend: str = 'auto', k: int = 32, block_size: int = 2048,
+                  graph: Optional[NeighborGraph] = None,
+                  measure_memory: bool = False) -> Tuple[np.ndarray, ClusterReport]:
+    """
+    Cluster face encodings with the chosen backend and report what it cost.
+
+    'dbscan' is sklearn's exact DBSCAN (min_samples=1), whose memory grows
+    with the number of neighbour pairs. 'components' and 'whispers' first
+    build a blocked k-NN graph in bounded memory, then take its connected
+    components or run Chinese whispers on it. 'auto' picks by library size.
+    A graph built earlier over the same encodings and radius is reused.
+    With measure_memory, allocations are traced (which slows clustering down)
+    and the report includes their peak.
+    """
+    backend = resolve_backend(backend, len(encodings))
+    tracing = tracemalloc.is_tracing()
+    if measure_memory:
+        if not tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+    peak = None
+    start = time.perf_counter()
+    try:
+        if backend == 'dbscan':
+            labels = dbscan_labels(encodings, eps)
+        else:
+            if graph is None:
+                graph = knn_graph(encodings, k=k, radius=eps, block_size=block_size)
+            labels = component_labels(graph, eps) if backend == 'components' else chinese_whispers(graph, eps)
+        seconds = time.perf_counter() - start
+        if measure_memory:
+            peak = max(0, tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        if measure_memory and not tracing:
+            tracemalloc.stop()
+    report = ClusterReport(backend=backend, faces=len(encodings), clusters=int(len(np.unique(labels))),
+                           seconds=seconds, peak_bytes=peak)
+    return labels, report
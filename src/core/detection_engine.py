@@ -0,0 +1,102 @@
+import os
+import sys
+import psutil
+from concurrent.futures import Future, Executor, ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Iterable, Iterator, List, Optional, Tuple
+from .face_detector import FaceDetector, FaceLocation
+from .photo_pipeline import PhotoPipeline, PhotoResult
+
+def set_process_priority_low():
+    try:
+        # Get the current process
+        process = psutil.Process(os.getpid())
+        # Set to low priority (BELOW_NORMAL_PRIORITY_CLASS in Windows)
+        if sys.platform == 'win32':
+            process.nice(psutil.BELOW_NORMAL_PRIORITY_CLASS)
+        else:
+            # For Unix-like systems
+            process.nice(10)
+    except Exception as e:
+        print(f"Failed to set process priority: {e}")
+
+def default_worker_count() -> int:
+    return max(1, (os.cpu_count() or 1) - 1)
+
+# Each worker process keeps its own pipeline, set up once by _init_worker
+_worker_pipeline: Optional[PhotoPipeline] = None
+
+def _init_worker(pipeline: PhotoPipeline):
+    global _worker_pipeline
+    # Workers are background work just like the tray app itself
+    set_process_priority_low()
+    _worker_pipeline = pipeline
+
+def _process_in_worker(image_path: str) -> PhotoResult:
+    return _worker_pipeline.try_process(image_path)
+
+class DetectionEngine:
+    """
+    Fan photo pipeline work out over a pool of low-priority worker processes.
+    """
+    def __init__(self, detector: Optional[FaceDetector] = None, workers: Optional[int] = None,
+                 pipeline: Optional[PhotoPipeline] = None):
+        self.pipeline = pipeline or PhotoPipeline(detector)
+        self.workers = workers or default_worker_count()
+        self._pool: Optional[Executor] = None  # Long-lived pool used by submit()
+
+    def submit(self, image_path: str) -> Future:
+        """
+        Queue one photo on a persistent pool, for callers that feed work continuously.
+        """
+        if self._pool is None:
+            if self.workers <= 1:
+                self._pool = ThreadPoolExecutor(max_workers=1)
+            else:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 initializer=_init_worker,
+                                                 initargs=(self.pipeline,))
+        if self.workers <= 1:
+            return self._pool.submit(self.pipeline.process, image_path)
+        return self._pool.submit(_process_in_worker, image_path)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def detect_many(self, image_paths: Iterable[str]) -> Iterator[Tuple[str, List[FaceLocation]]]:
+        """
+        Yield (image_path, faces) for every path, in completion order.
+        """
+        for result in self.process_many(image_paths):
+            if result.error is None:
+                yield result.path, result.faces
+
+    def process_many(self, image_paths: Iterable[str]) -> Iterator[PhotoResult]:
+        """
+        Run the photo pipeline on every path, yielding results in completion order.
+        A photo that fails yields a result with error set instead of ending the run.
+        """
+        if self.workers <= 1:
+            for image_path in image_paths:
+                yield self.pipeline.try_process(image_path)
+            return
+        # Keep a few tasks per worker in flight so paths can be produced lazily
+        max_in_flight = self.workers * 4
+        paths = iter(image_paths)
+        with ProcessPoolExecutor(max_workers=self.workers,
+                                 initializer=_init_worker,
+                                 initargs=(self.pipeline,)) as pool:
+            pending = set()
+            exhausted = False
+            while True:
+                while not exhausted and len(pending) < max_in_flight:
+                    try:
+                        pending.add(pool.submit(_process_in_worker, next(paths)))
+                    except StopIteration:
+                        exhausted = True
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
@@ -1,9 +1,85 @@
+import os
 import cv2
+import time
 import numpy as np
 import face_recognition
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 from dataclasses import dataclass
 from pathlib import Path
+from .quality import BLURRY_THRESHOLD, QUALITY_PROXY_EDGE, score_image
+from .image_loader import load_scaled
+
+# dlib's 150 px face chip spans about 100 px of face; faces at least this large
+# in a reduced decode encode from it without loss
+ENCODE_MIN_FACE = 100
+
+Box = Tuple[int, int, int, int]  # top, right, bottom, left
+
+def scale_box(box: Box, scale: float, height: int, width: int) -> Box:
+    """
+    Map a box found at scale onto an image of height x width at scale 1.
+    """
+    top, right, bottom, left = box
+    return (
+        max(0, int(top / scale)),
+        min(width, int(round(right / scale))),
+        min(height, int(round(bottom / scale))),
+        max(0, int(left / scale))
+    )
+
+@dataclass(frozen=True)
+class DetectionProfile:
+    """
+    One speed/accuracy trade-off: which detector finds faces, how far it
+    upsamples, which landmark model aligns them and how many jittered
+    resamples are averaged into each encoding.
+    """
+    name: str
+    backend: str  # 'hog' or 'cnn' (dlib through face_recognition) or 'haar' (OpenCV cascade)
+    upsample: int
+    landmarks: str  # 'small' (5-point) or 'large' (68-point)
+    jitters: int
+
+    @property
+    def min_face(self) -> int:
+        """
+        Smallest face edge the backend finds reliably, with some margin.
+        """
+        # dlib's detectors scan an 80 px window, halved by every upsample
+        return HAAR_MIN_FACE if self.backend == 'haar' else 96 >> self.upsample
+
+DETECTION_PROFILES = {
+    'fast': DetectionProfile('fast', backend='haar', upsample=0, landmarks='small', jitters=1),
+    'balanced': DetectionProfile('balanced', backend='hog', upsample=1, landmarks='large', jitters=1),
+    # CNN on the CPU is seconds per photo; meant for overnight or small libraries
+    'accurate': DetectionProfile('accurate', backend='cnn', upsample=1, landmarks='large', jitters=5),
+}
+DEFAULT_PROFILE = 'balanced'
+# Locate faces on a ~2MP copy of large camera files
+DEFAULT_DETECT_MAX_EDGE = 1600
+
+# minSize passed to the Haar cascade, and the face edge it finds reliably
+HAAR_MIN_SIZE = 40
+HAAR_MIN_FACE = 48
+HAAR_CASCADE = 'haarcascade_frontalface_default.xml'
+
+_haar_cascade = None  # Loaded once per process; cascades can't be pickled to workers
+
+def haar_cascade_path() -> Optional[str]:
+    """
+    Path of the frontal face cascade shipped with opencv-python, if this build has one.
+    """
+    data = getattr(cv2, 'data', None)
+    if not hasattr(cv2, 'CascadeClassifier') or data is None:
+        return None
+    path = os.path.join(data.haarcascades, HAAR_CASCADE)
+    return path if os.path.exists(path) else None
+
+def _get_haar_cascade():
+    global _haar_cascade
+    if _haar_cascade is None:
+        _haar_cascade = cv2.CascadeClassifier(haar_cascade_path())
+    return _haar_cascade
 
 @dataclass
 class FaceLocation:
@@ -14,21 +90,83 @@ class FaceLocation:
     encoding: Optional[np.ndarray] = None
 
 class FaceDetector:
-    def __init__(self, confidence_threshold: float = 0.6):
+    def __init__(self, confidence_threshold: Optional[float] = None, detect_max_edge: Optional[int] = None,
+                 refine_small_faces: bool = False, refine_min_size: int = 40, min_face_size: int = 0,
+                 profile: str = DEFAULT_PROFILE):
+        if profile not in DETECTION_PROFILES:
+            raise ValueError(f"Unknown detection profile {profile!r}, expected one of {sorted(DETECTION_PROFILES)}")
+        self.profile = DETECTION_PROFILES[profile]
+        if self.profile.backend == 'haar' and haar_cascade_path() is None:
+            raise RuntimeError(f"The {profile!r} profile needs an OpenCV 4 build that ships {HAAR_CASCADE}")
+        # Minimum detector score to keep a face (dlib HOG/CNN score, Haar level weight);
+        # None keeps everything the detector reports
         self.confidence_threshold = confidence_threshold
+        # Two-pass mode: locate on a copy whose longest edge is at most detect_max_edge,
+        # then encode at whatever resolution each face needs (see encode_scaled). None keeps
+        # single-pass detection at full resolution.
+        self.detect_max_edge = detect_max_edge
+        # Re-locate boxes smaller than refine_min_size (in downscaled pixels) on a full-res crop
+        self.refine_small_faces = refine_small_faces
+        self.refine_min_size = refine_min_size
+        # Faces smaller than this (full-res pixels) are dropped before encoding; a large
+        # minimum also lets locating run on a proportionally smaller copy
+        self.min_face_size = min_face_size
         
+    @property
+    def signature(self) -> str:
+        """
+        Identify the detector settings that produced a set of encodings.
+        """
+        profile = self.profile
+        signature = (f"face_recognition:{profile.backend}:upsample{profile.upsample}:"
+                     f"{profile.landmarks}:jitter{profile.jitters}:oriented")
+        if self.confidence_threshold is not None:
+            signature += f":conf{self.confidence_threshold:g}"
+        if self.detect_max_edge:
+            signature += f":coarse{self.detect_max_edge}:dct{ENCODE_MIN_FACE}"
+            if self.refine_small_faces:
+                signature += f":refine{self.refine_min_size}"
+        if self.min_face_size:
+            signature += f":min{self.min_face_size}"
+        return signature
+
     def detect_faces(self, image_path: str) -> List[FaceLocation]:
         """
         Detect faces in an image and return their locations and encodings.
         """
-        # Load image
-        image = face_recognition.load_image_file(image_path)
-        
+        image, scale = self.load_for_detection(image_path)
+        return self.detect_faces_scaled(image, scale, image_path)[0]
+
+    def load_image(self, image_path: str) -> np.ndarray:
+        """
+        Decode an image file into a full-resolution RGB array, the layout every array entry point expects.
+        """
+        return load_scaled(image_path)[0]
+
+    def load_for_detection(self, image_path: str) -> Tuple[np.ndarray, float]:
+        """
+        Decode just enough of a photo to locate its faces: the smallest JPEG scale
+        that still covers detect_max_edge. Returns the pixels and their scale.
+        """
+        if not self.detect_max_edge:
+            return self.load_image(image_path), 1.0
+        return load_scaled(image_path, self.detect_max_edge)
+
+    def detect_faces_in_array(self, image: np.ndarray, timings: Optional[Dict[str, float]] = None) -> List[FaceLocation]:
+        """
+        Detect faces in an already decoded RGB image.
+        If timings is given, the seconds spent locating and encoding are stored in it.
+        """
+        start = time.perf_counter()
         # Detect face locations
-        face_locations = face_recognition.face_locations(image)
+        face_locations = self.locate_faces(image)
+        located = time.perf_counter()
         
-        # Get face encodings
-        face_encodings = face_recognition.face_encodings(image, face_locations)
+        # Get face encodings (always on the full-resolution image)
+        face_encodings = self.encode_faces(image, face_locations)
+        if timings is not None:
+            timings['locate'] = located - start
+            timings['encode'] = time.perf_counter() - located
         
         # Create FaceLocation objects
         faces = []
@@ -42,15 +180,166 @@ class FaceDetector:
             ))
             
         return faces
+
+    def detect_faces_scaled(self, image: np.ndarray, scale: float, image_path: str,
+                            timings: Optional[Dict[str, float]] = None) -> Tuple[List[FaceLocation], np.ndarray, float]:
+        """
+        Detect faces in a decode of image_path at scale (see load_for_detection).
+        Boxes come back in full-resolution coordinates. Also returns the pixels
+        and scale the faces were encoded from, for cropping.
+        """
+        if scale >= 1.0:
+            return self.detect_faces_in_array(image, timings), image, 1.0
+        start = time.perf_counter()
+        locations = self.locate_faces(image, scale)
+        if timings is not None:
+            timings['locate'] = time.perf_counter() - start
+        return self.encode_scaled(image, scale, locations, image_path, timings)
+
+    def encode_scaled(self, image: np.ndarray, scale: float, locations: List[Box], image_path: str,
+                      timings: Optional[Dict[str, float]] = None) -> Tuple[List[FaceLocation], np.ndarray, float]:
+        """
+        Encode faces located in a reduced decode. When any face is smaller than
+        ENCODE_MIN_FACE there, the full-resolution image is decoded, small boxes
+        are refined on it and every face is encoded from it instead.
+        """
+        height, width = round(image.shape[0] / scale), round(image.shape[1] / scale)
+        if scale < 1.0 and any(min(b - t, r - l) < ENCODE_MIN_FACE for t, r, b, l in locations):
+            start = time.perf_counter()
+            full = self.load_image(image_path)
+            decoded = time.perf_counter()
+            height, width = full.shape[:2]
+            # Size of each box in the copy locate_faces ran HOG on
+            coarse = min(1.0, self.detect_max_edge / max(height, width)) if self.detect_max_edge else 1.0
+            boxes = []
+            for box in locations:
+                box = scale_box(box, scale, height, width)
+                if self.refine_small_faces and min(box[2] - box[0], box[1] - box[3]) * coarse < self.refine_min_size:
+                    box = self._refine_box(full, box)
+                boxes.append(box)
+            image, scale, locations = full, 1.0, boxes
+            if timings is not None:
+                timings['decode'] = decoded - start
+                timings['locate'] = timings.get('locate', 0.0) + time.perf_counter() - decoded
+        start = time.perf_counter()
+        encodings = self.encode_faces(image, locations)
+        if timings is not None:
+            timings['encode'] = time.perf_counter() - start
+        faces = []
+        for box, encoding in zip(locations, encodings):
+            top, right, bottom, left = scale_box(box, scale, height, width) if scale < 1.0 else box
+            faces.append(FaceLocation(top=top, right=right, bottom=bottom, left=left, encoding=encoding))
+        return faces, image, scale
     
-    def is_blurry(self, image_path: str, threshold: float = 100.0) -> bool:
+    def encode_faces(self, image: np.ndarray, locations: List[Tuple[int, int, int, int]]) -> List[np.ndarray]:
         """
-        Check if an image is blurry using Laplacian variance.
+        Compute the 128-d encoding of each located face.
         """
-        image = cv2.imread(image_path)
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        laplacian_var = cv2.Laplacian(gray, cv2.CV_64F).var()
-        return laplacian_var < threshold
+        if not locations:
+            return []
+        return face_recognition.face_encodings(image, locations, num_jitters=self.profile.jitters,
+                                               model=self.profile.landmarks)
+
+    def find_faces(self, image: np.ndarray) -> List[Box]:
+        """
+        Run the profile's detector on an RGB array as it is, without any rescaling.
+        """
+        profile = self.profile
+        if profile.backend == 'haar':
+            return self._find_faces_haar(image)
+        if self.confidence_threshold is None:
+            return face_recognition.face_locations(image, number_of_times_to_upsample=profile.upsample,
+                                                   model=profile.backend)
+        # face_recognition drops the scores, so ask its dlib detectors directly
+        if profile.backend == 'cnn':
+            detections = [(d.rect, d.confidence)
+                          for d in face_recognition.api.cnn_face_detector(image, profile.upsample)]
+        else:
+            rects, scores, _ = face_recognition.api.face_detector.run(image, profile.upsample, 0.0)
+            detections = list(zip(rects, scores))
+        height, width = image.shape[:2]
+        return [(max(0, rect.top()), min(width, rect.right()), min(height, rect.bottom()), max(0, rect.left()))
+                for rect, score in detections if score >= self.confidence_threshold]
+
+    def _find_faces_haar(self, image: np.ndarray) -> List[Box]:
+        gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        min_size = max(1, HAAR_MIN_SIZE >> self.profile.upsample)
+        if self.confidence_threshold is None:
+            rects = _get_haar_cascade().detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5,
+                                                         minSize=(min_size, min_size))
+        else:
+            rects, _, weights = _get_haar_cascade().detectMultiScale3(
+                gray, scaleFactor=1.1, minNeighbors=5, minSize=(min_size, min_size), outputRejectLevels=True)
+            rects = [rect for rect, weight in zip(rects, weights) if weight >= self.confidence_threshold]
+        return [(int(y), int(x + w), int(y + h), int(x)) for x, y, w, h in rects]
+
+    def locate_faces(self, image: np.ndarray, scale: float = 1.0) -> List[Box]:
+        """
+        Find face boxes in the coordinates of image, on a downscaled copy when configured.
+        image is a decode at scale of full resolution; small boxes are only
+        refined at full resolution (see encode_scaled for reduced decodes).
+        """
+        height, width = image.shape[:2]
+        factor = 1.0
+        if self.detect_max_edge and max(height, width) > self.detect_max_edge:
+            factor = self.detect_max_edge / max(height, width)
+        if self.min_face_size * scale > self.profile.min_face:
+            factor = min(factor, self.profile.min_face / (self.min_face_size * scale))
+        if factor >= 1.0:
+            return self._drop_small(self.find_faces(image), scale)
+        small = cv2.resize(image, (max(1, round(width * factor)), max(1, round(height * factor))),
+                           interpolation=cv2.INTER_AREA)
+        locations = []
+        for top, right, bottom, left in self.find_faces(small):
+            box = scale_box((top, right, bottom, left), factor, height, width)
+            if (scale >= 1.0 and self.refine_small_faces
+                    and min(bottom - top, right - left) < self.refine_min_size):
+                box = self._refine_box(image, box)
+            locations.append(box)
+        return self._drop_small(locations, scale)
+
+    def _drop_small(self, locations: List[Box], scale: float = 1.0) -> List[Box]:
+        if not self.min_face_size:
+            return locations
+        return [(top, right, bottom, left) for top, right, bottom, left in locations
+                if min(bottom - top, right - left) >= self.min_face_size * scale]
+
+    def _refine_box(self, image: np.ndarray, box: Tuple[int, int, int, int]) -> Tuple[int, int, int, int]:
+        """
+        Re-run detection on a padded full-resolution crop around a small coarse box.
+        """
+        top, right, bottom, left = box
+        height, width = image.shape[:2]
+        pad_y, pad_x = bottom - top, right - left
+        y0, y1 = max(0, top - pad_y), min(height, bottom + pad_y)
+        x0, x1 = max(0, left - pad_x), min(width, right + pad_x)
+        refined = self.find_faces(np.ascontiguousarray(image[y0:y1, x0:x1]))
+        if not refined:
+            return box
+        # Keep the refined box closest to the coarse one
+        cy, cx = (top + bottom) / 2 - y0, (left + right) / 2 - x0
+        r_top, r_right, r_bottom, r_left = min(
+            refined, key=lambda b: ((b[0] + b[2]) / 2 - cy) ** 2 + ((b[1] + b[3]) / 2 - cx) ** 2
+        )
+        return r_top + y0, r_right + x0, r_bottom + y0, r_left + x0
+
+    def is_blurry(self, image_path: str, threshold: float = BLURRY_THRESHOLD) -> bool:
+        """
+        Check if an image is blurry using Laplacian variance of a small proxy.
+        Only a reduced decode is read; a photo that can't be decoded counts as blurry.
+        """
+        try:
+            image, _ = load_scaled(image_path, 2 * QUALITY_PROXY_EDGE)
+        except (OSError, ValueError):
+            return True
+        return score_image(image, QUALITY_PROXY_EDGE).is_blurry(threshold)
+
+    def blur_score(self, image: np.ndarray) -> float:
+        """
+        Laplacian variance of a grayscale or RGB array; lower means blurrier.
+        """
+        gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        return float(cv2.Laplacian(gray, cv2.CV_64F).var())
     
     def compare_faces(self, face1: np.ndarray, face2: np.ndarray) -> float:
         """
@@ -67,4 +356,25 @@ class FaceDetector:
             face_location.top:face_location.bottom,
             face_location.left:face_location.right
         ]
-        return face_image 
\ No newline at end of file
+        return face_image
+
+    def extract_face_array(self, image: np.ndarray, face_location: FaceLocation, scale: float = 1.0) -> np.ndarray:
+        """
+        Crop a face out of a decoded array at scale of full resolution. The result is a view, not a copy.
+        """
+        if scale != 1.0:
+            return image[
+                int(face_location.top * scale):int(round(face_location.bottom * scale)),
+                int(face_location.left * scale):int(round(face_location.right * scale))
+            ]
+        return image[
+            face_location.top:face_location.bottom,
+            face_location.left:face_location.right
+        ] 
+
+def default_detector(profile: str = DEFAULT_PROFILE) -> FaceDetector:
+    """
+    The detector configuration the GUI, CLI and PhotoService share. Components
+    built from it agree on the index signature, so they reuse each other's results.
+    """
+    return FaceDetector(detect_max_edge=DEFAULT_DETECT_MAX_EDGE, refine_small_faces=True, profile=profile)
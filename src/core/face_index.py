@@ -0,0 +1,286 @@
+import os
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from .face_detector import FaceLocation
+from .quality import QualityScores
+
+# Bump whenever the on-disk layout changes; older databases are wiped on open.
+INDEX_SCHEMA_VERSION = 3
+
+def default_index_path() -> str:
+    return os.path.join(os.path.expanduser('~'), '.face_organizer_index.db')
+
+def file_content_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Hash the full contents of a file, used to recognise unchanged bytes.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+@dataclass
+class IndexStats:
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+
+    def reset(self):
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+class FaceIndex:
+    """
+    Persistent SQLite cache of detection results.
+
+    Photos are keyed by path, size and mtime; when those change the file is
+    re-hashed and the faces are looked up by content hash, so only new or
+    modified bytes ever reach the detector.
+
+    Cached content is keyed by (content hash, detector signature), where the
+    signature covers the profile, scales and thresholds. Indexes opened with
+    different signatures share one database: each sees only its own results,
+    so switching profiles neither mixes encodings nor discards the others.
+
+    Quality scores are kept per content too. Photos a quality filter skipped are
+    cached as faceless only while quality_signature matches the filter that
+    skipped them; under any other filter they are detected again.
+    """
+    def __init__(self, db_path: Optional[str] = None, signature: str = "", quality_signature: str = ""):
+        self.db_path = db_path or default_index_path()
+        self.signature = signature
+        self.quality_signature = quality_signature
+        self.stats = IndexStats()
+        self.lock = threading.Lock()
+        # Hashes computed for misses, reused by store() once detection finishes
+        self._pending_hashes: Dict[str, Tuple[int, int, str]] = {}
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        # WAL keeps committed rows intact if the app is killed mid-scan
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._setup()
+
+    def _setup(self):
+        with self.lock, self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            rows = dict(self.conn.execute("SELECT key, value FROM meta"))
+            if rows.get('schema_version') != str(INDEX_SCHEMA_VERSION):
+                # Tables from another schema can't be read
+                self.conn.execute("DROP TABLE IF EXISTS photos")
+                self.conn.execute("DROP TABLE IF EXISTS contents")
+                self.conn.execute("DROP TABLE IF EXISTS faces")
+                self.conn.execute("DROP TABLE IF EXISTS quality")
+                self.conn.execute("DELETE FROM meta")
+                self.conn.execute("INSERT INTO meta VALUES ('schema_version', ?)",
+                                  (str(INDEX_SCHEMA_VERSION),))
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS photos (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    content_hash TEXT NOT NULL
+                )""")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS contents (
+                    content_hash TEXT NOT NULL,
+                    signature TEXT NOT NULL,
+                    face_count INTEGER NOT NULL,
+                    PRIMARY KEY (content_hash, signature)
+                )""")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS faces (
+                    content_hash TEXT NOT NULL,
+                    signature TEXT NOT NULL,
+                    face_no INTEGER NOT NULL,
+                    top INTEGER NOT NULL,
+                    right INTEGER NOT NULL,
+                    bottom INTEGER NOT NULL,
+                    left INTEGER NOT NULL,
+                    encoding BLOB,
+                    PRIMARY KEY (content_hash, signature, face_no)
+                )""")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS quality (
+                    content_hash TEXT NOT NULL,
+                    signature TEXT NOT NULL,
+                    blur REAL NOT NULL,
+                    brightness REAL NOT NULL,
+                    contrast REAL NOT NULL,
+                    skipped_by TEXT,
+                    PRIMARY KEY (content_hash, signature)
+                )""")
+
+    def lookup(self, image_path: str) -> Optional[List[FaceLocation]]:
+        """
+        Return the cached faces for a photo, or None if it must be detected.
+        """
+        return self.lookup_entry(image_path)[0]
+
+    def lookup_entry(self, image_path: str) -> Tuple[Optional[List[FaceLocation]], str]:
+        """
+        Like lookup, but also return the photo's content hash.
+        """
+        st = os.stat(image_path)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT size, mtime_ns, content_hash FROM photos WHERE path = ?",
+                (image_path,)).fetchone()
+        if row is not None and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            content_hash = row[2]
+        else:
+            # Touched or renamed file: the bytes may still be known
+            content_hash = file_content_hash(image_path)
+        faces = self._load_faces(content_hash)
+        if faces is None:
+            with self.lock:
+                self._pending_hashes[image_path] = (st.st_size, st.st_mtime_ns, content_hash)
+            self.stats.misses += 1
+            return None, content_hash
+        if row is None or row[2] != content_hash or row[0] != st.st_size or row[1] != st.st_mtime_ns:
+            with self.lock, self.conn:
+                self.conn.execute("INSERT OR REPLACE INTO photos VALUES (?, ?, ?, ?)",
+                                  (image_path, st.st_size, st.st_mtime_ns, content_hash))
+        self.stats.hits += 1
+        return faces, content_hash
+
+    def known_hash(self, image_path: str) -> Optional[str]:
+        """
+        Content hash recorded for a photo if the file is unchanged since; never hashes.
+        """
+        try:
+            st = os.stat(image_path)
+        except OSError:
+            return None
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT size, mtime_ns, content_hash FROM photos WHERE path = ?",
+                (image_path,)).fetchone()
+        if row is not None and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[2]
+        return None
+
+    def _load_faces(self, content_hash: str) -> Optional[List[FaceLocation]]:
+        with self.lock:
+            known = self.conn.execute(
+                "SELECT face_count FROM contents WHERE content_hash = ? AND signature = ?",
+                (content_hash, self.signature)).fetchone()
+            if known is None:
+                return None
+            skipped = self.conn.execute(
+                "SELECT skipped_by FROM quality WHERE content_hash = ? AND signature = ?",
+                (content_hash, self.signature)).fetchone()
+            if skipped is not None and skipped[0] is not None and skipped[0] != self.quality_signature:
+                # Skipped under other thresholds; it may pass the current ones
+                return None
+            rows = self.conn.execute(
+                "SELECT top, right, bottom, left, encoding FROM faces "
+                "WHERE content_hash = ? AND signature = ? ORDER BY face_no",
+                (content_hash, self.signature)).fetchall()
+        faces = []
+        for top, right, bottom, left, blob in rows:
+            encoding = np.frombuffer(blob, dtype=np.float64).copy() if blob is not None else None
+            faces.append(FaceLocation(top=top, right=right, bottom=bottom, left=left, encoding=encoding))
+        return faces
+
+    def store(self, image_path: str, faces: List[FaceLocation], content_hash: Optional[str] = None,
+              quality: Optional[QualityScores] = None, skipped: bool = False) -> str:
+        """
+        Record the detection result for a photo in a single transaction.
+        skipped marks a photo the current quality filter kept from detection.
+        Returns the content hash it was stored under.
+        """
+        st = os.stat(image_path)
+        with self.lock:
+            pending = self._pending_hashes.pop(image_path, None)
+        if content_hash is None:
+            if pending is not None and pending[:2] == (st.st_size, st.st_mtime_ns):
+                content_hash = pending[2]
+            else:
+                content_hash = file_content_hash(image_path)
+        rows = []
+        for face_no, face in enumerate(faces):
+            blob = None
+            if face.encoding is not None:
+                blob = np.asarray(face.encoding, dtype=np.float64).tobytes()
+            rows.append((content_hash, self.signature, face_no,
+                         face.top, face.right, face.bottom, face.left, blob))
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM faces WHERE content_hash = ? AND signature = ?",
+                              (content_hash, self.signature))
+            self.conn.executemany("INSERT INTO faces VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.conn.execute("INSERT OR REPLACE INTO contents VALUES (?, ?, ?)",
+                              (content_hash, self.signature, len(faces)))
+            if quality is not None:
+                self.conn.execute("INSERT OR REPLACE INTO quality VALUES (?, ?, ?, ?, ?, ?)",
+                                  (content_hash, self.signature, quality.blur, quality.brightness,
+                                   quality.contrast, self.quality_signature if skipped else None))
+            elif not skipped:
+                # Detected in full this time, so an earlier filter's skip no longer applies
+                self.conn.execute("UPDATE quality SET skipped_by = NULL WHERE content_hash = ? AND signature = ?",
+                                  (content_hash, self.signature))
+            self.conn.execute("INSERT OR REPLACE INTO photos VALUES (?, ?, ?, ?)",
+                              (image_path, st.st_size, st.st_mtime_ns, content_hash))
+        self.stats.stores += 1
+        return content_hash
+
+    def quality(self, content_hash: str) -> Optional[QualityScores]:
+        """
+        Return the stored quality scores for some content, if it was ever scored.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT blur, brightness, contrast FROM quality "
+                "WHERE content_hash = ? AND signature = ?",
+                (content_hash, self.signature)).fetchone()
+        return QualityScores(*row) if row is not None else None
+
+    def forget(self, image_path: str):
+        """
+        Drop the path entry; the content stays cached in case it reappears.
+        """
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM photos WHERE path = ?", (image_path,))
+
+    def move(self, old_path: str, new_path: str):
+        """
+        Re-key a photo entry after a rename, without touching its cached content.
+        """
+        try:
+            st = os.stat(new_path)
+        except OSError:
+            return
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE OR REPLACE photos SET path = ?, size = ?, mtime_ns = ? WHERE path = ?",
+                (new_path, st.st_size, st.st_mtime_ns, old_path))
+
+    def move_tree(self, old_dir: str, new_dir: str):
+        """
+        Re-key every photo under old_dir after the directory was moved to new_dir.
+        """
+        prefix = os.path.join(old_dir, '')
+        with self.lock, self.conn:
+            # substr instead of LIKE so '%' and '_' in folder names match literally
+            self.conn.execute(
+                "UPDATE OR REPLACE photos SET path = ? || substr(path, ?) "
+                "WHERE substr(path, 1, ?) = ?",
+                (os.path.join(new_dir, ''), len(prefix) + 1, len(prefix), prefix))
+
+    def counts(self) -> Tuple[int, int]:
+        """
+        Return (hits, misses) since the last reset.
+        """
+        return self.stats.hits, self.stats.misses
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
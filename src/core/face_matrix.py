@@ -0,0 +1,141 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Iterable, List, Tuple
+from .face_store import FaceStore
+
+@dataclass
+class SearchResult:
+    person_id: int
+    distance: float
+    face_index: int  # Closest face of that person, a FaceStore face id
+
+class FaceMatrix:
+    """
+    Owning person and cached squared norm for every face in a FaceStore.
+
+    Rows are face ids, so search runs over the store's encoding matrix in
+    place instead of a copy. Removed and unassigned faces have owner -1 and
+    are skipped.
+    """
+    def __init__(self, store: FaceStore, capacity: int = 1024):
+        self.store = store
+        self.owners = np.full(capacity, -1, dtype=np.int64)
+        self.norms = np.zeros(capacity, dtype=np.float32)  # Cached squared row norms for distance expansion
+        self.count = 0  # face ids below this have a row here
+        self.live = 0
+
+    def __len__(self) -> int:
+        return self.live
+
+    def clear(self):
+        self.owners[:self.count] = -1
+        self.count = 0
+        self.live = 0
+
+    def compact(self, remap: np.ndarray):
+        """
+        Follow a FaceStore.compact(): move every kept face to its new id.
+        """
+        kept = np.flatnonzero(remap[:self.count] >= 0)
+        self.owners[:len(kept)] = self.owners[kept]
+        self.norms[:len(kept)] = self.norms[kept]
+        self.owners[len(kept):self.count] = -1
+        self.count = len(kept)
+
+    def append(self, face_id: int, owner: int = -1):
+        self.extend(np.array([face_id]), np.array([owner]))
+
+    def extend(self, face_ids: np.ndarray, owners: np.ndarray):
+        """
+        Start tracking newly stored faces with their owners.
+        """
+        face_ids = np.asarray(face_ids, dtype=np.int64)
+        if not len(face_ids):
+            return
+        needed = int(face_ids.max()) + 1
+        if needed > len(self.owners):
+            self._grow(max(needed, len(self.owners) * 2))
+        self.owners[face_ids] = owners
+        block = self.store.encodings[face_ids]
+        self.norms[face_ids] = np.einsum('ij,ij->i', block, block)
+        self.count = max(self.count, needed)
+        self.live += len(face_ids)
+
+    def owner_of(self, face_id: int) -> int:
+        return int(self.owners[face_id])
+
+    def set_owner(self, face_ids: Iterable[int], owner: int):
+        self.owners[np.asarray(face_ids, dtype=np.int64)] = owner
+
+    def remove(self, face_id: int):
+        if face_id < self.count and self.owners[face_id] >= 0:
+            self.owners[face_id] = -1
+            self.live -= 1
+
+    def within(self, encoding: np.ndarray, radius: float,
+               block_size: int = 65536) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (face ids, distances) of every assigned face within radius of an encoding.
+        """
+        query = np.asarray(encoding, dtype=np.float32)
+        q_norm = float(query @ query)
+        limit = radius * radius
+        face_ids, distances = [], []
+        for start in range(0, self.count, block_size):
+            stop = min(start + block_size, self.count)
+            sq = self.norms[start:stop] + q_norm - 2.0 * (self.store.encodings[start:stop] @ query)
+            hits = np.flatnonzero((sq <= limit) & (self.owners[start:stop] >= 0))
+            face_ids.append(hits + start)
+            distances.append(np.sqrt(np.maximum(sq[hits], 0.0)))
+        if not face_ids:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        return np.concatenate(face_ids), np.concatenate(distances)
+
+    def search(self, queries: np.ndarray, threshold: float, top_k: int = 10,
+               block_size: int = 65536) -> List[List[SearchResult]]:
+        """
+        Rank people by their closest face for each query encoding.
+
+        Distances are computed block by block with one matrix product per
+        block; only faces within threshold are kept as candidates.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        q_norms = np.einsum('ij,ij->i', queries, queries)
+        limit = threshold * threshold
+        hits_q, hits_face, hits_sq = [], [], []
+        for start in range(0, self.count, block_size):
+            stop = min(start + block_size, self.count)
+            block = self.store.encodings[start:stop]
+            sq = q_norms[:, None] + self.norms[start:stop][None, :] - 2.0 * (queries @ block.T)
+            q_idx, f_idx = np.nonzero(sq < limit)
+            hits_q.append(q_idx)
+            hits_face.append(f_idx + start)
+            hits_sq.append(sq[q_idx, f_idx])
+        results: List[List[SearchResult]] = [[] for _ in range(len(queries))]
+        if not hits_q:
+            return results
+        hits_q = np.concatenate(hits_q)
+        hits_face = np.concatenate(hits_face)
+        hits_sq = np.maximum(np.concatenate(hits_sq), 0.0)
+        hits_owner = self.owners[hits_face]
+        valid = hits_owner >= 0
+        hits_q, hits_face, hits_sq, hits_owner = hits_q[valid], hits_face[valid], hits_sq[valid], hits_owner[valid]
+        # Sort by query, then person, then distance: the first row of each (query, person) run is its best face
+        order = np.lexsort((hits_sq, hits_owner, hits_q))
+        hits_q, hits_face, hits_sq, hits_owner = hits_q[order], hits_face[order], hits_sq[order], hits_owner[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = (hits_q[1:] != hits_q[:-1]) | (hits_owner[1:] != hits_owner[:-1])
+        for q, face, sq, owner in zip(hits_q[first], hits_face[first], hits_sq[first], hits_owner[first]):
+            results[q].append(SearchResult(person_id=int(owner), distance=float(np.sqrt(sq)),
+                                           face_index=int(face)))
+        for ranked in results:
+            ranked.sort(key=lambda r: r.distance)
+            del ranked[top_k:]
+        return results
+
+    def _grow(self, capacity: int):
+        owners = np.full(capacity, -1, dtype=np.int64)
+        owners[:self.count] = self.owners[:self.count]
+        norms = np.zeros(capacity, dtype=np.float32)
+        norms[:self.count] = self.norms[:self.count]
+        self.owners, self.norms = owners, norms
@@ -1,70 +1,499 @@
-from typing import List, Dict, Set, Tuple, Optional
+from typing import Callable, List, Dict, Set, Optional
 import numpy as np
 from dataclasses import dataclass
 from .face_detector import FaceLocation, FaceDetector
-from sklearn.cluster import DBSCAN
+from .detection_engine import DetectionEngine
+from .prototype_index import PrototypeIndex
+from .face_matrix import FaceMatrix, SearchResult
+from .face_store import FaceStore, file_stamp, library_key
+from .face_index import FaceIndex, file_content_hash
+from .photo_pipeline import PhotoPipeline, PhotoResult
+from .quality import QualityFilter, QualityScores
+from .image_loader import load_scaled
+from .thumbnail_cache import ThumbnailCache
+from .folder_scanner import ScanRules, iter_photos
+from .metrics import metrics, CLUSTER
+from .clustering import ClusterReport, NeighborGraph, cluster_faces, connected_pieces, knn_graph, resolve_backend
 import os
+import time
+
+# Events passed to listeners as (event, person_id); person_id is -1 for PEOPLE_RESET
+PERSON_ADDED = 'added'
+PERSON_UPDATED = 'updated'
+PERSON_REMOVED = 'removed'
+PEOPLE_RESET = 'reset'
 
 @dataclass
 class Person:
     id: int
     name: str
-    face_encodings: List[np.ndarray]
     photo_paths: Set[str]
-    face_indices: List[int]  # Indices of faces in the global list
+    face_indices: np.ndarray  # int64 face ids, rows of FaceRecognizer.store
 
 class FaceRecognizer:
-    def __init__(self, similarity_threshold: float = 0.5):
+    def __init__(self, similarity_threshold: float = 0.5, index: Optional[FaceIndex] = None,
+                 workers: Optional[int] = None, detector: Optional[FaceDetector] = None,
+                 thumbnails: Optional[ThumbnailCache] = None, store: Optional[FaceStore] = None,
+                 clustering: str = 'auto', incremental: bool = False,
+                 quality: Optional[QualityFilter] = None):
         self.similarity_threshold = similarity_threshold
-        self.detector = FaceDetector()
+        resolve_backend(clustering, 0)  # Reject unknown backends up front, not after a long scan
+        self.clustering = clustering  # Backend for the final pass of a scan, see clustering.CLUSTER_BACKENDS
+        self.last_cluster_report: Optional[ClusterReport] = None
+        # Incremental mode keeps the neighbour graph of the last scan and applies DBSCAN's
+        # rules to each insert and delete instead of the greedy nearest-prototype match
+        self.incremental = incremental
+        self.graph: Optional[NeighborGraph] = NeighborGraph.empty() if incremental else None
+        self.pinned: Set[int] = set()  # People merged by hand, never split automatically
+        self.detector = detector or FaceDetector()
+        self.index = index  # Optional persistent cache of detection results
+        self.thumbnails = thumbnails  # Optional face-crop cache, filled during detection
+        # Every photo is scored; those the filter rejects never reach detection.
+        # With an index, pass it quality_signature=quality.signature so skips stay cached.
+        self.quality_filter = quality
+        pipeline = PhotoPipeline(self.detector, with_quality=True,
+                                 thumbnail_size=thumbnails.size if thumbnails else None,
+                                 quality_filter=quality)
+        self.engine = DetectionEngine(workers=workers, pipeline=pipeline)
         self.people: Dict[int, Person] = {}
-        self.face_data: List[Tuple[str, FaceLocation]] = []  # (image_path, FaceLocation)
+        # Every face's encoding, box and photo; face ids are store rows. Without a
+        # store given, each scanned library gets its own persistent one (see scan_folders)
+        self.owns_store = store is None
+        self.store_key: Optional[str] = None  # library_key of the owned store, once a scan opened it
+        self.store = store if store is not None else FaceStore.for_library([])
+        if self.owns_store:
+            self.store.clear()  # Scratch space until a scan opens the library's store
+        self.photo_faces: Dict[str, range] = {}  # image_path -> face ids
+        self.photo_hashes: Dict[str, str] = {}  # image_path -> content hash, when known
+        self.photo_quality: Dict[str, QualityScores] = {}  # image_path -> blur/exposure, when scored
         self.cluster_labels: List[int] = []
-        self.face_encodings = []  # List of face encodings
-        self.clusters = []  # List of face clusters
+        self.prototypes = PrototypeIndex()  # Per-person centroid/medoid matrix for assignment
+        self.face_matrix = FaceMatrix(self.store)  # Owner of every stored face, for search
         self.current_folder = None
+        self.listeners: List[Callable[[str, int], None]] = []
+
+    def add_listener(self, callback: Callable[[str, int], None]):
+        """
+        Register a callback for per-person changes. It runs on the thread making the change.
+        """
+        self.listeners.append(callback)
+
+    def notify_listeners(self, event: str, person_id: int = -1):
+        for callback in self.listeners:
+            callback(event, person_id)
+
+    def detect_photo(self, image_path: str) -> List[FaceLocation]:
+        """
+        Return the faces in a photo, consulting the persistent index first.
+        """
+        faces = self.lookup_cached(image_path)
+        if faces is not None:
+            return faces
+        result = self.engine.pipeline.process(image_path)
+        self.record_result(result)
+        return result.faces
+
+    def lookup_cached(self, image_path: str) -> Optional[List[FaceLocation]]:
+        """
+        Return the indexed faces for a photo, or None if it still needs detection.
+        """
+        if self.index is None:
+            return None
+        faces, content_hash = self.index.lookup_entry(image_path)
+        self.photo_hashes[image_path] = content_hash
+        if faces is not None:
+            quality = self.index.quality(content_hash)
+            if quality is not None:
+                self.photo_quality[image_path] = quality
+        metrics.count('index_misses' if faces is None else 'index_hits')
+        return faces
+
+    def record_result(self, result: PhotoResult):
+        """
+        Persist a fresh pipeline result to the index and thumbnail cache.
+        """
+        metrics.observe_all(result.timings)
+        metrics.count('skipped' if result.skipped else 'detected')
+        if result.quality is not None:
+            self.photo_quality[result.path] = result.quality
+        content_hash = self.photo_hashes.get(result.path)
+        if self.index is not None:
+            content_hash = self.index.store(result.path, result.faces, content_hash,
+                                            result.quality, result.skipped)
+            self.photo_hashes[result.path] = content_hash
+        if self.thumbnails is not None and result.face_thumbnails:
+            if content_hash is None:
+                content_hash = self._content_hash(result.path)
+            for face, thumb in zip(result.faces, result.face_thumbnails):
+                if thumb.size:
+                    self.thumbnails.put(self.thumbnails.key_for(content_hash, face), thumb)
+
+    def _content_hash(self, image_path: str) -> str:
+        content_hash = self.photo_hashes.get(image_path)
+        if content_hash is None:
+            content_hash = file_content_hash(image_path)
+            self.photo_hashes[image_path] = content_hash
+        return content_hash
+
+    def face_thumbnail(self, face_id: int, size: int = 64) -> Optional[np.ndarray]:
+        """
+        Return an RGB thumbnail for a face, decoding the photo only on a cache miss.
+        """
+        image_path, face_loc = self.store.path_of(face_id), self.store.location(face_id)
+        key = None
+        if self.thumbnails is not None:
+            size = self.thumbnails.size
+            key = self.thumbnails.key_for(self._content_hash(image_path), face_loc)
+            thumb = self.thumbnails.get(key)
+            if thumb is not None:
+                return thumb
+        # Decode only as much as the thumbnail needs from this face
+        face_edge = max(1, min(face_loc.bottom - face_loc.top, face_loc.right - face_loc.left))
+        image, scale = load_scaled(image_path, 0, size / face_edge)
+        crop = self.detector.extract_face_array(image, face_loc, scale)
+        if crop.size == 0:
+            return None
+        thumb = self.engine.pipeline.make_thumbnail(crop, size)
+        if key is not None:
+            self.thumbnails.put(key, thumb)
+        return thumb
 
-    def scan_folder(self, folder_path: str, progress_callback=None):
+    def scan_folder(self, folder_path: str, progress_callback: Optional[Callable[[int, int], None]] = None,
+                    rules: Optional[ScanRules] = None, publish_interval: float = 5.0):
         """
-        Scan all images in the folder, detect faces, and cluster them using DBSCAN.
+        Scan the folder tree, detect faces, and cluster them using DBSCAN.
+        See scan_folders.
         """
-        self.current_folder = folder_path  # Set the current folder path
-        self.face_data.clear()
+        self.scan_folders([folder_path], progress_callback, rules, publish_interval)
+
+    def scan_folders(self, folder_paths: List[str], progress_callback: Optional[Callable[[int, int], None]] = None,
+                     rules: Optional[ScanRules] = None, publish_interval: float = 5.0):
+        """
+        Scan one or more folder trees, detect faces, and cluster them together.
+
+        Photos whose faces are still in the store from an earlier scan, unchanged
+        on disk, are reused in place; the rest are looked up in the index or
+        go to detection as the walk finds them. Every publish_interval
+        seconds the faces seen so far are published as provisional people
+        (each face joins the nearest existing prototype or starts a new one);
+        a final clustering pass over everything (DBSCAN, or a k-NN graph for
+        large libraries, see self.clustering) replaces them at the end.
+        progress_callback receives (photos done, photos found so far).
+        """
+        self.current_folder = folder_paths[0]  # Set the current folder path
+        if self.owns_store:
+            self._open_library_store(folder_paths)
+        if self.store.signature != self.detector.signature:
+            # Encodings from another detector configuration are not comparable
+            self.store.clear()
+            self.store.signature = self.detector.signature
+        reusable = self.store.photo_rows()
+        if self.incremental:
+            self.graph = NeighborGraph.empty()
+        self.photo_faces.clear()
         self.people.clear()
         self.cluster_labels.clear()
-        encodings = []
-        image_files = [os.path.join(folder_path, f) for f in os.listdir(folder_path)
-                      if f.lower().endswith(('.png', '.jpg', '.jpeg'))]
-        total = len(image_files)
-        for i, image_path in enumerate(image_files):
-            faces = self.detector.detect_faces(image_path)
-            for face in faces:
-                if face.encoding is not None:
-                    encodings.append(face.encoding)
-                    self.face_data.append((image_path, face))
+        self.prototypes.clear()
+        self.face_matrix.clear()
+        if self.index is not None:
+            self.index.stats.reset()
+        labels: List[int] = []  # provisional person of each face
+        labeled: List[int] = []  # the face ids labels refers to
+        provisional = PrototypeIndex()
+        found = 0
+        done = 0
+        last_publish = time.monotonic()
+
+        def add_faces(image_path: str, faces: List[FaceLocation]):
+            faces = [face for face in faces if face.encoding is not None]
+            assign(self._add_faces(image_path, faces) if faces else range(0))
+
+        def assign(face_ids: range):
+            nonlocal done, last_publish
+            metrics.count('images')
+            metrics.count('faces', len(face_ids))
+            if len(face_ids):
+                encs = self.store.encodings[face_ids.start:face_ids.stop]
+                owners, distances = provisional.nearest(encs)
+                for face_id, enc, owner, distance in zip(face_ids, encs, owners, distances):
+                    label = int(owner) if distance < self.similarity_threshold else len(provisional)
+                    provisional.add_face(label, face_id, enc)
+                    labels.append(label)
+                    labeled.append(face_id)
+            done += 1
             if progress_callback is not None:
-                progress_callback(int((i + 1) / total * 100))
-        if not encodings:
+                progress_callback(done, found)
+            if time.monotonic() - last_publish >= publish_interval:
+                self.people = self._build_people(labels, labeled)
+                self.notify_listeners(PEOPLE_RESET)
+                last_publish = time.monotonic()
+
+        def to_detect():
+            # Cached photos are taken straight from the index as they are found;
+            # only the rest reach the worker pool
+            nonlocal found
+            for image_path in (path for folder_path in folder_paths for path in iter_photos(folder_path, rules)):
+                found += 1
+                face_ids = reusable.pop(image_path, None)
+                if face_ids is not None:
+                    if self.store.stamp_of(image_path) == file_stamp(image_path):
+                        self.photo_faces[image_path] = face_ids
+                        self._restore_photo(image_path)
+                        metrics.count('store_hits')
+                        assign(face_ids)
+                        continue
+                    self.store.remove(face_ids)  # Changed since, so its faces may have too
+                faces = self.lookup_cached(image_path)
+                if faces is None:
+                    yield image_path
+                else:
+                    add_faces(image_path, faces)
+
+        for result in self.engine.process_many(to_detect()):
+            if result.error is not None:
+                # Not cached, so a fixed or replaced file is tried again next scan
+                print(f"Error processing photo {result.path}: {result.error}")
+                metrics.count('failed')
+                add_faces(result.path, [])
+                continue
+            self.record_result(result)
+            add_faces(result.path, result.faces)
+        for face_ids in reusable.values():
+            self.store.remove(face_ids)  # Photos no longer in the library
+        if self.store.removed:
+            remap = self.store.compact()
+            self.photo_faces = {path: range(int(remap[ids.start]), int(remap[ids.start]) + len(ids))
+                                for path, ids in self.photo_faces.items()}
+        self.store.flush()
+        if not labels:
+            self.people = {}
+            self.notify_listeners(PEOPLE_RESET)
+            return
+        # Compacted, so the store rows 0..n-1 are exactly this library's faces
+        encodings = self.store.encodings[:self.store.count]
+        # Final consolidation: one clustering pass over every face replaces the provisional people
+        with metrics.timer(CLUSTER):
+            if self.incremental:
+                self.graph = knn_graph(encodings, radius=self.similarity_threshold)
+            self.cluster_labels, self.last_cluster_report = cluster_faces(
+                encodings, self.similarity_threshold, self.clustering, graph=self.graph)
+        self.pinned.clear()
+        self.face_matrix.extend(np.arange(len(encodings)), self.cluster_labels)
+        people = self._build_people(self.cluster_labels)
+        for cluster_id, person in people.items():
+            for i in person.face_indices:
+                self.prototypes.add_face(cluster_id, i, encodings[i])
+        self.people = people
+        self.notify_listeners(PEOPLE_RESET)
+
+    def _open_library_store(self, folder_paths: List[str]):
+        key = library_key(folder_paths)
+        if key == self.store_key:
+            return
+        self.store.close()
+        self.store = FaceStore.for_library(folder_paths)
+        self.store_key = key
+        self.face_matrix = FaceMatrix(self.store)
+
+    def _restore_photo(self, image_path: str):
+        """
+        Pick up the content hash and quality scores of a photo whose faces came from the store.
+        """
+        if self.index is None:
             return
-        encodings_np = np.stack(encodings)
-        # DBSCAN clustering
-        db = DBSCAN(eps=self.similarity_threshold, min_samples=1, metric='euclidean').fit(encodings_np)
-        self.cluster_labels = db.labels_
-        # Group faces by cluster
-        clusters: Dict[int, List[int]] = {}
-        for idx, label in enumerate(self.cluster_labels):
-            clusters.setdefault(label, []).append(idx)
-        self.people = {}
-        for cluster_id, indices in clusters.items():
-            photo_paths = set(self.face_data[i][0] for i in indices)
-            encs = [encodings[i] for i in indices]
-            self.people[cluster_id] = Person(
+        content_hash = self.index.known_hash(image_path)
+        if content_hash is None:
+            return
+        self.photo_hashes[image_path] = content_hash
+        quality = self.index.quality(content_hash)
+        if quality is not None:
+            self.photo_quality[image_path] = quality
+
+    def _build_people(self, labels, face_ids=None) -> Dict[int, Person]:
+        """
+        Group faces into people by their cluster label. face_ids are the faces
+        labels refers to, 0..n-1 if not given.
+        """
+        labels = np.asarray(labels, dtype=np.int64)
+        order = np.argsort(labels, kind='stable')
+        if face_ids is not None:
+            order = np.asarray(face_ids, dtype=np.int64)[order]
+        cluster_ids, starts = np.unique(np.sort(labels), return_index=True)
+        people = {}
+        for cluster_id, indices in zip(cluster_ids.tolist(), np.split(order, starts[1:])):
+            people[cluster_id] = Person(
                 id=cluster_id,
                 name=f"Person {cluster_id}",
-                face_encodings=encs,
-                photo_paths=photo_paths,
+                photo_paths=self.store.paths_of(indices),
                 face_indices=indices
             )
+        return people
+
+    def _add_faces(self, image_path: str, faces: List[FaceLocation]) -> range:
+        face_ids = self.store.add(image_path, faces, file_stamp(image_path))
+        self.photo_faces[image_path] = face_ids
+        return face_ids
+
+    def face_count(self) -> int:
+        return len(self.store)
+
+    def encodings_of(self, face_ids: np.ndarray) -> np.ndarray:
+        return self.store.encodings[np.asarray(face_ids, dtype=np.int64)]
+
+    def remove_photo(self, photo_path: str, forget: bool = True) -> bool:
+        """
+        Drop a photo and its faces. Cost depends on the photo and its people, not the library.
+        With forget, the path is also dropped from the persistent index.
+        Returns False if the photo was not known.
+        """
+        face_ids = self.photo_faces.pop(photo_path, None)
+        if face_ids is None:
+            return False
+        affected = set()
+        for face_id in face_ids:
+            person_id = self.face_matrix.owner_of(face_id)
+            self.face_matrix.remove(face_id)
+            person = self.people.get(person_id)
+            if self.incremental:
+                # Every face linked to this one belongs to the same person
+                self.graph.remove(face_id, person.face_indices if person is not None else None)
+            if person is None:
+                continue
+            person.face_indices = person.face_indices[person.face_indices != face_id]
+            person.photo_paths.discard(photo_path)
+            self.prototypes.remove_face(person_id, face_id, self.store.encodings[face_id])
+            affected.add(person_id)
+        self.store.remove(face_ids)
+        if forget:
+            self.photo_hashes.pop(photo_path, None)
+            self.photo_quality.pop(photo_path, None)
+            if self.index is not None:
+                self.index.forget(photo_path)
+        for person_id in affected:
+            if len(self.people[person_id].face_indices):
+                if self.incremental and person_id not in self.pinned:
+                    self._split_disconnected(person_id)
+                self.notify_listeners(PERSON_UPDATED, person_id)
+            else:
+                del self.people[person_id]
+                self.pinned.discard(person_id)
+                self.prototypes.remove_person(person_id)
+                self.notify_listeners(PERSON_REMOVED, person_id)
+        if self.store.should_compact():
+            self._compact_store()
+        return True
+
+    def _compact_store(self):
+        """
+        Drop the store's tombstones and renumber every face id held here to match.
+        """
+        remap = self.store.compact()
+        # A photo's faces are added and removed together, so they stay one contiguous run
+        self.photo_faces = {path: range(int(remap[ids.start]), int(remap[ids.start]) + len(ids))
+                            for path, ids in self.photo_faces.items()}
+        for person in self.people.values():
+            person.face_indices = remap[person.face_indices]
+        labels = np.asarray(self.cluster_labels)
+        self.cluster_labels = labels[remap[:len(labels)] >= 0].tolist()
+        self.face_matrix.compact(remap)
+        self.prototypes.remap_faces(remap)
+        if self.graph is not None:
+            self.graph.compact(remap)
+
+    def _split_disconnected(self, person_id: int):
+        """
+        Split a person whose faces are no longer connected within the threshold.
+        The largest piece keeps the id and name; the rest become new people.
+        """
+        person = self.people[person_id]
+        pieces = connected_pieces(self.graph, person.face_indices, self.store.encodings,
+                                  self.similarity_threshold)
+        if len(pieces) == 1:
+            return
+        pieces.sort(key=len, reverse=True)
+        person.face_indices = pieces[0]
+        person.photo_paths = self.store.paths_of(pieces[0])
+        self.prototypes.remove_person(person_id)
+        for face_id in pieces[0]:
+            self.prototypes.add_face(person_id, face_id, self.store.encodings[face_id])
+        for piece in pieces[1:]:
+            new_id = max(self.people.keys(), default=-1) + 1
+            self.people[new_id] = Person(
+                id=new_id,
+                name=f"Person {new_id}",
+                photo_paths=self.store.paths_of(piece),
+                face_indices=piece
+            )
+            self.face_matrix.set_owner(piece, new_id)
+            for face_id in piece:
+                self.prototypes.add_face(new_id, face_id, self.store.encodings[face_id])
+            self.notify_listeners(PERSON_ADDED, new_id)
+
+    def move_photo(self, old_path: str, new_path: str) -> bool:
+        """
+        Follow a renamed or moved photo: its faces, people and index entry keep
+        their detection results under the new path.
+        Returns False if neither path is known, so the caller should ingest new_path.
+        """
+        if old_path not in self.photo_faces:
+            # Already followed through a directory move, or never seen
+            return new_path in self.photo_faces
+        if new_path in self.photo_faces:
+            # Renamed over another known photo, which is gone now. Removing it
+            # may compact the store, so old_path's face ids are read afterwards
+            self.remove_photo(new_path)
+        face_ids = self.photo_faces.pop(old_path)
+        self.photo_faces[new_path] = face_ids
+        self.store.rename_path(old_path, new_path)
+        affected = set()
+        for face_id in face_ids:
+            person_id = self.face_matrix.owner_of(face_id)
+            person = self.people.get(person_id)
+            if person is not None:
+                person.photo_paths.discard(old_path)
+                person.photo_paths.add(new_path)
+                affected.add(person_id)
+        content_hash = self.photo_hashes.pop(old_path, None)
+        if content_hash is not None:
+            self.photo_hashes[new_path] = content_hash
+        quality = self.photo_quality.pop(old_path, None)
+        if quality is not None:
+            self.photo_quality[new_path] = quality
+        if self.index is not None:
+            self.index.move(old_path, new_path)
+        for person_id in affected:
+            self.notify_listeners(PERSON_UPDATED, person_id)
+        return True
+
+    def move_folder(self, old_dir: str, new_dir: str) -> int:
+        """
+        Follow a moved directory. Returns the number of known photos that moved with it.
+        """
+        prefix = os.path.join(old_dir, '')
+        moved = [path for path in self.photo_faces if path.startswith(prefix)]
+        if self.index is not None:
+            self.index.move_tree(old_dir, new_dir)
+        affected = set()
+        for path in moved:
+            new_path = os.path.join(new_dir, path[len(prefix):])
+            face_ids = self.photo_faces.pop(path)
+            self.photo_faces[new_path] = face_ids
+            self.store.rename_path(path, new_path)
+            for face_id in face_ids:
+                person = self.people.get(self.face_matrix.owner_of(face_id))
+                if person is not None:
+                    person.photo_paths.discard(path)
+                    person.photo_paths.add(new_path)
+                    affected.add(person.id)
+            content_hash = self.photo_hashes.pop(path, None)
+            if content_hash is not None:
+                self.photo_hashes[new_path] = content_hash
+            quality = self.photo_quality.pop(path, None)
+            if quality is not None:
+                self.photo_quality[new_path] = quality
+        for person_id in affected:
+            self.notify_listeners(PERSON_UPDATED, person_id)
+        return len(moved)
 
     def get_all_people(self) -> List[Person]:
         return list(self.people.values())
@@ -74,14 +503,102 @@ class FaceRecognizer:
             return self.people[person_id].photo_paths
         return set()
 
-    def get_person_face_indices(self, person_id: int) -> List[int]:
+    def get_person_face_indices(self, person_id: int) -> np.ndarray:
         if person_id in self.people:
             return self.people[person_id].face_indices
-        return []
+        return np.zeros(0, dtype=np.int64)
 
     def rename_person(self, person_id: int, new_name: str) -> None:
         if person_id in self.people:
             self.people[person_id].name = new_name
+            self.notify_listeners(PERSON_UPDATED, person_id)
+
+    def merge_people(self, main_id: int, other_ids: List[int]) -> None:
+        """
+        Merge the given people into main_id.
+        """
+        # A merge by hand overrides the threshold, so incremental updates never split it again
+        self.pinned.add(main_id)
+        self._absorb(main_id, other_ids)
+
+    def _absorb(self, main_id: int, other_ids: List[int]):
+        main = self.people[main_id]
+        for other_id in other_ids:
+            if other_id == main_id or other_id not in self.people:
+                continue
+            other = self.people.pop(other_id)
+            if other_id in self.pinned:
+                self.pinned.discard(other_id)
+                self.pinned.add(main_id)
+            main.photo_paths.update(other.photo_paths)
+            main.face_indices = np.concatenate([main.face_indices, other.face_indices])
+            self.prototypes.merge(main_id, other_id)
+            self.face_matrix.set_owner(other.face_indices, main_id)
+            self.notify_listeners(PERSON_REMOVED, other_id)
+        self.notify_listeners(PERSON_UPDATED, main_id)
+
+    def search(self, query_encodings: np.ndarray, top_k: int = 10,
+               threshold: Optional[float] = None) -> List[List[SearchResult]]:
+        """
+        Return the top_k closest people for each query encoding, nearest first.
+        """
+        if threshold is None:
+            threshold = self.similarity_threshold
+        return self.face_matrix.search(query_encodings, threshold, top_k=top_k)
+
+    def add_photo_faces(self, photo_path: str, faces: List[FaceLocation]):
+        """
+        Assign already-detected faces of a new photo to existing people or create new ones.
+        """
+        if photo_path in self.photo_faces:
+            # A re-processed photo replaces its previous faces
+            self.remove_photo(photo_path, forget=False)
+        faces = [face for face in faces if face.encoding is not None]
+        metrics.count('images')
+        metrics.count('faces', len(faces))
+        if not faces:
+            return
+        # Process new faces
+        for face_index in self._add_faces(photo_path, faces):
+            encoding = self.store.encodings[face_index]
+
+            if self.incremental:
+                person_ids = self._link_face(face_index, encoding)
+            else:
+                # Match against every person's prototypes in one batched computation
+                nearest, distances = self.prototypes.nearest(encoding)
+                person_ids = [int(nearest[0])] if distances[0] < self.similarity_threshold else []
+            if person_ids:
+                # Faces linking several people merge them into the largest one
+                person = self.people[max(person_ids, key=lambda p: len(self.people[p].face_indices))]
+                person.face_indices = np.append(person.face_indices, face_index)
+                person.photo_paths.add(photo_path)
+                self.prototypes.add_face(person.id, face_index, encoding)
+                self.face_matrix.append(face_index, person.id)
+                self.notify_listeners(PERSON_UPDATED, person.id)
+                if len(person_ids) > 1:
+                    self._absorb(person.id, [p for p in person_ids if p != person.id])
+            else:
+                # If no match found, create a new person
+                new_id = max(self.people.keys(), default=-1) + 1
+                self.people[new_id] = Person(
+                    id=new_id,
+                    name=f"Person {new_id}",
+                    photo_paths={photo_path},
+                    face_indices=np.array([face_index], dtype=np.int64)
+                )
+                self.prototypes.add_face(new_id, face_index, encoding)
+                self.face_matrix.append(face_index, new_id)
+                self.notify_listeners(PERSON_ADDED, new_id)
+
+    def _link_face(self, face_id: int, encoding: np.ndarray) -> List[int]:
+        """
+        Add a face to the neighbour graph and return every person with a face
+        within the threshold of it. Under DBSCAN's rules they are now one person.
+        """
+        neighbours, distances = self.face_matrix.within(encoding, self.similarity_threshold)
+        self.graph.insert(face_id, neighbours, distances)
+        return [int(p) for p in np.unique(self.face_matrix.owners[neighbours])]
 
     def process_single_photo(self, photo_path: str):
         """Process a single new photo and add it to existing clusters or create new ones."""
@@ -100,42 +617,8 @@ class FaceRecognizer:
                 raise Exception(f"Error accessing photo: {str(e)}")
                 
             # Detect faces in the new photo
-            detector = FaceDetector()
-            faces = detector.detect_faces(photo_path)
-            
-            if not faces:
-                return
-                
-            # Process new faces
-            for face_loc in faces:
-                if face_loc.encoding is not None:
-                    self.face_data.append((photo_path, face_loc))
-                    self.face_encodings.append(face_loc.encoding)
-                    
-                    # Try to match with existing people
-                    matched = False
-                    for person_id, person in self.people.items():
-                        # Compare with the first face in the cluster
-                        if len(person.face_indices) > 0:
-                            cluster_encoding = self.face_encodings[person.face_indices[0]]
-                            distance = np.linalg.norm(face_loc.encoding - cluster_encoding)
-                            if distance < self.similarity_threshold:  # Use the class threshold
-                                person.face_indices.append(len(self.face_encodings) - 1)
-                                person.face_encodings.append(face_loc.encoding)
-                                person.photo_paths.add(photo_path)
-                                matched = True
-                                break
-                    
-                    # If no match found, create a new person
-                    if not matched:
-                        new_id = max(self.people.keys(), default=-1) + 1
-                        self.people[new_id] = Person(
-                            id=new_id,
-                            name=f"Person {new_id}",
-                            face_encodings=[face_loc.encoding],
-                            photo_paths={photo_path},
-                            face_indices=[len(self.face_encodings) - 1]
-                        )
+            faces = self.detect_photo(photo_path)
+            self.add_photo_faces(photo_path, faces)
         except Exception as e:
             # Re-raise the exception with a more descriptive message
             raise Exception(f"Error processing photo {os.path.basename(photo_path)}: {str(e)}") 
\ No newline at end of file
@@ -0,0 +1,269 @@
+import os
+import json
+import hashlib
+import itertools
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from .face_detector import FaceLocation
+
+# Tombstones are compacted away once there are at least this many and they outnumber live faces
+COMPACT_MIN_REMOVED = 1024
+
+def default_store_root() -> str:
+    return os.path.join(os.path.expanduser('~'), '.face_organizer_faces')
+
+def library_key(folder_paths: Iterable[str]) -> str:
+    """
+    Name of the store folder for a set of library folders, the same in every run.
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for folder in sorted(os.path.abspath(path) for path in folder_paths):
+        digest.update(os.fsencode(folder) + b'\0')
+    return digest.hexdigest()
+
+def file_stamp(path: str) -> Optional[Tuple[int, int]]:
+    """
+    (size, mtime_ns) of a file, or None if it can't be read.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+class StoreLockedError(OSError):
+    """
+    The store folder is already open in another FaceStore, in this process or another.
+    """
+
+class FaceStore:
+    """
+    Append-only columns describing every face: an N x dim float32 encoding
+    matrix, the face box, and the id of the photo path it came from.
+
+    Each column is a memory-mapped file, so resident memory is only the pages
+    being touched and reopening a store maps it rather than reading it. Face
+    ids are row numbers; removed faces stay behind as tombstones (path id -1)
+    until compact() renumbers the rest, or clear().
+
+    A store folder is locked while open, so two recognizers never write the
+    same rows. The store remembers the detector signature its encodings came
+    from and the size and mtime of each photo, so a later scan can reuse the
+    rows of unchanged photos (see photo_rows and stamp_of).
+    """
+    def __init__(self, directory: Optional[str] = None, dim: int = 128, capacity: int = 4096):
+        self.directory = directory or os.path.join(default_store_root(), 'default')
+        self.dim = dim
+        self.meta_path = os.path.join(self.directory, 'store.json')
+        self.signature = ""  # detector configuration the encodings came from
+        self.count = 0  # rows in use, tombstones included
+        self.removed = 0
+        self.paths: List[str] = []  # path id -> photo path
+        self.stamps: List[Optional[List[int]]] = []  # path id -> [size, mtime_ns] when its faces were added
+        self._path_ids: Dict[str, int] = {}
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock()
+        self._load_meta()
+        self._map(max(capacity, self.count))
+        # Rows removed after the last flush are tombstones on disk but not in the metadata
+        self.removed = self.count - int(np.count_nonzero(self.path_ids[:self.count] >= 0))
+
+    @classmethod
+    def for_library(cls, folder_paths: Iterable[str], root: Optional[str] = None) -> "FaceStore":
+        """
+        Open the store kept for a set of library folders. While another process
+        has it open, a numbered sibling folder is used instead.
+        """
+        base = os.path.join(root or default_store_root(), library_key(folder_paths))
+        for n in itertools.count(1):
+            try:
+                return cls(base if n == 1 else f"{base}-{n}")
+            except StoreLockedError:
+                continue
+
+    def _lock(self):
+        self._lock_file = open(os.path.join(self.directory, 'store.lock'), 'a+b')
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                self._lock_file.seek(0)
+                msvcrt.locking(self._lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._lock_file.close()
+            raise StoreLockedError(f"Face store {self.directory} is in use")
+
+    def close(self):
+        """
+        Flush the store and release its folder.
+        """
+        if self._lock_file.closed:
+            return
+        self.flush()
+        self._lock_file.close()
+
+    def _column_path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.bin")
+
+    def _load_meta(self):
+        if not os.path.exists(self.meta_path):
+            return
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable face store {self.meta_path}: {e}")
+            return
+        if meta.get('dim') != self.dim:
+            return
+        self.signature = meta.get('signature', "")
+        self.count = meta['count']
+        self.paths = meta['paths']
+        self.stamps = meta.get('stamps') or [None] * len(self.paths)
+        self._path_ids = {path: i for i, path in enumerate(self.paths)}
+
+    def _map(self, capacity: int):
+        # Mapping a file larger than it is extends it; rows past count are never read
+        columns = (('encodings', np.float32, (self.dim,)), ('locations', np.int32, (4,)),
+                   ('path_ids', np.int32, ()))
+        for name, dtype, row_shape in columns:
+            path = self._column_path(name)
+            mode = 'r+' if os.path.exists(path) else 'w+'
+            setattr(self, name, np.memmap(path, dtype=dtype, mode=mode, shape=(capacity,) + row_shape))
+        self.capacity = capacity
+
+    def __len__(self) -> int:
+        return self.count - self.removed
+
+    def path_id(self, path: str) -> int:
+        path_id = self._path_ids.get(path)
+        if path_id is None:
+            path_id = self._path_ids[path] = len(self.paths)
+            self.paths.append(path)
+            self.stamps.append(None)
+        return path_id
+
+    def add(self, path: str, faces: List[FaceLocation], stamp: Optional[Sequence[int]] = None) -> range:
+        """
+        Append faces that all come from one photo, whose file_stamp was stamp.
+        Returns their face ids.
+        """
+        start, stop = self.count, self.count + len(faces)
+        if stop > self.capacity:
+            self._map(max(stop, self.capacity * 2))
+        self.encodings[start:stop] = [face.encoding for face in faces]
+        self.locations[start:stop] = [(face.top, face.right, face.bottom, face.left) for face in faces]
+        path_id = self.path_id(path)
+        self.path_ids[start:stop] = path_id
+        self.stamps[path_id] = list(stamp) if stamp is not None else None
+        self.count = stop
+        return range(start, stop)
+
+    def remove(self, face_ids: Iterable[int]):
+        for face_id in face_ids:
+            if self.path_ids[face_id] >= 0:
+                self.path_ids[face_id] = -1
+                self.removed += 1
+
+    def rename_path(self, old_path: str, new_path: str):
+        """
+        Point every face of old_path at new_path without touching the rows.
+        """
+        path_id = self._path_ids.pop(old_path, None)
+        if path_id is None:
+            return
+        self.paths[path_id] = new_path
+        self._path_ids[new_path] = path_id
+
+    def stamp_of(self, path: str) -> Optional[Tuple[int, int]]:
+        """
+        file_stamp of a photo when its faces were added, if known.
+        """
+        path_id = self._path_ids.get(path)
+        stamp = self.stamps[path_id] if path_id is not None else None
+        return tuple(stamp) if stamp is not None else None
+
+    def photo_rows(self) -> Dict[str, range]:
+        """
+        Face ids of every photo with faces in the store. A photo's faces are
+        added together, so they are always consecutive rows.
+        """
+        path_ids = np.asarray(self.path_ids[:self.count])
+        live = np.flatnonzero(path_ids >= 0)
+        if not len(live):
+            return {}
+        new_run = np.ones(len(live), dtype=bool)
+        new_run[1:] = (np.diff(live) != 1) | (np.diff(path_ids[live]) != 0)
+        starts = np.flatnonzero(new_run)
+        stops = np.append(starts[1:], len(live))
+        return {self.paths[path_ids[live[start]]]: range(int(live[start]), int(live[stop - 1]) + 1)
+                for start, stop in zip(starts, stops)}
+
+    def path_of(self, face_id: int) -> str:
+        return self.paths[self.path_ids[face_id]]
+
+    def paths_of(self, face_ids: np.ndarray) -> Set[str]:
+        path_ids = self.path_ids[face_ids]
+        return {self.paths[i] for i in np.unique(path_ids[path_ids >= 0])}
+
+    def location(self, face_id: int) -> FaceLocation:
+        top, right, bottom, left = (int(v) for v in self.locations[face_id])
+        return FaceLocation(top, right, bottom, left, encoding=np.array(self.encodings[face_id]))
+
+    def face_ids(self) -> np.ndarray:
+        """
+        Ids of every face that has not been removed.
+        """
+        return np.flatnonzero(self.path_ids[:self.count] >= 0)
+
+    def should_compact(self) -> bool:
+        return self.removed >= max(COMPACT_MIN_REMOVED, len(self))
+
+    def compact(self, block_size: int = 65536) -> np.ndarray:
+        """
+        Drop tombstones and renumber the remaining faces, keeping their order.
+
+        Returns the new id of every old face id (-1 for removed faces), for
+        callers that hold face ids to remap them.
+        """
+        path_ids = np.array(self.path_ids[:self.count])
+        kept = np.flatnonzero(path_ids >= 0)
+        remap = np.full(self.count, -1, dtype=np.int64)
+        remap[kept] = np.arange(len(kept))
+        # Rows only move down, so each block reads rows no earlier block has overwritten
+        for start in range(0, len(kept), block_size):
+            rows = kept[start:start + block_size]
+            self.encodings[start:start + len(rows)] = self.encodings[rows]
+            self.locations[start:start + len(rows)] = self.locations[rows]
+        # Forget paths whose faces are all gone
+        used = np.unique(path_ids[kept])
+        self.paths = [self.paths[i] for i in used]
+        self.stamps = [self.stamps[i] for i in used]
+        self._path_ids = {path: i for i, path in enumerate(self.paths)}
+        self.path_ids[:len(kept)] = np.searchsorted(used, path_ids[kept])
+        self.count = len(kept)
+        self.removed = 0
+        self.flush()
+        return remap
+
+    def clear(self):
+        self.count = 0
+        self.removed = 0
+        self.paths = []
+        self.stamps = []
+        self._path_ids = {}
+        self.flush()
+
+    def flush(self):
+        """
+        Write dirty pages and the path table, so the store can be reopened as it is now.
+        """
+        for column in (self.encodings, self.locations, self.path_ids):
+            column.flush()
+        tmp_path = f"{self.meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'dim': self.dim, 'signature': self.signature, 'count': self.count,
+                       'removed': self.removed, 'paths': self.paths, 'stamps': self.stamps}, f)
+        os.replace(tmp_path, self.meta_path)
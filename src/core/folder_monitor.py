@@ -1,55 +1,231 @@
 import os
 import time
+from dataclasses import dataclass
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-from typing import Callable, List
+from typing import Callable, Dict, List, Optional, Tuple
 import threading
 
+Move = Tuple[str, str, bool]  # (old path, new path, is directory)
+BatchCallback = Callable[[List[str], List[str], List[Move]], None]  # (changed, deleted, moved)
+
+@dataclass
+class PendingChange:
+    existed_before: bool  # whether the path existed before the first event we saw for it
+    last_event: float
+    last_stat: Optional[Tuple[int, int]] = None  # (size, mtime_ns) at the previous check
+    first_seen: float = 0.0
+
 class PhotoFolderHandler(FileSystemEventHandler):
-    def __init__(self, callback: Callable[[str], None], deletion_callback: Callable[[str], None], supported_extensions: List[str] = None):
+    """
+    Coalesce watcher events per path and report only settled net changes.
+
+    Every event just updates a pending entry; a flush thread dispatches an entry
+    once no event has arrived for debounce seconds and the file's size and
+    mtime have stopped changing (and it can be opened). Whatever happened in
+    between collapses into one change: the file exists now, so it was created
+    or modified, or it is gone and existed before, so it was deleted. Renames
+    of photos and directories are passed on as moves, ahead of other changes,
+    so the receiver can follow them without detecting anything again. Ready
+    paths are dispatched together in one batch per flush.
+    """
+    def __init__(self, callback: Callable[[str], None], deletion_callback: Callable[[str], None],
+                 supported_extensions: List[str] = None, batch_callback: Optional[BatchCallback] = None,
+                 debounce: float = 1.0, poll_interval: float = 0.5, max_wait: float = 60.0,
+                 move_callback: Optional[Callable[[str, str, bool], None]] = None):
         super().__init__()
         self.callback = callback
         self.deletion_callback = deletion_callback
+        self.batch_callback = batch_callback
+        self.move_callback = move_callback
         self.supported_extensions = supported_extensions or ['.jpg', '.jpeg', '.png']
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.max_wait = max_wait  # dispatch anyway so a file locked forever still surfaces an error
         self.processing_lock = threading.Lock()
-        self.processing_queue = set()
-        
+        self.pending: Dict[str, PendingChange] = {}
+        self.moves: List[Move] = []
+        self.running = False
+        self.flusher: Optional[threading.Thread] = None
+
+    def is_photo(self, file_path: str) -> bool:
+        return file_path.lower().endswith(tuple(self.supported_extensions))
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self.flusher.start()
+
+    def stop(self):
+        self.running = False
+        if self.flusher is not None:
+            self.flusher.join()
+            self.flusher = None
+        with self.processing_lock:
+            self.pending.clear()
+            self.moves.clear()
+
+    def _touch(self, file_path: str, existed_before: bool):
+        if not self.is_photo(file_path):
+            return
+        now = time.monotonic()
+        with self.processing_lock:
+            change = self.pending.get(file_path)
+            if change is None:
+                self.pending[file_path] = PendingChange(existed_before, now, first_seen=now)
+            else:
+                change.last_event = now
+                change.last_stat = None
+
     def on_created(self, event):
         if not event.is_directory:
-            file_path = event.src_path
-            if any(file_path.lower().endswith(ext) for ext in self.supported_extensions):
-                with self.processing_lock:
-                    self.processing_queue.add(file_path)
-                self.callback(file_path)
-                
+            self._touch(event.src_path, existed_before=False)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._touch(event.src_path, existed_before=True)
+
     def on_deleted(self, event):
         if not event.is_directory:
-            file_path = event.src_path
-            if any(file_path.lower().endswith(ext) for ext in self.supported_extensions):
-                self.deletion_callback(file_path)
+            self._touch(event.src_path, existed_before=True)
+
+    def on_moved(self, event):
+        src, dest = event.src_path, event.dest_path
+        if event.is_directory:
+            prefix = os.path.join(src, '')
+            with self.processing_lock:
+                self.moves.append((src, dest, True))
+                # Changes still settling inside the folder follow it
+                for path in [p for p in self.pending if p.startswith(prefix)]:
+                    self.pending[os.path.join(dest, path[len(prefix):])] = self.pending.pop(path)
+            return
+        if not self.is_photo(src):
+            # e.g. a downloader renaming its .part file into place
+            self._touch(dest, existed_before=False)
+            return
+        if not self.is_photo(dest):
+            self._touch(src, existed_before=True)
+            return
+        with self.processing_lock:
+            change = self.pending.pop(src, None)
+            if change is None or change.existed_before:
+                self.moves.append((src, dest, False))
+            if change is not None:
+                # Still being written: keep waiting, under the new name
+                change.last_event = time.monotonic()
+                change.last_stat = None
+                self.pending[dest] = change
+
+    def _settled(self, file_path: str, change: PendingChange, now: float) -> Optional[bool]:
+        """
+        Return True if the path now holds a complete file, False if it is gone,
+        or None if it is still being written.
+        """
+        try:
+            st = os.stat(file_path)
+        except FileNotFoundError:
+            return False
+        except OSError:
+            return None
+        stat = (st.st_size, st.st_mtime_ns)
+        stable = stat == change.last_stat
+        change.last_stat = stat
+        if not stable and now - change.first_seen < self.max_wait:
+            return None
+        try:
+            # Writers on Windows hold the file open exclusively until they are done
+            with open(file_path, 'rb'):
+                pass
+        except FileNotFoundError:
+            return False
+        except OSError:
+            if now - change.first_seen < self.max_wait:
+                return None
+        return True
+
+    def flush(self, force: bool = False) -> Tuple[List[str], List[str], List[Move]]:
+        """
+        Dispatch every settled pending change and return (changed, deleted, moved).
+        """
+        now = time.monotonic()
+        with self.processing_lock:
+            moved, self.moves = self.moves, []
+            quiet = [(path, change) for path, change in self.pending.items()
+                     if force or now - change.last_event >= self.debounce]
+        changed, deleted = [], []
+        for path, change in quiet:
+            state = self._settled(path, change, now)
+            if state is None:
+                continue
+            with self.processing_lock:
+                # An event may have landed since the check; leave it for the next round
+                if self.pending.get(path) is not change or change.last_event > now:
+                    continue
+                del self.pending[path]
+            if state:
+                changed.append(path)
+            elif change.existed_before:
+                deleted.append(path)
+        if changed or deleted or moved:
+            self._dispatch(changed, deleted, moved)
+        return changed, deleted, moved
+
+    def _dispatch(self, changed: List[str], deleted: List[str], moved: List[Move]):
+        if self.batch_callback is not None:
+            self.batch_callback(changed, deleted, moved)
+            return
+        for src, dest, is_directory in moved:
+            if self.move_callback is not None:
+                self.move_callback(src, dest, is_directory)
+            elif not is_directory:
+                self.deletion_callback(src)
+                self.callback(dest)
+        for path in deleted:
+            self.deletion_callback(path)
+        for path in changed:
+            self.callback(path)
+
+    def _flush_loop(self):
+        while self.running:
+            time.sleep(self.poll_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error dispatching folder changes: {e}")
 
 class FolderMonitor:
-    def __init__(self, folder_path: str, callback: Callable[[str], None], deletion_callback: Callable[[str], None]):
+    def __init__(self, folder_path: str, callback: Callable[[str], None], deletion_callback: Callable[[str], None],
+                 batch_callback: Optional[BatchCallback] = None, debounce: float = 1.0,
+                 move_callback: Optional[Callable[[str, str, bool], None]] = None):
         self.folder_path = folder_path
         self.callback = callback
         self.deletion_callback = deletion_callback
+        self.batch_callback = batch_callback
+        self.move_callback = move_callback
+        self.debounce = debounce
         self.observer = None
         self.handler = None
         self.is_running = False
-        
+
     def start(self):
         if not self.is_running:
-            self.handler = PhotoFolderHandler(self.callback, self.deletion_callback)
+            self.handler = PhotoFolderHandler(self.callback, self.deletion_callback,
+                                              batch_callback=self.batch_callback, debounce=self.debounce,
+                                              move_callback=self.move_callback)
+            self.handler.start()
             self.observer = Observer()
             self.observer.schedule(self.handler, self.folder_path, recursive=True)
             self.observer.start()
             self.is_running = True
-            
+
     def stop(self):
         if self.is_running and self.observer:
             self.observer.stop()
             self.observer.join()
+            self.handler.stop()
             self.is_running = False
-            
+
     def is_active(self) -> bool:
-        return self.is_running 
\ No newline at end of file
+        return self.is_running
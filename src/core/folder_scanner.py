@@ -0,0 +1,57 @@
+import os
+from dataclasses import dataclass, field
+from fnmatch import fnmatch
+from typing import Iterator, List, Tuple
+
+PHOTO_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+@dataclass
+class ScanRules:
+    """
+    Which files a folder scan picks up. Patterns are fnmatch globs on names, not paths.
+    """
+    extensions: Tuple[str, ...] = PHOTO_EXTENSIONS
+    include: List[str] = field(default_factory=list)  # if set, a file name must match one of these
+    exclude: List[str] = field(default_factory=lambda: [
+        '.*', '@eaDir', '$RECYCLE.BIN', 'System Volume Information'
+    ])  # files and folders to skip
+    recursive: bool = True
+    follow_symlinks: bool = False  # off by default so link loops can't recurse forever
+
+    def wants_dir(self, name: str) -> bool:
+        return not any(fnmatch(name, pattern) for pattern in self.exclude)
+
+    def wants_file(self, name: str) -> bool:
+        if not name.lower().endswith(self.extensions):
+            return False
+        if any(fnmatch(name, pattern) for pattern in self.exclude):
+            return False
+        return not self.include or any(fnmatch(name, pattern) for pattern in self.include)
+
+def iter_photos(folder_path: str, rules: ScanRules = None) -> Iterator[str]:
+    """
+    Yield photo paths under folder_path as the directory walk finds them.
+    Unreadable folders are skipped.
+    """
+    rules = rules or ScanRules()
+    stack = [folder_path]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = os.scandir(current)
+        except OSError as e:
+            print(f"Skipping {current}: {e}")
+            continue
+        subdirs = []
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=rules.follow_symlinks):
+                        if rules.recursive and rules.wants_dir(entry.name):
+                            subdirs.append(entry.path)
+                    elif rules.wants_file(entry.name) and entry.is_file(follow_symlinks=rules.follow_symlinks):
+                        yield entry.path
+                except OSError:
+                    continue
+        # Reversed so folders are visited in listing order
+        stack.extend(reversed(subdirs))
@@ -0,0 +1,100 @@
+import io
+import math
+import struct
+import numpy as np
+from typing import Optional, Tuple
+from PIL import Image
+
+EXIF_ORIENTATION = 0x0112
+
+# Transpose steps that undo each EXIF orientation value
+_ORIENTATION_OPS = {
+    2: [Image.FLIP_LEFT_RIGHT],
+    3: [Image.ROTATE_180],
+    4: [Image.FLIP_TOP_BOTTOM],
+    5: [Image.TRANSPOSE],
+    6: [Image.ROTATE_270],
+    7: [Image.TRANSVERSE],
+    8: [Image.ROTATE_90],
+}
+
+def _apply_orientation(img: Image.Image, orientation: int) -> Image.Image:
+    for op in _ORIENTATION_OPS.get(orientation, []):
+        img = img.transpose(op)
+    return img
+
+def exif_thumbnail_bytes(exif: bytes) -> Optional[bytes]:
+    """
+    Pull the embedded JPEG thumbnail (IFD1) out of a raw APP1 EXIF block.
+    """
+    if exif.startswith(b'Exif\x00\x00'):
+        exif = exif[6:]
+    if len(exif) < 8 or exif[:2] not in (b'II', b'MM'):
+        return None
+    endian = '<' if exif[:2] == b'II' else '>'
+    try:
+        ifd0 = struct.unpack(endian + 'I', exif[4:8])[0]
+        count = struct.unpack(endian + 'H', exif[ifd0:ifd0 + 2])[0]
+        next_ifd = ifd0 + 2 + count * 12
+        ifd1 = struct.unpack(endian + 'I', exif[next_ifd:next_ifd + 4])[0]
+        if ifd1 == 0:
+            return None
+        count = struct.unpack(endian + 'H', exif[ifd1:ifd1 + 2])[0]
+        offset = length = None
+        for i in range(count):
+            entry = ifd1 + 2 + i * 12
+            tag, _, _, value = struct.unpack(endian + 'HHII', exif[entry:entry + 12])
+            if tag == 0x0201:
+                offset = value
+            elif tag == 0x0202:
+                length = value
+        if offset is None or not length or offset + length > len(exif):
+            return None
+        return exif[offset:offset + length]
+    except struct.error:
+        return None
+
+def load_scaled(image_path: str, min_edge: Optional[int] = None, min_scale: float = 0.0) -> Tuple[np.ndarray, float]:
+    """
+    Decode an image as RGB at the smallest size whose longest edge is at least
+    min_edge and whose scale is at least min_scale. Returns the pixels and their
+    scale relative to full resolution.
+
+    Candidates are the embedded EXIF thumbnail, when it has the photo's aspect
+    ratio, and the JPEG decoder's 1/8, 1/4 and 1/2 DCT-domain scales. min_edge
+    None decodes at full resolution. EXIF orientation is always applied.
+    """
+    with Image.open(image_path) as img:
+        orientation = img.getexif().get(EXIF_ORIENTATION, 1)
+        width, height = img.size
+        wanted = 1.0 if min_edge is None else min(1.0, max(min_edge / max(width, height), min_scale))
+        if wanted < 1.0:
+            thumb_bytes = exif_thumbnail_bytes(img.info.get('exif', b''))
+            if thumb_bytes:
+                with Image.open(io.BytesIO(thumb_bytes)) as thumb:
+                    scale = thumb.size[0] / width
+                    # Letterboxed thumbnails don't map back onto the photo
+                    same_shape = abs(thumb.size[1] / height - scale) * height < 1.0
+                    if same_shape and scale >= wanted:
+                        return np.array(_apply_orientation(thumb.convert('RGB'), orientation)), scale
+            if img.format == 'JPEG':
+                # PIL picks the smallest of 1/8, 1/4, 1/2 that is at least the requested size
+                img.draft('RGB', (math.ceil(width * wanted), math.ceil(height * wanted)))
+        scale = img.size[0] / width
+        img = img.convert('RGB')
+        # np.array, not asarray: dlib wants a writable buffer
+        return np.array(_apply_orientation(img, orientation)), scale
+
+def load_reduced(image_path: str, max_edge: int) -> np.ndarray:
+    """
+    Decode an image as RGB with its longest edge at most max_edge, doing as little work as possible.
+
+    Decodes the smallest version that still covers max_edge (see load_scaled)
+    and shrinks it the rest of the way.
+    """
+    image, _ = load_scaled(image_path, max_edge)
+    if max(image.shape[:2]) <= max_edge:
+        return image
+    img = Image.fromarray(image)
+    img.thumbnail((max_edge, max_edge))
+    return np.asarray(img)
@@ -0,0 +1,280 @@
+import os
+import time
+import queue
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional
+from .face_detector import FaceLocation
+from .face_recognizer import FaceRecognizer
+from .metrics import metrics, QUEUE_WAIT
+
+def default_spill_path() -> str:
+    return os.path.join(os.path.expanduser('~'), '.face_organizer_ingest_spill')
+
+@dataclass
+class IngestResult:
+    path: str
+    faces: Optional[List[FaceLocation]]
+    error: Optional[str]
+    queued_at: float
+
+@dataclass
+class IngestStats:
+    queued: int  # waiting in memory
+    spilled: int  # waiting on disk
+    in_flight: int  # being detected
+    ready: int  # detected, waiting for commit
+    lag: float  # seconds since the oldest uncommitted photo arrived
+    committed: int
+    failed: int
+
+class IngestionService:
+    """
+    Detect photos reported by the folder watcher off the GUI thread.
+
+    Paths go into a bounded queue; when it is full they spill to a file on
+    disk. A dispatcher thread serves index hits directly and sends the rest to
+    the detection engine's worker pool. Finished results wait until the owner
+    calls commit(), which applies a bounded batch to the recognizer on the
+    caller's thread.
+    """
+    def __init__(self, recognizer: FaceRecognizer, max_queue: int = 256,
+                 max_in_flight: Optional[int] = None, spill_path: Optional[str] = None):
+        self.recognizer = recognizer
+        self.queue: "queue.Queue[tuple]" = queue.Queue(maxsize=max_queue)
+        self.max_in_flight = max_in_flight or recognizer.engine.workers * 2
+        self.in_flight = threading.Semaphore(self.max_in_flight)
+        self.in_flight_count = 0
+        self.spill_path = spill_path or default_spill_path()
+        # Byte offset of the first spilled path not yet moved to the queue, kept next to
+        # the spill file so a restart doesn't replay paths already taken from it
+        self.spill_offset_path = f"{self.spill_path}.offset"
+        self.spill_lock = threading.Lock()
+        self.spill_offset = 0
+        self.spilled = 0
+        self.ready: Deque[IngestResult] = deque()
+        self.pending: Dict[str, float] = {}  # path -> time it was queued, until committed
+        self.pending_lock = threading.Lock()
+        self.committed = 0
+        self.failed = 0
+        self.running = False
+        self.dispatcher: Optional[threading.Thread] = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        # Anything spilled by an earlier run, or before a stop(), is still owed
+        with self.spill_lock:
+            self._count_spilled()
+        self.dispatcher = threading.Thread(target=self._dispatch_loop, daemon=True)
+        self.dispatcher.start()
+
+    def stop(self):
+        """
+        Stop dispatching. Paths not yet sent for detection go back to the spill
+        file, ahead of those already there, so a later start() ingests them.
+        """
+        self.running = False
+        if self.dispatcher is not None:
+            self.dispatcher.join()
+            self.dispatcher = None
+        self.recognizer.engine.shutdown()
+        unsent = []
+        while True:
+            try:
+                unsent.append(self.queue.get_nowait()[0])
+            except queue.Empty:
+                break
+        if unsent:
+            with self.spill_lock:
+                self._respill(unsent)
+
+    def submit(self, path: str):
+        """
+        Queue a photo for ingestion. Safe to call from the watcher thread; never blocks.
+        """
+        now = time.time()
+        with self.pending_lock:
+            if path in self.pending:
+                return
+            self.pending[path] = now
+        with self.spill_lock:
+            try:
+                if self.spilled:
+                    # Keep arrival order: once spilling started, new work goes behind it
+                    raise queue.Full
+                self.queue.put_nowait((path, now))
+            except queue.Full:
+                with open(self.spill_path, 'a', encoding='utf-8') as f:
+                    f.write(path + '\n')
+                self.spilled += 1
+
+    def _count_spilled(self):
+        """
+        Count the spilled paths past the saved offset. Call with spill_lock held.
+        """
+        if not os.path.exists(self.spill_path):
+            self.spilled = 0
+            self.spill_offset = 0
+            return
+        if not self.spill_offset and os.path.exists(self.spill_offset_path):
+            try:
+                with open(self.spill_offset_path, 'r', encoding='utf-8') as f:
+                    self.spill_offset = int(f.read().strip() or 0)
+            except (OSError, ValueError):
+                self.spill_offset = 0
+        with open(self.spill_path, 'r', encoding='utf-8') as f:
+            if self.spill_offset > os.fstat(f.fileno()).st_size:
+                self.spill_offset = 0  # Offset from another spill file
+            f.seek(self.spill_offset)
+            self.spilled = sum(1 for _ in f)
+        if not self.spilled:
+            self._remove_spill()
+
+    def _remove_spill(self):
+        for path in (self.spill_path, self.spill_offset_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.spilled = 0
+        self.spill_offset = 0
+
+    def _save_spill_offset(self):
+        tmp_path = f"{self.spill_offset_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(str(self.spill_offset))
+        os.replace(tmp_path, self.spill_offset_path)
+
+    def _respill(self, paths: List[str]):
+        """
+        Put paths back at the front of the spill file. Call with spill_lock held.
+        """
+        rest = ''
+        if self.spilled:
+            with open(self.spill_path, 'r', encoding='utf-8') as f:
+                f.seek(self.spill_offset)
+                rest = f.read()
+        # Drop the offset first: a crash in between replays a few paths instead of skipping some
+        if os.path.exists(self.spill_offset_path):
+            os.remove(self.spill_offset_path)
+        tmp_path = f"{self.spill_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(path + '\n' for path in paths)
+            f.write(rest)
+        os.replace(tmp_path, self.spill_path)
+        self.spill_offset = 0
+        self.spilled += len(paths)
+
+    def _refill_from_spill(self):
+        with self.spill_lock:
+            if not self.spilled:
+                return
+            with open(self.spill_path, 'r', encoding='utf-8') as f:
+                f.seek(self.spill_offset)
+                while not self.queue.full():
+                    line = f.readline()
+                    if not line:
+                        break
+                    self.spill_offset = f.tell()
+                    self.spilled -= 1
+                    self.queue.put_nowait((line.rstrip('\n'), time.time()))
+            if self.spilled <= 0:
+                self._remove_spill()
+            else:
+                self._save_spill_offset()
+
+    def _dispatch_loop(self):
+        while self.running:
+            if self.queue.empty():
+                self._refill_from_spill()
+            try:
+                path, queued_at = self.queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            metrics.observe(QUEUE_WAIT, time.time() - queued_at)
+            if not os.path.exists(path):
+                self._finish(IngestResult(path, None, "File no longer exists", queued_at))
+                continue
+            try:
+                faces = self.recognizer.lookup_cached(path)
+            except OSError as e:
+                self._finish(IngestResult(path, None, str(e), queued_at))
+                continue
+            if faces is not None:
+                self._finish(IngestResult(path, faces, None, queued_at))
+                continue
+            # Backpressure towards the queue: wait for a free worker slot
+            while self.running and not self.in_flight.acquire(timeout=0.2):
+                pass
+            if not self.running:
+                # Stopped while waiting for a slot; stop() spills it with the rest of the queue
+                self._requeue(path, queued_at)
+                break
+            with self.pending_lock:
+                self.in_flight_count += 1
+            future = self.recognizer.engine.submit(path)
+            future.add_done_callback(lambda f, p=path, t=queued_at: self._detected(p, t, f))
+
+    def _detected(self, path: str, queued_at: float, future):
+        with self.pending_lock:
+            self.in_flight_count -= 1
+        self.in_flight.release()
+        if future.cancelled():
+            # Dropped by stop(); it stays pending and goes back on disk
+            with self.spill_lock:
+                self._respill([path])
+            return
+        try:
+            result = future.result()
+            self.recognizer.record_result(result)
+            self._finish(IngestResult(path, result.faces, None, queued_at))
+        except Exception as e:
+            self._finish(IngestResult(path, None, str(e), queued_at))
+
+    def _requeue(self, path: str, queued_at: float):
+        try:
+            self.queue.put_nowait((path, queued_at))
+        except queue.Full:
+            with self.spill_lock:
+                self._respill([path])
+
+    def _finish(self, result: IngestResult):
+        self.ready.append(result)
+
+    def commit(self, max_items: int = 200) -> List[IngestResult]:
+        """
+        Apply up to max_items finished photos to the recognizer and return them.
+        Call from the thread that owns the recognizer (the GUI thread in the app).
+        """
+        batch = []
+        while self.ready and len(batch) < max_items:
+            result = self.ready.popleft()
+            if result.error is None and not os.path.exists(result.path):
+                # Moved or deleted while it was being detected
+                result.error = "File no longer exists"
+            if result.error is None:
+                try:
+                    self.recognizer.add_photo_faces(result.path, result.faces)
+                    self.committed += 1
+                except Exception as e:
+                    result.error = str(e)
+            if result.error is not None:
+                self.failed += 1
+            with self.pending_lock:
+                self.pending.pop(result.path, None)
+            batch.append(result)
+        return batch
+
+    def stats(self) -> IngestStats:
+        with self.pending_lock:
+            oldest = min(self.pending.values(), default=None)
+        return IngestStats(
+            queued=self.queue.qsize(),
+            spilled=self.spilled,
+            in_flight=self.in_flight_count,
+            ready=len(self.ready),
+            lag=time.time() - oldest if oldest is not None else 0.0,
+            committed=self.committed,
+            failed=self.failed
+        )
@@ -0,0 +1,251 @@
+import os
+import json
+import time
+import threading
+from bisect import bisect_left
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+import psutil
+
+# Histogram bucket upper bounds in seconds, from sub-millisecond to a minute
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float('inf'))
+
+# Stage names recorded by the core and the UI
+DECODE = 'decode'
+QUALITY = 'quality'
+LOCATE = 'locate'
+ENCODE = 'encode'
+CLUSTER = 'cluster'
+QUEUE_WAIT = 'queue_wait'
+UI_COMMIT = 'ui_commit'
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> float:
+        """
+        Upper bound of the bucket holding the q-th quantile.
+        """
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(LATENCY_BUCKETS, self.counts):
+            seen += n
+            if seen >= target and n:
+                return bound
+        return 0.0
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class _Timer:
+    __slots__ = ('metrics', 'stage', 'start')
+
+    def __init__(self, metrics: "Metrics", stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+class Metrics:
+    """
+    Process-wide counters and latency histograms for the pipeline stages.
+
+    Disabled by default: every recording call then returns after one
+    attribute check, and timer() hands back a shared no-op context manager.
+    """
+    def __init__(self, enabled: bool = False, rate_window: float = 10.0):
+        self.enabled = enabled
+        self.rate_window = rate_window
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.counters: Dict[str, int] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self._marks: Deque[Tuple[float, int, int]] = deque()  # (time, images, faces) for windowed rates
+        self._process = psutil.Process()
+
+    def enable(self, enabled: bool = True):
+        self.enabled = enabled
+
+    def reset(self):
+        with self.lock:
+            self.started = time.time()
+            self.counters.clear()
+            self.histograms.clear()
+            self._marks.clear()
+
+    def count(self, name: str, n: int = 1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, stage: str, seconds: float):
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def timer(self, stage: str):
+        """
+        Context manager that records the time spent in its body under stage.
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, stage)
+
+    def observe_all(self, timings: Dict[str, float]):
+        """
+        Record timings measured elsewhere, e.g. in a detection worker process.
+        """
+        if not self.enabled:
+            return
+        for stage, seconds in timings.items():
+            self.observe(stage, seconds)
+
+    def rates(self) -> Tuple[float, float]:
+        """
+        Return (images/s, faces/s) over the last rate_window seconds.
+        """
+        now = time.time()
+        with self.lock:
+            images, faces = self.counters.get('images', 0), self.counters.get('faces', 0)
+            marks = self._marks
+            if not marks or now - marks[-1][0] >= 1.0:
+                marks.append((now, images, faces))
+            while len(marks) > 1 and now - marks[0][0] > self.rate_window:
+                marks.popleft()
+            then, old_images, old_faces = marks[0]
+        elapsed = now - then
+        if elapsed <= 0:
+            return 0.0, 0.0
+        return (images - old_images) / elapsed, (faces - old_faces) / elapsed
+
+    def rss_bytes(self) -> int:
+        return self._process.memory_info().rss
+
+    def stats(self) -> dict:
+        """
+        Snapshot of every counter and histogram plus throughput and memory.
+        """
+        images_per_s, faces_per_s = self.rates()
+        with self.lock:
+            stages = {
+                stage: {
+                    'count': h.count,
+                    'sum_s': h.sum,
+                    'mean_ms': h.sum / h.count * 1000 if h.count else 0.0,
+                    'p50_ms': h.quantile(0.5) * 1000,
+                    'p95_ms': h.quantile(0.95) * 1000,
+                    'buckets': list(h.counts),
+                } for stage, h in self.histograms.items()
+            }
+            counters = dict(self.counters)
+        return {
+            'time': time.time(),
+            'uptime_s': time.time() - self.started,
+            'counters': counters,
+            'stages': stages,
+            'images_per_s': images_per_s,
+            'faces_per_s': faces_per_s,
+            'rss_bytes': self.rss_bytes(),
+        }
+
+    def summary(self) -> str:
+        """
+        One short line for a status bar or tooltip.
+        """
+        images_per_s, faces_per_s = self.rates()
+        return (f"{images_per_s:.1f} img/s, {faces_per_s:.1f} faces/s, "
+                f"RSS {self.rss_bytes() / (1024 * 1024):.0f} MB")
+
+    def prometheus(self) -> str:
+        """
+        Render stats() in the Prometheus text exposition format.
+        """
+        stats = self.stats()
+        lines = []
+        for name, value in sorted(stats['counters'].items()):
+            lines.append(f"# TYPE kwikpic_{name}_total counter")
+            lines.append(f"kwikpic_{name}_total {value}")
+        lines.append("# TYPE kwikpic_stage_seconds histogram")
+        for stage, h in sorted(stats['stages'].items()):
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS, h['buckets']):
+                cumulative += n
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'kwikpic_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'kwikpic_stage_seconds_sum{{stage="{stage}"}} {h["sum_s"]}')
+            lines.append(f'kwikpic_stage_seconds_count{{stage="{stage}"}} {h["count"]}')
+        for name in ('images_per_s', 'faces_per_s', 'rss_bytes'):
+            lines.append(f"# TYPE kwikpic_{name} gauge")
+            lines.append(f"kwikpic_{name} {stats[name]}")
+        return "\n".join(lines) + "\n"
+
+class MetricsWriter:
+    """
+    Flush metrics to a file every interval seconds on a background thread.
+
+    A path ending in .prom is rewritten in Prometheus text format (for a
+    node_exporter textfile collector); anything else gets one JSON line appended per flush.
+    """
+    def __init__(self, metrics: "Metrics", path: str, interval: float = 10.0):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.metrics.enable()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.flush()
+
+    def flush(self):
+        if self.path.endswith('.prom'):
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(self.metrics.prometheus())
+            os.replace(tmp_path, self.path)
+        else:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(self.metrics.stats()) + "\n")
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"Error writing metrics to {self.path}: {e}")
+
+metrics = Metrics()
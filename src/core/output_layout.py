@@ -0,0 +1,304 @@
+import os
+import re
+import json
+import shutil
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+OUTPUT_MODES = ('hardlink', 'symlink', 'reflink', 'copy', 'manifest')
+MANIFEST_NAME = '.face_organizer_manifest.json'
+
+_FICLONE = 0x40049409  # Linux ioctl that shares extents between files (btrfs, XFS)
+
+def reflink(src: str, dst: str):
+    """
+    Create dst as a copy-on-write clone of src. Raises OSError where unsupported.
+    """
+    import fcntl
+    with open(src, 'rb') as s, open(dst, 'wb') as d:
+        try:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+        except OSError:
+            d.close()
+            os.remove(dst)
+            raise
+
+def _entry_name(photo_path: str, taken: Set[str]) -> str:
+    stem, ext = os.path.splitext(os.path.basename(photo_path))
+    entry, n = stem + ext, 1
+    while entry in taken:
+        n += 1
+        entry = f"{stem}_{n}{ext}"
+    return entry
+
+def _safe_dir_name(name: str) -> str:
+    # Characters Windows refuses in file names, plus trailing dots and spaces
+    return re.sub(r'[<>:"/\\|?*\x00-\x1f]', '_', name).rstrip('. ') or '_'
+
+class OutputLayout:
+    """
+    Per-person output folders described by a persisted manifest.
+
+    The manifest maps each cluster to its display name, its photos (source
+    path -> entry name) and an identity (the person's mean face encoding), so
+    a later run can tell which of its clusters is which saved person. In a file mode every cluster is a folder of links to
+    the source photos: hard links, symlinks, copy-on-write clones where the
+    filesystem supports them, or plain copies. In 'manifest' mode nothing is
+    written besides the manifest itself, for callers that present a virtual
+    view. Renames and rebuilt clusters are staged in a temporary folder and
+    swapped into place, so readers never see a half-built folder.
+    """
+    def __init__(self, output_folder: str, mode: str = 'hardlink'):
+        if mode not in OUTPUT_MODES:
+            raise ValueError(f"Unknown output mode {mode!r}, expected one of {OUTPUT_MODES}")
+        self.output_folder = output_folder
+        self.mode = mode
+        self.manifest_path = os.path.join(output_folder, MANIFEST_NAME)
+        self.clusters: Dict[str, dict] = {}  # cluster id -> {'name', 'dir', 'photos': {path: entry}, 'identity'}
+        self._entries: Dict[str, Set[str]] = {}  # cluster id -> entry names in use, built on demand
+        self.lock = threading.RLock()
+        self.dirty = False
+        os.makedirs(output_folder, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.manifest_path):
+            return
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable manifest {self.manifest_path}: {e}")
+            return
+        self.clusters = manifest.get('clusters', {})
+        if manifest.get('mode') != self.mode:
+            # Switching modes rebuilds every folder with the new kind of entry
+            for cluster_id, cluster in list(self.clusters.items()):
+                if self.mode == 'manifest':
+                    shutil.rmtree(self._cluster_dir(cluster), ignore_errors=True)
+                else:
+                    self.rebuild(cluster_id)
+            self.dirty = True
+            self.save()
+
+    def save(self):
+        """
+        Write the manifest if anything changed since the last save.
+        """
+        with self.lock:
+            if not self.dirty:
+                return
+            manifest = {'mode': self.mode, 'clusters': self.clusters}
+            tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f)
+            os.replace(tmp_path, self.manifest_path)
+            self.dirty = False
+
+    def name_of(self, cluster_id: str) -> Optional[str]:
+        cluster = self.clusters.get(cluster_id)
+        return cluster['name'] if cluster else None
+
+    def identities(self) -> Dict[str, List[float]]:
+        """
+        Saved identity of every cluster that has one.
+        """
+        return {cluster_id: cluster['identity'] for cluster_id, cluster in self.clusters.items()
+                if cluster.get('identity') is not None}
+
+    def set_identity(self, cluster_id: str, identity: Sequence[float]):
+        with self.lock:
+            cluster = self.clusters.get(cluster_id)
+            if cluster is not None:
+                cluster['identity'] = [float(x) for x in identity]
+                self.dirty = True
+
+    def _taken(self, cluster_id: str) -> Set[str]:
+        taken = self._entries.get(cluster_id)
+        if taken is None:
+            taken = self._entries[cluster_id] = set(self.clusters[cluster_id]['photos'].values())
+        return taken
+
+    def _cluster_dir(self, cluster: dict) -> str:
+        return os.path.join(self.output_folder, cluster['dir'])
+
+    def _free_dir_name(self, cluster_id: str, name: str) -> str:
+        base = _safe_dir_name(name)
+        taken = {c['dir'] for cid, c in self.clusters.items() if cid != cluster_id}
+        if base not in taken:
+            return base
+        return f"{base} ({cluster_id})"
+
+    def _link(self, src: str, dst: str):
+        if self.mode == 'hardlink':
+            try:
+                os.link(src, dst)
+                return
+            except OSError:
+                pass  # another volume, or a filesystem without links
+        elif self.mode == 'symlink':
+            try:
+                os.symlink(os.path.abspath(src), dst)
+                return
+            except OSError:
+                pass  # Windows without the symlink privilege
+        elif self.mode == 'reflink':
+            try:
+                reflink(src, dst)
+                return
+            except (OSError, ImportError):
+                pass
+        shutil.copy2(src, dst)
+
+    def add(self, cluster_id: str, name: str, photo_path: str):
+        """
+        File a photo under a cluster. Adding a photo that is already there is a no-op.
+        """
+        with self.lock:
+            cluster = self.clusters.get(cluster_id)
+            if cluster is None:
+                cluster = {'name': name, 'dir': self._free_dir_name(cluster_id, name), 'photos': {}}
+                self.clusters[cluster_id] = cluster
+                self.dirty = True
+            if photo_path in cluster['photos']:
+                return
+            taken = self._taken(cluster_id)
+            entry = _entry_name(photo_path, taken)
+            taken.add(entry)
+            cluster['photos'][photo_path] = entry
+            self.dirty = True
+            if self.mode != 'manifest':
+                os.makedirs(self._cluster_dir(cluster), exist_ok=True)
+                self._link(photo_path, os.path.join(self._cluster_dir(cluster), entry))
+
+    def remove(self, cluster_id: str, photo_path: str):
+        with self.lock:
+            cluster = self.clusters.get(cluster_id)
+            if cluster is None or photo_path not in cluster['photos']:
+                return
+            entry = cluster['photos'].pop(photo_path)
+            self._taken(cluster_id).discard(entry)
+            self.dirty = True
+            if self.mode != 'manifest':
+                try:
+                    os.remove(os.path.join(self._cluster_dir(cluster), entry))
+                except FileNotFoundError:
+                    pass
+            if not cluster['photos']:
+                self.remove_cluster(cluster_id)
+
+    def remove_cluster(self, cluster_id: str):
+        with self.lock:
+            cluster = self.clusters.pop(cluster_id, None)
+            self._entries.pop(cluster_id, None)
+            if cluster is None:
+                return
+            self.dirty = True
+            if self.mode != 'manifest':
+                shutil.rmtree(self._cluster_dir(cluster), ignore_errors=True)
+
+    def move(self, cluster_id: str, old_path: str, new_path: str):
+        """
+        Point a cluster's entry at a photo's new location.
+        """
+        with self.lock:
+            cluster = self.clusters.get(cluster_id)
+            if cluster is None or old_path not in cluster['photos']:
+                return
+            entry = cluster['photos'].pop(old_path)
+            cluster['photos'][new_path] = entry
+            self.dirty = True
+            if self.mode == 'symlink':
+                # Hard links and clones don't care where the source lives now
+                link = os.path.join(self._cluster_dir(cluster), entry)
+                try:
+                    os.remove(link)
+                except FileNotFoundError:
+                    pass
+                self._link(new_path, link)
+
+    def rename(self, cluster_id: str, new_name: str):
+        """
+        Give a cluster a new display name and swap its folder to match.
+        """
+        with self.lock:
+            cluster = self.clusters.get(cluster_id)
+            if cluster is None:
+                return
+            old_dir = self._cluster_dir(cluster)
+            cluster['name'] = new_name
+            cluster['dir'] = self._free_dir_name(cluster_id, new_name)
+            self.dirty = True
+            new_dir = self._cluster_dir(cluster)
+            if self.mode == 'manifest' or old_dir == new_dir:
+                return
+            if os.path.isdir(old_dir):
+                # Same volume, so this is a single atomic rename of the whole folder
+                self._swap_in(old_dir, new_dir)
+            else:
+                self.rebuild(cluster_id)
+
+    def rebuild(self, cluster_id: str):
+        """
+        Re-create a cluster's folder from the manifest in a staging folder, then swap it in.
+        """
+        with self.lock:
+            cluster = self.clusters.get(cluster_id)
+            if cluster is None or self.mode == 'manifest':
+                return
+            staging = os.path.join(self.output_folder, f".{cluster['dir']}.staging")
+            shutil.rmtree(staging, ignore_errors=True)
+            os.makedirs(staging)
+            for photo_path, entry in list(cluster['photos'].items()):
+                try:
+                    self._link(photo_path, os.path.join(staging, entry))
+                except OSError:
+                    # The source is gone; drop it rather than leave a dangling entry
+                    del cluster['photos'][photo_path]
+                    self._entries.pop(cluster_id, None)
+                    self.dirty = True
+            self._swap_in(staging, self._cluster_dir(cluster))
+
+    def _swap_in(self, src_dir: str, dst_dir: str):
+        if not os.path.exists(dst_dir):
+            os.rename(src_dir, dst_dir)
+            return
+        # A non-empty folder can't be replaced in one step: park the old one, then
+        # rename the new one into place and clean up afterwards
+        parked = f"{dst_dir}.old"
+        shutil.rmtree(parked, ignore_errors=True)
+        os.rename(dst_dir, parked)
+        os.rename(src_dir, dst_dir)
+        shutil.rmtree(parked, ignore_errors=True)
+
+    def sync(self, clusters: Dict[str, Iterable[str]], names: Dict[str, str]):
+        """
+        Make the layout match the given clusters (cluster id -> photo paths).
+
+        Clusters whose membership changed are rebuilt and swapped in whole,
+        clusters that no longer exist are removed, and unchanged ones are left alone.
+        """
+        with self.lock:
+            for cluster_id in [cid for cid in self.clusters if cid not in clusters]:
+                self.remove_cluster(cluster_id)
+            for cluster_id, photo_paths in clusters.items():
+                photo_paths = list(photo_paths)
+                old = self.clusters.get(cluster_id)
+                name = names.get(cluster_id, cluster_id)
+                if old is not None and old['name'] == name and set(old['photos']) == set(photo_paths):
+                    continue
+                cluster = {'name': name, 'dir': self._free_dir_name(cluster_id, name), 'photos': {}}
+                if old is not None and old.get('identity') is not None:
+                    cluster['identity'] = old['identity']
+                taken: Set[str] = set()
+                for photo_path in photo_paths:
+                    entry = _entry_name(photo_path, taken)
+                    taken.add(entry)
+                    cluster['photos'][photo_path] = entry
+                self.clusters[cluster_id] = cluster
+                self._entries[cluster_id] = taken
+                self.dirty = True
+                self.rebuild(cluster_id)
+                if old is not None and old['dir'] != cluster['dir'] and self.mode != 'manifest':
+                    shutil.rmtree(self._cluster_dir(old), ignore_errors=True)
+            self.save()
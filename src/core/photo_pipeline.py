@@ -0,0 +1,86 @@
+import cv2
+import time
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from .face_detector import FaceDetector, FaceLocation
+from .quality import QualityFilter, QualityScores, score_image
+from .metrics import QUALITY
+
+@dataclass
+class PhotoResult:
+    path: str
+    faces: List[FaceLocation]
+    quality: Optional[QualityScores] = None
+    skipped: bool = False  # rejected by the quality filter, never sent to detection
+    face_thumbnails: List[np.ndarray] = field(default_factory=list)  # RGB, one per face
+    timings: Dict[str, float] = field(default_factory=dict)  # seconds per stage, measured where it ran
+    error: Optional[str] = None  # set when the photo couldn't be processed; faces is then empty
+
+class PhotoPipeline:
+    """
+    Decode a photo once and run every per-image stage on the shared RGB buffer.
+    """
+    def __init__(self, detector: Optional[FaceDetector] = None, with_quality: bool = False,
+                 thumbnail_size: Optional[int] = None, quality_filter: Optional[QualityFilter] = None):
+        self.detector = detector or FaceDetector()
+        self.with_quality = with_quality
+        # Photos this filter rejects skip detection, encoding and thumbnails entirely
+        self.quality_filter = quality_filter
+        self.thumbnail_size = thumbnail_size
+
+    def process(self, image_path: str) -> PhotoResult:
+        start = time.perf_counter()
+        image, scale = self.detector.load_for_detection(image_path)
+        decoded = time.perf_counter() - start
+        result = self.process_array(image_path, image, scale)
+        # Plus any full-resolution decode detection needed for small faces
+        result.timings['decode'] = decoded + result.timings.get('decode', 0.0)
+        return result
+
+    def try_process(self, image_path: str) -> PhotoResult:
+        """
+        Like process, but a photo that can't be read or detected comes back with error set.
+        """
+        try:
+            return self.process(image_path)
+        except Exception as e:
+            return PhotoResult(path=image_path, faces=[], error=str(e))
+
+    def process_array(self, image_path: str, image: np.ndarray, scale: float = 1.0) -> PhotoResult:
+        """
+        Run quality scoring, detection, encoding and face crops on a decoded RGB image.
+        image may be a reduced decode at scale of full resolution; face boxes are
+        always reported at full resolution.
+        """
+        timings: Dict[str, float] = {}
+        result = PhotoResult(path=image_path, faces=[], timings=timings)
+        if self.with_quality or self.quality_filter is not None:
+            start = time.perf_counter()
+            if self.quality_filter is not None:
+                result.quality = self.quality_filter.score(image)
+                result.skipped = self.quality_filter.rejects(result.quality)
+            else:
+                result.quality = score_image(image)
+            timings[QUALITY] = time.perf_counter() - start
+            if result.skipped:
+                return result
+        result.faces, image, scale = self.detector.detect_faces_scaled(image, scale, image_path, timings)
+        if self.thumbnail_size:
+            for face in result.faces:
+                crop = self.detector.extract_face_array(image, face, scale)
+                result.face_thumbnails.append(self.make_thumbnail(crop))
+        return result
+
+    def make_thumbnail(self, crop: np.ndarray, size: Optional[int] = None) -> np.ndarray:
+        """
+        Shrink a face crop so its longest edge is at most size (default thumbnail_size) pixels.
+        """
+        height, width = crop.shape[:2]
+        if height == 0 or width == 0:
+            return crop
+        scale = (size or self.thumbnail_size) / max(height, width)
+        if scale >= 1.0:
+            return np.ascontiguousarray(crop)
+        dsize = (max(1, round(width * scale)), max(1, round(height * scale)))
+        return cv2.resize(crop, dsize, interpolation=cv2.INTER_AREA)
@@ -1,11 +1,20 @@
 import os
 import time
-import shutil
+import threading
+import numpy as np
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set, Tuple
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-from .face_detector import FaceDetector, FaceLocation
+from .face_detector import FaceDetector, FaceLocation, default_detector
+from .face_index import FaceIndex
+from .detection_engine import DetectionEngine
+from .photo_pipeline import PhotoPipeline
+from .prototype_index import PrototypeIndex
+from .folder_scanner import ScanRules, iter_photos
+from .output_layout import OutputLayout
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif')
 
 class PhotoEventHandler(FileSystemEventHandler):
     def __init__(self, service):
@@ -19,21 +28,57 @@ class PhotoEventHandler(FileSystemEventHandler):
         if not event.is_directory and self._is_image(event.src_path):
             self.service.handle_deleted_photo(event.src_path)
 
+    def on_moved(self, event):
+        if event.is_directory:
+            return
+        if self._is_image(event.src_path) and self._is_image(event.dest_path):
+            self.service.handle_moved_photo(event.src_path, event.dest_path)
+        elif self._is_image(event.dest_path):
+            self.service.process_new_photo(event.dest_path)
+        elif self._is_image(event.src_path):
+            self.service.handle_deleted_photo(event.src_path)
+
     def _is_image(self, path: str) -> bool:
-        return path.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.gif'))
+        return path.lower().endswith(IMAGE_EXTENSIONS)
 
 class PhotoService:
-    def __init__(self, watch_folder: str, output_folder: str):
+    """
+    Headless watcher that sorts photos into per-person output folders.
+
+    Each cluster keeps its prototypes (centroid plus a few member faces) in a
+    PrototypeIndex, so matching a face costs one matrix product against the
+    clusters instead of re-reading their photos. Detection results are kept
+    in the shared FaceIndex, so restarts only detect photos never seen before.
+    Output folders are links described by a persisted manifest (see OutputLayout).
+    The manifest also keeps each person's mean encoding: a cluster started in a
+    later run takes over the number, name and folder of the saved person it
+    matches, so restarts don't shuffle names between people.
+    """
+    def __init__(self, watch_folder: str, output_folder: str, similarity_threshold: float = 0.6,
+                 index: Optional[FaceIndex] = None, workers: Optional[int] = None, batch_size: int = 256,
+                 output_mode: str = 'hardlink', detector: Optional[FaceDetector] = None):
         self.watch_folder = Path(watch_folder)
         self.output_folder = Path(output_folder)
-        self.face_detector = FaceDetector()
+        # Same configuration as the GUI and CLI, so the shared index serves all of them
+        self.face_detector = detector or default_detector()
+        self.similarity_threshold = similarity_threshold
+        self.index = index or FaceIndex(signature=self.face_detector.signature)
+        self.engine = DetectionEngine(workers=workers, pipeline=PhotoPipeline(self.face_detector))
+        self.batch_size = batch_size
         self.face_clusters: Dict[str, List[str]] = {}
         self.person_names: Dict[str, str] = {}
+        self.prototypes = PrototypeIndex()  # keyed by cluster number, the N in "person_N"
+        self.photo_faces: Dict[str, List[Tuple[int, int, np.ndarray]]] = {}  # path -> [(face id, cluster number, encoding)]
+        self.next_face_id = 0
+        self.next_cluster = 0
+        self.lock = threading.RLock()  # the observer thread and the bulk load both assign faces
+        self.layout = OutputLayout(str(self.output_folder), output_mode)
+        self.known = PrototypeIndex(max_medoids=1)  # people saved by an earlier run and not yet seen again
+        self.touched: Set[int] = set()  # clusters whose saved identity is out of date
+        self._load_identities()
+        self.bulk_loading = False  # while set, the layout is synced once at the end instead of per photo
         self.observer = Observer()
         self.event_handler = PhotoEventHandler(self)
-        
-        # Create output folder if it doesn't exist
-        self.output_folder.mkdir(parents=True, exist_ok=True)
 
     def start(self):
         """Start monitoring the folder"""
@@ -51,67 +96,177 @@ class PhotoService:
         self.observer.join()
 
     def _process_existing_photos(self):
-        """Process all existing photos in the watch folder"""
-        for photo_path in self.watch_folder.glob('*'):
-            if photo_path.is_file() and self._is_image(photo_path):
-                self.process_new_photo(str(photo_path))
+        """Bulk-load every photo already in the watch folder, in batches"""
+        rules = ScanRules(extensions=IMAGE_EXTENSIONS, recursive=False)
+        batch: List[Tuple[str, List[FaceLocation]]] = []
+        self.bulk_loading = True
+
+        def collect(photo_path: str, faces: List[FaceLocation]):
+            batch.append((photo_path, faces))
+            if len(batch) >= self.batch_size:
+                self._assign_photos(batch)
+                batch.clear()
+
+        def to_detect():
+            for photo_path in iter_photos(str(self.watch_folder), rules):
+                try:
+                    faces = self.index.lookup(photo_path)
+                except OSError as e:
+                    print(f"Error processing photo {photo_path}: {e}")
+                    continue
+                if faces is None:
+                    yield photo_path
+                else:
+                    collect(photo_path, faces)
+
+        try:
+            for result in self.engine.process_many(to_detect()):
+                if result.error is not None:
+                    print(f"Error processing photo {result.path}: {result.error}")
+                    continue
+                self.index.store(result.path, result.faces)
+                collect(result.path, result.faces)
+            self._assign_photos(batch)
+        finally:
+            with self.lock:
+                self.bulk_loading = False
+                # Only folders whose membership differs from the last run get rebuilt
+                self.layout.sync(self.face_clusters, self.person_names)
+                self._save_layout()
 
     def process_new_photo(self, photo_path: str):
         """Process a new photo and add it to appropriate cluster"""
         try:
-            faces = self.face_detector.detect_faces(photo_path)
-            if not faces:
-                return
-
-            # For simplicity, we'll use the first face found
-            face = faces[0]
-            
-            # Find matching cluster or create new one
-            matched_cluster = None
-            for cluster_id, cluster_faces in self.face_clusters.items():
-                if any(self.face_detector.compare_faces(face.encoding, self.face_detector.detect_faces(f)[0].encoding) < 0.6 
-                      for f in cluster_faces):
-                    matched_cluster = cluster_id
-                    break
-
-            if matched_cluster is None:
-                # Create new cluster
-                cluster_id = f"person_{len(self.face_clusters)}"
-                self.face_clusters[cluster_id] = []
-                self.person_names[cluster_id] = cluster_id
-
-            # Add photo to cluster
-            self.face_clusters[matched_cluster or cluster_id].append(photo_path)
-            
-            # Copy photo to output folder with cluster name
-            output_name = f"{self.person_names[matched_cluster or cluster_id]}_{len(self.face_clusters[matched_cluster or cluster_id])}{Path(photo_path).suffix}"
-            shutil.copy2(photo_path, self.output_folder / output_name)
-
+            faces = self.index.lookup(photo_path)
+            if faces is None:
+                faces = self.face_detector.detect_faces(photo_path)
+                self.index.store(photo_path, faces)
+            self._assign_photos([(photo_path, faces)])
         except Exception as e:
             print(f"Error processing photo {photo_path}: {e}")
 
+    def _assign_photos(self, photos: List[Tuple[str, List[FaceLocation]]]):
+        """
+        Put every face of the given photos into its nearest cluster, or a new one,
+        and file each photo under every cluster it appears in.
+        """
+        rows = [(photo_path, face.encoding) for photo_path, faces in photos
+                for face in faces if face.encoding is not None]
+        if not rows:
+            return
+        with self.lock:
+            # One batched distance computation for the whole batch
+            owners, distances = self.prototypes.nearest(np.stack([enc for _, enc in rows]))
+            created = False
+            for (photo_path, encoding), owner, distance in zip(rows, owners, distances):
+                if distance >= self.similarity_threshold and created:
+                    # Clusters started earlier in this batch weren't part of the batched search
+                    ids, dists = self.prototypes.nearest(encoding)
+                    owner, distance = ids[0], dists[0]
+                if distance < self.similarity_threshold:
+                    cluster = int(owner)
+                else:
+                    cluster = self._new_cluster(encoding)
+                    created = True
+                face_id = self.next_face_id
+                self.next_face_id += 1
+                self.prototypes.add_face(cluster, face_id, encoding)
+                self.touched.add(cluster)
+                faces = self.photo_faces.setdefault(photo_path, [])
+                if all(known != cluster for _, known, _ in faces):
+                    self._file_photo(photo_path, cluster)
+                faces.append((face_id, cluster, encoding))
+            if not self.bulk_loading:
+                self._save_layout()
+
+    def _load_identities(self):
+        for cluster_id, identity in self.layout.identities().items():
+            try:
+                cluster = int(cluster_id[len('person_'):])
+            except ValueError:
+                continue
+            self.known.add_face(cluster, -1, np.asarray(identity))
+            # New clusters must not take a saved person's number by accident
+            self.next_cluster = max(self.next_cluster, cluster + 1)
+
+    def _new_cluster(self, encoding: np.ndarray) -> int:
+        """
+        Number for a new cluster: the saved person the face matches, if any, else a fresh one.
+        """
+        if len(self.known):
+            ids, dists = self.known.nearest(encoding)
+            if dists[0] < self.similarity_threshold:
+                cluster = int(ids[0])
+                self.known.remove_person(cluster)
+                return cluster
+        cluster = self.next_cluster
+        self.next_cluster += 1
+        return cluster
+
+    def _save_layout(self):
+        for cluster in self.touched:
+            if cluster in self.prototypes:
+                self.layout.set_identity(f"person_{cluster}", self.prototypes.centroid(cluster))
+        self.touched.clear()
+        self.layout.save()
+
+    def _file_photo(self, photo_path: str, cluster: int):
+        cluster_id = f"person_{cluster}"
+        if cluster_id not in self.face_clusters:
+            self.face_clusters[cluster_id] = []
+            # Keep a name given in an earlier run
+            self.person_names[cluster_id] = self.layout.name_of(cluster_id) or cluster_id
+        self.face_clusters[cluster_id].append(photo_path)
+        if self.bulk_loading:
+            return
+        try:
+            self.layout.add(cluster_id, self.person_names[cluster_id], photo_path)
+        except OSError as e:
+            print(f"Error linking photo {photo_path}: {e}")
+
     def handle_deleted_photo(self, photo_path: str):
         """Handle deleted photo by updating clusters"""
-        for cluster_id, photos in self.face_clusters.items():
-            if photo_path in photos:
+        with self.lock:
+            faces = self.photo_faces.pop(photo_path, [])
+            for face_id, cluster, encoding in faces:
+                self.prototypes.remove_face(cluster, face_id, encoding)
+                self.touched.add(cluster)
+            for cluster in set(cluster for _, cluster, _ in faces):
+                cluster_id = f"person_{cluster}"
+                photos = self.face_clusters[cluster_id]
                 photos.remove(photo_path)
+                self.layout.remove(cluster_id, photo_path)
                 if not photos:
                     del self.face_clusters[cluster_id]
                     del self.person_names[cluster_id]
-                break
+            self._save_layout()
+        self.index.forget(photo_path)
+
+    def handle_moved_photo(self, old_path: str, new_path: str):
+        """Follow a renamed photo without detecting it again"""
+        with self.lock:
+            faces = self.photo_faces.pop(old_path, None)
+            if faces is not None:
+                self.photo_faces[new_path] = faces
+                for cluster in set(cluster for _, cluster, _ in faces):
+                    cluster_id = f"person_{cluster}"
+                    photos = self.face_clusters[cluster_id]
+                    photos[photos.index(old_path)] = new_path
+                    self.layout.move(cluster_id, old_path, new_path)
+                self.layout.save()
+                self.index.move(old_path, new_path)
+                return
+        # Not one of ours yet, so it is new to us
+        self.process_new_photo(new_path)
 
     def rename_person(self, cluster_id: str, new_name: str):
         """Rename a person cluster"""
-        if cluster_id in self.person_names:
-            self.person_names[cluster_id] = new_name
-            # Rename all files in the output folder
-            for i, photo_path in enumerate(self.face_clusters[cluster_id], 1):
-                old_name = f"{cluster_id}_{i}{Path(photo_path).suffix}"
-                new_name = f"{new_name}_{i}{Path(photo_path).suffix}"
-                old_path = self.output_folder / old_name
-                new_path = self.output_folder / new_name
-                if old_path.exists():
-                    old_path.rename(new_path)
+        with self.lock:
+            if cluster_id in self.person_names:
+                self.person_names[cluster_id] = new_name
+                # One folder rename, not one per photo
+                self.layout.rename(cluster_id, new_name)
+                self.layout.save()
 
     def _is_image(self, path: Path) -> bool:
-        return path.suffix.lower() in ('.png', '.jpg', '.jpeg', '.bmp', '.gif') 
\ No newline at end of file
+        return path.suffix.lower() in IMAGE_EXTENSIONS 
\ No newline at end of file
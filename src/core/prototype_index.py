@@ -0,0 +1,144 @@
+import numpy as np
+from typing import Dict, List, Tuple
+
+class PrototypeIndex:
+    """
+    Contiguous matrix of per-person prototypes used to assign new faces.
+
+    Every person owns a block of 1 + max_medoids rows: the running centroid
+    followed by a few member faces close to it. Unused medoid rows repeat the
+    centroid so the block can always be scanned as a whole.
+    """
+    def __init__(self, dim: int = 128, max_medoids: int = 3):
+        self.dim = dim
+        self.max_medoids = max_medoids
+        self.block = max_medoids + 1
+        self.matrix = np.zeros((16 * self.block, dim))
+        self.owners = np.zeros(16, dtype=np.int64)  # person id of each block
+        self.count = 0  # number of blocks in use
+        self._slot: Dict[int, int] = {}  # person id -> block number
+        self._sums: Dict[int, np.ndarray] = {}
+        self._sizes: Dict[int, int] = {}
+        self._medoids: Dict[int, List[Tuple[int, np.ndarray]]] = {}  # person id -> [(face id, encoding)]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, person_id: int) -> bool:
+        return person_id in self._slot
+
+    def clear(self):
+        self.count = 0
+        self._slot.clear()
+        self._sums.clear()
+        self._sizes.clear()
+        self._medoids.clear()
+
+    def centroid(self, person_id: int) -> np.ndarray:
+        return self._sums[person_id] / self._sizes[person_id]
+
+    def nearest(self, encodings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (person ids, distances) of the closest prototype for each encoding.
+        """
+        encodings = np.atleast_2d(encodings)
+        if self.count == 0:
+            return np.full(len(encodings), -1, dtype=np.int64), np.full(len(encodings), np.inf)
+        protos = self.matrix[:self.count * self.block]
+        # |a - b|^2 = |a|^2 + |b|^2 - 2ab, evaluated for all pairs at once
+        sq = (np.einsum('ij,ij->i', encodings, encodings)[:, None]
+              + np.einsum('ij,ij->i', protos, protos)[None, :]
+              - 2.0 * encodings @ protos.T)
+        sq = np.maximum(sq, 0.0).reshape(len(encodings), self.count, self.block).min(axis=2)
+        best = sq.argmin(axis=1)
+        return self.owners[best], np.sqrt(sq[np.arange(len(encodings)), best])
+
+    def add_face(self, person_id: int, face_id: int, encoding: np.ndarray):
+        # A private float64 copy: callers may pass a view into a memory-mapped store
+        encoding = np.array(encoding, dtype=np.float64)
+        if person_id not in self._slot:
+            self._add_person(person_id)
+            self._sums[person_id] = encoding.copy()
+            self._sizes[person_id] = 1
+        else:
+            self._sums[person_id] += encoding
+            self._sizes[person_id] += 1
+        medoids = self._medoids[person_id]
+        centroid = self.centroid(person_id)
+        if len(medoids) < self.max_medoids:
+            medoids.append((face_id, encoding))
+        else:
+            # Swap out the medoid furthest from the centroid if the new face is closer
+            dists = [np.linalg.norm(enc - centroid) for _, enc in medoids]
+            worst = int(np.argmax(dists))
+            if np.linalg.norm(encoding - centroid) < dists[worst]:
+                medoids[worst] = (face_id, encoding)
+        self._write(person_id)
+
+    def remove_face(self, person_id: int, face_id: int, encoding: np.ndarray):
+        if person_id not in self._slot:
+            return
+        self._sizes[person_id] -= 1
+        if self._sizes[person_id] <= 0:
+            self.remove_person(person_id)
+            return
+        self._sums[person_id] -= encoding
+        self._medoids[person_id] = [(i, enc) for i, enc in self._medoids[person_id] if i != face_id]
+        self._write(person_id)
+
+    def remap_faces(self, remap: np.ndarray):
+        """
+        Renumber medoid face ids after a FaceStore.compact().
+        """
+        for person_id, medoids in self._medoids.items():
+            self._medoids[person_id] = [(int(remap[i]), enc) for i, enc in medoids]
+
+    def merge(self, main_id: int, other_id: int):
+        """
+        Fold other_id's prototypes into main_id and drop its block.
+        """
+        if other_id not in self._slot:
+            return
+        if main_id not in self._slot:
+            self._add_person(main_id)
+            self._sums[main_id] = np.zeros(self.dim)
+            self._sizes[main_id] = 0
+        self._sums[main_id] += self._sums[other_id]
+        self._sizes[main_id] += self._sizes[other_id]
+        centroid = self.centroid(main_id)
+        candidates = self._medoids[main_id] + self._medoids[other_id]
+        candidates.sort(key=lambda m: np.linalg.norm(m[1] - centroid))
+        self._medoids[main_id] = candidates[:self.max_medoids]
+        self.remove_person(other_id)
+        self._write(main_id)
+
+    def remove_person(self, person_id: int):
+        slot = self._slot.pop(person_id, None)
+        if slot is None:
+            return
+        del self._sums[person_id], self._sizes[person_id], self._medoids[person_id]
+        last = self.count - 1
+        if slot != last:
+            # Move the last block into the hole to keep the matrix dense
+            moved_id = int(self.owners[last])
+            self.matrix[slot * self.block:(slot + 1) * self.block] = \
+                self.matrix[last * self.block:(last + 1) * self.block]
+            self.owners[slot] = moved_id
+            self._slot[moved_id] = slot
+        self.count -= 1
+
+    def _add_person(self, person_id: int):
+        if self.count == len(self.owners):
+            self.owners = np.concatenate([self.owners, np.zeros_like(self.owners)])
+            self.matrix = np.concatenate([self.matrix, np.zeros_like(self.matrix)])
+        self._slot[person_id] = self.count
+        self.owners[self.count] = person_id
+        self._medoids[person_id] = []
+        self.count += 1
+
+    def _write(self, person_id: int):
+        start = self._slot[person_id] * self.block
+        centroid = self.centroid(person_id)
+        self.matrix[start:start + self.block] = centroid
+        for offset, (_, enc) in enumerate(self._medoids[person_id], start=1):
+            self.matrix[start + offset] = enc
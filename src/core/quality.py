@@ -0,0 +1,90 @@
+import cv2
+import numpy as np
+from dataclasses import dataclass
+from typing import List
+
+# Proxy blur score below which the UI calls a photo blurry
+BLURRY_THRESHOLD = 50.0
+# Longest edge of the gray proxy every score is measured on
+QUALITY_PROXY_EDGE = 512
+
+@dataclass
+class QualityScores:
+    blur: float  # Laplacian variance of the proxy; lower means blurrier
+    brightness: float  # mean gray level, 0-255
+    contrast: float  # gray level standard deviation; near 0 for empty frames
+
+    def is_blurry(self, threshold: float = BLURRY_THRESHOLD) -> bool:
+        return self.blur < threshold
+
+def gray_proxy(image: np.ndarray, edge: int = QUALITY_PROXY_EDGE) -> np.ndarray:
+    """
+    Grayscale copy of an RGB or gray array with its longest edge at most edge pixels.
+
+    Large images are point-sampled down to twice the target first, so the area
+    resize and color conversion only ever touch about a megapixel.
+    """
+    height, width = image.shape[:2]
+    scale = edge / max(height, width)
+    if scale < 0.5:
+        image = cv2.resize(image, (max(1, round(width * scale * 2)), max(1, round(height * scale * 2))),
+                           interpolation=cv2.INTER_NEAREST)
+    gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    if scale < 1.0:
+        gray = cv2.resize(gray, (max(1, round(width * scale)), max(1, round(height * scale))),
+                          interpolation=cv2.INTER_AREA)
+    return gray
+
+def score_image(image: np.ndarray, edge: int = QUALITY_PROXY_EDGE) -> QualityScores:
+    """
+    Blur and exposure scores of an image, measured on a fixed-size proxy so they
+    compare across resolutions.
+    """
+    gray = gray_proxy(image, edge)
+    mean, std = cv2.meanStdDev(gray)
+    return QualityScores(
+        blur=float(cv2.Laplacian(gray, cv2.CV_64F).var()),
+        brightness=float(mean[0, 0]),
+        contrast=float(std[0, 0])
+    )
+
+@dataclass
+class QualityFilter:
+    """
+    Thresholds for skipping photos before face detection. A photo is skipped
+    when any score is out of range; 0 (or 255 for max_brightness) disables a check.
+    """
+    min_blur: float = 10.0
+    min_brightness: float = 12.0
+    max_brightness: float = 245.0
+    min_contrast: float = 4.0
+    proxy_edge: int = QUALITY_PROXY_EDGE
+
+    @property
+    def signature(self) -> str:
+        """
+        Identify the thresholds that decided which photos were skipped.
+        """
+        return (f"proxy{self.proxy_edge}:blur{self.min_blur:g}:light{self.min_brightness:g}-"
+                f"{self.max_brightness:g}:contrast{self.min_contrast:g}")
+
+    def score(self, image: np.ndarray) -> QualityScores:
+        return score_image(image, self.proxy_edge)
+
+    def reasons(self, scores: QualityScores) -> List[str]:
+        """
+        Why a photo would be skipped; empty when it passes.
+        """
+        reasons = []
+        if scores.blur < self.min_blur:
+            reasons.append('blurry')
+        if scores.brightness < self.min_brightness:
+            reasons.append('dark')
+        if scores.brightness > self.max_brightness:
+            reasons.append('bright')
+        if scores.contrast < self.min_contrast:
+            reasons.append('flat')
+        return reasons
+
+    def rejects(self, scores: QualityScores) -> bool:
+        return bool(self.reasons(scores))
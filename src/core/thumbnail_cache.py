@@ -0,0 +1,81 @@
+import os
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Optional
+from PIL import Image
+from .face_detector import FaceLocation
+
+def default_thumbnail_dir() -> str:
+    return os.path.join(os.path.expanduser('~'), '.face_organizer_thumbnails')
+
+class ThumbnailCache:
+    """
+    Content-addressed face-crop thumbnails on disk, fronted by an in-memory LRU.
+
+    Keys are derived from the source photo's content hash and the face box, so
+    a thumbnail stays valid across renames and is never stale after an edit.
+    """
+    def __init__(self, cache_dir: Optional[str] = None, size: int = 64,
+                 memory_budget: int = 32 * 1024 * 1024):
+        self.cache_dir = cache_dir or default_thumbnail_dir()
+        self.size = size
+        self.memory_budget = memory_budget  # bytes of decoded RGB kept in memory
+        self.memory_used = 0
+        self.lock = threading.Lock()
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key_for(self, content_hash: str, face: FaceLocation) -> str:
+        raw = f"{content_hash}:{face.top},{face.right},{face.bottom},{face.left}:{self.size}"
+        return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + '.jpg')
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        Return the RGB thumbnail for a key, or None if it was never stored.
+        """
+        with self.lock:
+            thumb = self._lru.get(key)
+            if thumb is not None:
+                self._lru.move_to_end(key)
+                return thumb
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with Image.open(path) as img:
+            thumb = np.asarray(img.convert('RGB'))
+        self._remember(key, thumb)
+        return thumb
+
+    def put(self, key: str, thumb: np.ndarray):
+        path = self._path(key)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so a crash never leaves a truncated thumbnail behind
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            Image.fromarray(thumb).save(tmp_path, 'JPEG', quality=90)
+            os.replace(tmp_path, path)
+        self._remember(key, thumb)
+
+    def _remember(self, key: str, thumb: np.ndarray):
+        with self.lock:
+            previous = self._lru.pop(key, None)
+            if previous is not None:
+                self.memory_used -= previous.nbytes
+            self._lru[key] = thumb
+            self.memory_used += thumb.nbytes
+            while self.memory_used > self.memory_budget and len(self._lru) > 1:
+                _, evicted = self._lru.popitem(last=False)
+                self.memory_used -= evicted.nbytes
+
+    def clear_memory(self):
+        """
+        Drop the in-memory copies; the files on disk stay.
+        """
+        with self.lock:
+            self._lru.clear()
+            self.memory_used = 0
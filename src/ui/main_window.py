@@ -1,23 +1,30 @@
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QPushButton, QLabel, QFileDialog, QScrollArea,
-    QProgressBar, QMessageBox, QFrame, QDialog, QListWidget, QListWidgetItem, QCheckBox, QInputDialog,
-    QSystemTrayIcon
+    QPushButton, QLabel, QFileDialog, QListView,
+    QProgressBar, QMessageBox, QDialog, QListWidget, QListWidgetItem, QInputDialog,
+    QSystemTrayIcon, QCheckBox
 )
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QSize, QTimer
-import face_recognition
-from PyQt5.QtGui import QPixmap, QImage, QFont, QIcon
+from PyQt5.QtCore import Qt, QThread, QThreadPool, QRunnable, QObject, pyqtSignal, QSize, QTimer
+from PyQt5.QtGui import QPixmap, QImage, QIcon, QColor
 import os
-from typing import List, Dict
+import threading
+from typing import List, Dict, Optional
 from ..core.face_recognizer import FaceRecognizer, Person
-from ..core.face_detector import FaceLocation, FaceDetector
+from ..core.face_detector import FaceLocation, FaceDetector, DEFAULT_PROFILE, default_detector
 from ..core.folder_monitor import FolderMonitor
+from ..core.ingestion import IngestionService
+from ..core.face_index import FaceIndex
+from ..core.thumbnail_cache import ThumbnailCache
+from ..core.image_loader import load_reduced
+from ..core.quality import QualityFilter, QualityScores
+from ..core.metrics import metrics, MetricsWriter, UI_COMMIT
+from .people_model import PeopleModel, PeopleSortModel, PersonDelegate
 import cv2
 import numpy as np
 import shutil
 
 class ProcessingThread(QThread):
-    progress = pyqtSignal(int)
+    progress = pyqtSignal(int, int)  # (photos done, photos found so far)
     finished = pyqtSignal()
     error = pyqtSignal(str)
     
@@ -28,22 +35,65 @@ class ProcessingThread(QThread):
         
     def run(self):
         try:
-            def progress_callback(val):
-                self.progress.emit(val)
+            def progress_callback(done, found):
+                self.progress.emit(done, found)
             self.recognizer.scan_folder(self.folder_path, progress_callback=progress_callback)
-            self.progress.emit(100)
             self.finished.emit()
         except Exception as e:
             self.error.emit(str(e))
 
+def rgb_to_qimage(rgb: np.ndarray) -> QImage:
+    rgb = np.ascontiguousarray(rgb)
+    h, w, ch = rgb.shape
+    # copy() so the QImage owns its pixels once the array goes away
+    return QImage(rgb.data, w, h, ch * w, QImage.Format_RGB888).copy()
+
+class ThumbnailSignals(QObject):
+    loaded = pyqtSignal(int, QImage)
+
+class ThumbnailTask(QRunnable):
+    """
+    Decode one gallery thumbnail at reduced size on a pool thread.
+    """
+    def __init__(self, row: int, photo_path: str, size: int, signals: ThumbnailSignals,
+                 cancelled: threading.Event):
+        super().__init__()
+        self.row = row
+        self.photo_path = photo_path
+        self.size = size
+        self.signals = signals
+        self.cancelled = cancelled
+
+    def run(self):
+        if self.cancelled.is_set():
+            return
+        try:
+            image = rgb_to_qimage(load_reduced(self.photo_path, self.size))
+        except Exception:
+            image = QImage()
+        if not self.cancelled.is_set():
+            self.signals.loaded.emit(self.row, image)
+
 class PhotoGalleryDialog(QDialog):
-    def __init__(self, person: Person, parent=None):
+    THUMB_SIZE = 128
+
+    def __init__(self, person: Person, quality: Optional[Dict[str, QualityScores]] = None, parent=None):
         super().__init__(parent)
+        self.person = person
         self.setWindowTitle(f"Photos of {person.name}")
         self.setMinimumSize(600, 400)
         layout = QVBoxLayout(self)
+        # Blur scores were stored at detection time, so filtering never decodes a photo
+        quality = quality or {}
+        self.blurry = {path for path in person.photo_paths
+                       if path in quality and quality[path].is_blurry()}
+        self.hide_blurry_box = QCheckBox(f"Hide blurry photos ({len(self.blurry)})")
+        self.hide_blurry_box.setEnabled(bool(self.blurry))
+        self.hide_blurry_box.toggled.connect(self.filter_blurry)
+        layout.addWidget(self.hide_blurry_box)
         self.list_widget = QListWidget()
-        self.list_widget.setIconSize(QSize(128, 128))
+        self.list_widget.setIconSize(QSize(self.THUMB_SIZE, self.THUMB_SIZE))
+        self.list_widget.setUniformItemSizes(True)
         layout.addWidget(self.list_widget)
         self.preview_label = QLabel()
         self.preview_label.setAlignment(Qt.AlignCenter)
@@ -51,10 +101,21 @@ class PhotoGalleryDialog(QDialog):
         self.file_label = QLabel()
         self.file_label.setAlignment(Qt.AlignCenter)
         layout.addWidget(self.file_label)
-        for photo_path in person.photo_paths:
-            pixmap = QPixmap(photo_path).scaled(128, 128, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            item = QListWidgetItem(QIcon(pixmap), photo_path)
-            self.list_widget.addItem(item)
+        # Rows start with a placeholder; thumbnails stream in from the pool
+        placeholder = QPixmap(self.THUMB_SIZE, self.THUMB_SIZE)
+        placeholder.fill(QColor('#eee'))
+        placeholder_icon = QIcon(placeholder)
+        self.photo_paths = sorted(person.photo_paths)
+        for photo_path in self.photo_paths:
+            self.list_widget.addItem(QListWidgetItem(placeholder_icon, photo_path))
+        self.pending = set(range(len(self.photo_paths)))
+        self.in_flight = 0
+        self.cancelled = threading.Event()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(1, min(4, QThread.idealThreadCount() - 1)))
+        self.signals = ThumbnailSignals()
+        self.signals.loaded.connect(self.thumbnail_loaded)
+        self.list_widget.verticalScrollBar().valueChanged.connect(self.schedule_thumbnails)
         self.list_widget.currentItemChanged.connect(self.show_preview)
         if self.list_widget.count() > 0:
             self.list_widget.setCurrentRow(0)
@@ -62,11 +123,59 @@ class PhotoGalleryDialog(QDialog):
         self.export_btn = QPushButton("Export Photos")
         self.export_btn.clicked.connect(self.export_photos)
         layout.addWidget(self.export_btn)
+        QTimer.singleShot(0, self.schedule_thumbnails)
+
+    def visible_rows(self) -> range:
+        viewport = self.list_widget.viewport().rect()
+        first = self.list_widget.indexAt(viewport.topLeft())
+        last = self.list_widget.indexAt(viewport.bottomLeft())
+        start = first.row() if first.isValid() else 0
+        stop = last.row() + 1 if last.isValid() else min(len(self.photo_paths), start + 20)
+        return range(start, stop)
+
+    def schedule_thumbnails(self):
+        """
+        Keep the pool busy, always picking visible rows before off-screen ones.
+        """
+        if self.cancelled.is_set():
+            return
+        limit = self.pool.maxThreadCount() * 2  # small queue so scrolling re-prioritizes quickly
+        visible = [row for row in self.visible_rows() if row in self.pending]
+        while self.in_flight < limit and self.pending:
+            row = visible.pop(0) if visible else min(self.pending)
+            self.pending.discard(row)
+            self.in_flight += 1
+            self.pool.start(ThumbnailTask(row, self.photo_paths[row], self.THUMB_SIZE,
+                                          self.signals, self.cancelled))
+
+    def thumbnail_loaded(self, row: int, image: QImage):
+        self.in_flight -= 1
+        if not image.isNull():
+            self.list_widget.item(row).setIcon(QIcon(QPixmap.fromImage(image)))
+        self.schedule_thumbnails()
+
+    def filter_blurry(self, hide: bool):
+        for row, photo_path in enumerate(self.photo_paths):
+            self.list_widget.item(row).setHidden(hide and photo_path in self.blurry)
+        self.schedule_thumbnails()
+
+    def shown_paths(self) -> List[str]:
+        return [path for row, path in enumerate(self.photo_paths) if not self.list_widget.item(row).isHidden()]
+
+    def done(self, result):
+        # Drop queued loads; running ones see the flag and skip emitting
+        self.cancelled.set()
+        self.pool.clear()
+        super().done(result)
+
     def show_preview(self, current, previous):
         if current:
             path = current.text()
-            pixmap = QPixmap(path).scaled(400, 400, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            self.preview_label.setPixmap(pixmap)
+            try:
+                pixmap = QPixmap.fromImage(rgb_to_qimage(load_reduced(path, 400)))
+                self.preview_label.setPixmap(pixmap)
+            except Exception:
+                self.preview_label.clear()
             self.file_label.setText(path)
         else:
             self.preview_label.clear()
@@ -75,129 +184,56 @@ class PhotoGalleryDialog(QDialog):
         parent_dir = QFileDialog.getExistingDirectory(self, "Select Parent Folder for Export")
         if parent_dir:
             # Prompt for folder name
-            folder_name, ok = QInputDialog.getText(self, "Folder Name", "Enter name for the new folder:", text=self.parent().person.name)
+            folder_name, ok = QInputDialog.getText(self, "Folder Name", "Enter name for the new folder:", text=self.person.name)
             if ok and folder_name:
                 export_path = os.path.join(parent_dir, folder_name)
                 os.makedirs(export_path, exist_ok=True)
-                for photo_path in self.parent().person.photo_paths:
+                photo_paths = self.shown_paths()
+                for photo_path in photo_paths:
                     try:
                         shutil.copy(photo_path, export_path)
                     except Exception as e:
                         QMessageBox.warning(self, "Export Error", f"Failed to copy {photo_path}: {e}")
-                QMessageBox.information(self, "Export Complete", f"Exported {len(self.parent().person.photo_paths)} photos to {export_path}")
-
-class PersonCard(QFrame):
-    def __init__(self, person: Person, recognizer: FaceRecognizer, parent=None):
-        super().__init__(parent)
-        self.person = person
-        self.recognizer = recognizer
-        self.selected_checkbox = QCheckBox()
-        self.name_label = None  # Store reference to name label
-        self.setCursor(Qt.PointingHandCursor)
-        self.setup_ui()
-    def setup_ui(self):
-        self.setFrameStyle(QFrame.StyledPanel | QFrame.Raised)
-        self.setStyleSheet("""
-            QFrame {
-                background-color: white;
-                border-radius: 10px;
-                padding: 10px;
-            }
-        """)
-        layout = QHBoxLayout()
-        # Checkbox
-        layout.addWidget(self.selected_checkbox)
-        # Face thumbnail
-        thumb_label = QLabel()
-        thumb_label.setFixedSize(64, 64)
-        thumb_label.setStyleSheet("border-radius: 32px; background: #eee;")
-        face_img = self.get_face_thumbnail()
-        if face_img is not None:
-            thumb_label.setPixmap(face_img)
-        layout.addWidget(thumb_label)
-        # Info
-        info_layout = QVBoxLayout()
-        self.name_label = QLabel(self.person.name)  # Store reference
-        self.name_label.setFont(QFont("Arial", 12, QFont.Bold))
-        info_layout.addWidget(self.name_label)
-        count_label = QLabel(f"{len(self.person.photo_paths)} photos")
-        info_layout.addWidget(count_label)
-        layout.addLayout(info_layout)
-        
-        # Add rename button
-        rename_btn = QPushButton("Rename")
-        rename_btn.setStyleSheet("""
-            QPushButton {
-                background-color: #4CAF50;
-                color: white;
-                border: none;
-                padding: 4px 8px;
-                border-radius: 4px;
-                font-size: 12px;
-            }
-            QPushButton:hover {
-                background-color: #45a049;
-            }
-        """)
-        rename_btn.clicked.connect(self.rename_person)
-        layout.addWidget(rename_btn)
-        
-        self.setLayout(layout)
-    def get_face_thumbnail(self):
-        # Use the most central face in the cluster as thumbnail
-        if not self.person.face_indices:
-            return None
-        encs = self.person.face_encodings
-        if len(encs) == 1:
-            idx = 0
-        else:
-            center = np.mean(encs, axis=0)
-            dists = [np.linalg.norm(enc - center) for enc in encs]
-            idx = int(np.argmin(dists))
-        face_idx = self.person.face_indices[idx]
-        image_path, face_loc = self.recognizer.face_data[face_idx]
-        detector = FaceDetector()
-        face_img = detector.extract_face_image(image_path, face_loc)
-        if face_img is not None and face_img.size > 0:
-            rgb = cv2.cvtColor(face_img, cv2.COLOR_BGR2RGB)
-            h, w, ch = rgb.shape
-            bytes_per_line = ch * w
-            qimg = QImage(rgb.data, w, h, bytes_per_line, QImage.Format_RGB888)
-            pixmap = QPixmap.fromImage(qimg).scaled(64, 64, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            return pixmap
-        return None
-    def is_selected(self):
-        return self.selected_checkbox.isChecked()
-    def mousePressEvent(self, event):
-        if event.button() == Qt.LeftButton and not self.selected_checkbox.underMouse():
-            dlg = PhotoGalleryDialog(self.person, self)
-            dlg.exec_()
-    def rename_person(self):
-        new_name, ok = QInputDialog.getText(
-            self,
-            "Rename Person",
-            "Enter new name:",
-            text=self.person.name
-        )
-        if ok and new_name and new_name != self.person.name:
-            self.recognizer.rename_person(self.person.id, new_name)
-            self.person.name = new_name
-            # Update the name label using the stored reference
-            if self.name_label:
-                self.name_label.setText(new_name)
+                QMessageBox.information(self, "Export Complete", f"Exported {len(photo_paths)} photos to {export_path}")
 
 class MainWindow(QMainWindow):
-    new_photo_signal = pyqtSignal(str)
-    photo_deleted_signal = pyqtSignal(str)
+    photos_deleted_signal = pyqtSignal(list)
+    photos_moved_signal = pyqtSignal(list)
     
     def __init__(self):
         super().__init__()
-        self.recognizer = FaceRecognizer()
-        self.person_cards = []
+        # KWIKPIC_PROFILE picks fast, balanced (default) or accurate detection
+        detector = default_detector(os.environ.get('KWIKPIC_PROFILE', DEFAULT_PROFILE))
+        # Unusable frames (heavily blurred, black, blown out or blank) skip detection
+        quality = QualityFilter()
+        self.recognizer = FaceRecognizer(
+            detector=detector,
+            index=FaceIndex(signature=detector.signature, quality_signature=quality.signature),
+            quality=quality,
+            thumbnails=ThumbnailCache(size=64),
+            # Photos added or removed while monitoring re-cluster their neighbourhood only
+            incremental=True
+        )
+        self.people_model = PeopleModel(self.recognizer, self)
         self.folder_monitor = None
+        self.ingestion = IngestionService(self.recognizer)
+        # Detected photos are applied in capped batches so bursts can't stall the UI
+        self.ingest_timer = QTimer(self)
+        self.ingest_timer.setInterval(250)
+        self.ingest_timer.timeout.connect(self.commit_ingested)
+        # Live throughput readout; KWIKPIC_METRICS=path also writes the stats to a file
+        metrics.enable()
+        self.metrics_writer = None
+        if os.environ.get('KWIKPIC_METRICS'):
+            self.metrics_writer = MetricsWriter(metrics, os.environ['KWIKPIC_METRICS'])
+            self.metrics_writer.start()
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.setInterval(1000)
+        self.metrics_timer.timeout.connect(self.update_metrics)
         self.setup_ui()
-        self.new_photo_signal.connect(self.handle_new_photo)
-        self.photo_deleted_signal.connect(self.handle_photo_deleted)
+        self.metrics_timer.start()
+        self.photos_deleted_signal.connect(self.handle_photos_deleted)
+        self.photos_moved_signal.connect(self.handle_photos_moved)
         
     def setup_ui(self):
         self.setWindowTitle("Face Organizer")
@@ -237,17 +273,24 @@ class MainWindow(QMainWindow):
         # Status label
         self.status_label = QLabel("No folder selected")
         layout.addWidget(self.status_label)
-        
-        # People grid
-        self.scroll_area = QScrollArea()  # Store as instance variable
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        
-        self.people_widget = QWidget()
-        self.people_layout = QVBoxLayout(self.people_widget)
-        self.scroll_area.setWidget(self.people_widget)
-        
-        layout.addWidget(self.scroll_area)
+        self.metrics_label = QLabel("")
+        self.metrics_label.setStyleSheet("color: gray;")
+        layout.addWidget(self.metrics_label)
+        
+        # People list: a model/view so only visible rows are painted
+        self.people_view = QListView()
+        self.people_view.setUniformItemSizes(True)
+        self.people_view.setMouseTracking(True)
+        self.people_view.setSelectionMode(QListView.NoSelection)
+        self.people_view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.people_sort_model = PeopleSortModel(self.people_model, self)
+        self.people_view.setModel(self.people_sort_model)
+        self.person_delegate = PersonDelegate(self.people_view)
+        self.person_delegate.rename_requested.connect(self.rename_person)
+        self.person_delegate.open_requested.connect(self.open_person)
+        self.people_view.setItemDelegate(self.person_delegate)
+        
+        layout.addWidget(self.people_view)
         
         # Style
         self.setStyleSheet("""
@@ -287,7 +330,7 @@ class MainWindow(QMainWindow):
                 color: #2d3436;
                 font-size: 14px;
             }
-            QScrollArea, QListWidget {
+            QListView, QListWidget {
                 border: 1px solid #e9ecef;
                 border-radius: 5px;
                 background-color: white;
@@ -318,17 +361,29 @@ class MainWindow(QMainWindow):
         self.status_label.setText(f"Processing folder: {folder_path}")
         
         self.processing_thread = ProcessingThread(self.recognizer, folder_path)
-        self.processing_thread.progress.connect(self.progress_bar.setValue)
+        self.progress_bar.setRange(0, 0)  # busy until the first photo is found
+        self.processing_thread.progress.connect(self.scan_progress)
         self.processing_thread.finished.connect(self.processing_finished)
         self.processing_thread.error.connect(self.processing_error)
         self.processing_thread.start()
         
+    def scan_progress(self, done: int, found: int):
+        # The total keeps growing while the folder walk is still running
+        self.progress_bar.setRange(0, found)
+        self.progress_bar.setValue(done)
+        self.status_label.setText(
+            f"Processed {done} of {found} photos found so far - {len(self.recognizer.people)} people"
+        )
+        
     def processing_finished(self):
         self.progress_bar.setVisible(False)
         self.select_folder_btn.setEnabled(True)
         self.monitor_btn.setEnabled(True)
         self.update_people_grid()
-        self.status_label.setText("Processing complete. Ready to monitor for new photos.")
+        hits, misses = self.recognizer.index.counts()
+        self.status_label.setText(
+            f"Processing complete ({hits} cached, {misses} newly scanned). Ready to monitor for new photos."
+        )
         
     def processing_error(self, error_msg: str):
         QMessageBox.critical(self, "Error", f"An error occurred: {error_msg}")
@@ -339,6 +394,9 @@ class MainWindow(QMainWindow):
     def toggle_monitoring(self):
         if self.folder_monitor and self.folder_monitor.is_active():
             self.folder_monitor.stop()
+            self.ingestion.stop()
+            self.ingest_timer.stop()
+            self.commit_ingested()
             self.monitor_btn.setText("Start Monitoring")
             self.status_label.setText("Monitoring stopped.")
         else:
@@ -348,36 +406,50 @@ class MainWindow(QMainWindow):
         if not self.folder_monitor:
             self.folder_monitor = FolderMonitor(
                 self.recognizer.current_folder,
-                lambda path: self.new_photo_signal.emit(path),
-                lambda path: self.photo_deleted_signal.emit(path)
+                self.ingestion.submit,
+                lambda path: self.photos_deleted_signal.emit([path]),
+                batch_callback=self.dispatch_folder_changes
             )
+        self.ingestion.start()
+        self.ingest_timer.start()
         self.folder_monitor.start()
         self.monitor_btn.setText("Stop Monitoring")
         self.status_label.setText("Monitoring for new photos...")
         
-    def handle_new_photo(self, photo_path: str):
-        try:
-            self.recognizer.process_single_photo(photo_path)
-            self.update_people_grid()
-            self.status_label.setText(f"Processed new photo: {os.path.basename(photo_path)}")
-        except PermissionError as e:
-            error_msg = str(e)
-            self.status_label.setText(f"Permission error: {os.path.basename(photo_path)}")
-            QMessageBox.warning(
-                self,
-                "Permission Error",
-                f"Cannot access the photo due to permission restrictions.\n\n"
-                f"Please ensure the application has permission to access the file:\n{photo_path}\n\n"
-                f"Try moving the photo to a different folder or running the application as administrator."
-            )
-        except Exception as e:
-            error_msg = str(e)
-            self.status_label.setText(f"Error: {os.path.basename(photo_path)}")
-            QMessageBox.warning(
-                self,
-                "Processing Error",
-                f"Failed to process the photo:\n{photo_path}\n\nError: {error_msg}"
+    def dispatch_folder_changes(self, changed: List[str], deleted: List[str], moved: List[tuple]):
+        # Runs on the watcher's flush thread; moves go first so renamed photos aren't re-detected
+        if moved:
+            self.photos_moved_signal.emit(moved)
+        if deleted:
+            self.photos_deleted_signal.emit(deleted)
+        for path in changed:
+            self.ingestion.submit(path)
+            
+    def commit_ingested(self):
+        with metrics.timer(UI_COMMIT):
+            batch = self.ingestion.commit(max_items=200)
+        if not batch:
+            return
+        stats = self.ingestion.stats()
+        backlog = stats.queued + stats.spilled + stats.in_flight + stats.ready
+        failed = [result for result in batch if result.error is not None]
+        for result in failed:
+            print(f"Error processing {result.path}: {result.error}")
+        if failed:
+            last = failed[-1]
+            self.status_label.setText(f"Error: {os.path.basename(last.path)}: {last.error}")
+        elif backlog:
+            self.status_label.setText(
+                f"Processed {stats.committed} new photos - {backlog} waiting, {stats.lag:.1f}s behind"
             )
+        else:
+            self.status_label.setText(f"Processed new photo: {os.path.basename(batch[-1].path)}")
+
+    def update_metrics(self):
+        summary = metrics.summary()
+        self.metrics_label.setText(summary)
+        if hasattr(self, 'tray_icon') and self.tray_icon:
+            self.tray_icon.setToolTip(f"Face Organizer - {summary}")
             
     def closeEvent(self, event):
         # Minimize to tray instead of closing
@@ -397,109 +469,68 @@ class MainWindow(QMainWindow):
             super().closeEvent(event)
         
     def update_people_grid(self):
-        # Clear existing cards
-        while self.people_layout.count():
-            item = self.people_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-                
-        # Add new cards
-        self.person_cards = []
-        people_sorted = sorted(self.recognizer.get_all_people(), key=lambda p: len(p.photo_paths), reverse=True)
-        for person in people_sorted:
-            card = PersonCard(person, self.recognizer)
-            self.people_layout.addWidget(card)
-            self.person_cards.append(card)
+        # Full rebuild; incremental changes arrive through the recognizer's events
+        self.people_model.reset_people()
+        
+    def open_person(self, person_id: int):
+        person = self.recognizer.people.get(person_id)
+        if person is not None:
+            dlg = PhotoGalleryDialog(person, self.recognizer.photo_quality, self)
+            dlg.exec_()
             
-        # Add stretch to push cards to the top
-        self.people_layout.addStretch()
+    def rename_person(self, person_id: int):
+        person = self.recognizer.people.get(person_id)
+        if person is None:
+            return
+        new_name, ok = QInputDialog.getText(
+            self,
+            "Rename Person",
+            "Enter new name:",
+            text=person.name
+        )
+        if ok and new_name and new_name != person.name:
+            self.recognizer.rename_person(person_id, new_name)
         
     def merge_selected(self):
-        selected_ids = [card.person.id for card in self.person_cards if card.is_selected()]
+        selected_ids = self.people_model.checked_ids()
         if len(selected_ids) < 2:
             QMessageBox.warning(self, "Merge Error", "Select at least two people to merge.")
             return
         # Merge logic: merge all into the first selected
-        main_id = selected_ids[0]
-        for other_id in selected_ids[1:]:
-            if other_id in self.recognizer.people:
-                # Merge encodings, photos, indices
-                self.recognizer.people[main_id].face_encodings.extend(self.recognizer.people[other_id].face_encodings)
-                self.recognizer.people[main_id].photo_paths.update(self.recognizer.people[other_id].photo_paths)
-                self.recognizer.people[main_id].face_indices.extend(self.recognizer.people[other_id].face_indices)
-                del self.recognizer.people[other_id]
-        self.update_people_grid()
+        self.recognizer.merge_people(selected_ids[0], selected_ids[1:])
         QMessageBox.information(self, "Merge Complete", f"Merged {len(selected_ids)} people into one.")
         
-    def handle_photo_deleted(self, photo_path: str):
-        try:
-            # First, verify the photo exists in our data
-            has_photo = False
-            for person in self.recognizer.people.values():
-                if photo_path in person.photo_paths:
-                    has_photo = True
-                    person.photo_paths.remove(photo_path)
-            
-            if not has_photo:
-                # Photo wasn't in our data, just update UI
-                self.update_people_grid()
-                self.status_label.setText(f"Photo not found in database: {os.path.basename(photo_path)}")
-                return
-            
-            # Find indices of faces to remove
-            indices_to_remove = []
-            for i, (path, _) in enumerate(self.recognizer.face_data):
-                if path == photo_path:
-                    indices_to_remove.append(i)
-            
-            if not indices_to_remove:
-                # No faces to remove, just update UI
-                self.update_people_grid()
-                self.status_label.setText(f"Removed photo: {os.path.basename(photo_path)}")
-                return
-            
-            # Create a mapping of old indices to new indices
-            index_mapping = {}
-            current_new_index = 0
-            for i in range(len(self.recognizer.face_data)):
-                if i not in indices_to_remove:
-                    index_mapping[i] = current_new_index
-                    current_new_index += 1
-            
-            # Remove face data in reverse order
-            for i in sorted(indices_to_remove, reverse=True):
-                if i < len(self.recognizer.face_data):
-                    del self.recognizer.face_data[i]
-                if i < len(self.recognizer.face_encodings):
-                    del self.recognizer.face_encodings[i]
-            
-            # Update face indices in people using the mapping
-            for person in self.recognizer.people.values():
-                new_indices = []
-                for old_idx in person.face_indices:
-                    if old_idx not in indices_to_remove and old_idx in index_mapping:
-                        new_indices.append(index_mapping[old_idx])
-                person.face_indices = new_indices
-            
-            # Remove people with no photos
-            people_to_remove = []
-            for person_id, person in self.recognizer.people.items():
-                if not person.photo_paths:
-                    people_to_remove.append(person_id)
-            
-            for person_id in people_to_remove:
-                del self.recognizer.people[person_id]
-            
-            # Update the UI
-            self.update_people_grid()
-            self.status_label.setText(f"Removed photo: {os.path.basename(photo_path)}")
-            
-        except Exception as e:
-            # Log the error but don't show error message since the photo was actually removed
-            print(f"Error during cleanup after photo removal: {str(e)}")
-            # Still update the UI to reflect the changes
-            self.update_people_grid()
-            self.status_label.setText(f"Removed photo: {os.path.basename(photo_path)}")
+    def handle_photos_moved(self, moves: List[tuple]):
+        followed = 0
+        for old_path, new_path, is_directory in moves:
+            if is_directory:
+                followed += self.recognizer.move_folder(old_path, new_path)
+            elif self.recognizer.move_photo(old_path, new_path):
+                followed += 1
+            else:
+                # Not known under either name; the index still knows its bytes if we've seen them
+                self.ingestion.submit(new_path)
+        if followed:
+            self.status_label.setText(f"Followed {followed} moved photos")
+    
+    def handle_photos_deleted(self, photo_paths: List[str]):
+        removed = 0
+        for photo_path in photo_paths:
+            try:
+                if self.recognizer.remove_photo(photo_path):
+                    removed += 1
+            except Exception as e:
+                # Log the error but don't show error message since the photo was actually removed
+                print(f"Error during cleanup after removing {photo_path}: {str(e)}")
+        if len(photo_paths) == 1:
+            name = os.path.basename(photo_paths[0])
+            if removed:
+                self.status_label.setText(f"Removed photo: {name}")
+            else:
+                # Photo wasn't in our data, nothing to redraw
+                self.status_label.setText(f"Photo not found in database: {name}")
+        else:
+            self.status_label.setText(f"Removed {removed} of {len(photo_paths)} deleted photos")
     
     def search_face(self):
         """Capture user's face from webcam and find matching clusters"""
@@ -558,8 +589,9 @@ class MainWindow(QMainWindow):
                 # Convert to RGB for face_recognition
                 rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
                 
-                # Detect faces
-                face_locations = face_recognition.face_locations(rgb_frame)
+                # Detect and encode with the library's profile so the encodings are comparable
+                detector = self.recognizer.detector
+                face_locations = detector.find_faces(rgb_frame)
                 if not face_locations:
                     QMessageBox.warning(
                         dialog,
@@ -569,7 +601,7 @@ class MainWindow(QMainWindow):
                     return
                     
                 # Get face encodings
-                face_encodings = face_recognition.face_encodings(rgb_frame, face_locations)
+                face_encodings = detector.encode_faces(rgb_frame, face_locations)
                 if face_encodings:
                     captured_encoding[0] = face_encodings[0]
                     dialog.accept()
@@ -597,16 +629,11 @@ class MainWindow(QMainWindow):
 
     def find_matching_people(self, face_encoding):
         """Find people matching the given face encoding"""
-        matches = []
-        
-        # Compare with all people
-        for person_id, person in self.recognizer.people.items():
-            # Compare with all faces in the cluster
-            for enc in person.face_encodings:
-                distance = np.linalg.norm(face_encoding - enc)
-                if distance < self.recognizer.similarity_threshold:
-                    matches.append((person, distance))
-                    break
+        matches = [
+            (self.recognizer.people[r.person_id], r.distance)
+            for r in self.recognizer.search(face_encoding)[0]
+            if r.person_id in self.recognizer.people
+        ]
         
         if not matches:
             QMessageBox.information(
@@ -617,9 +644,6 @@ class MainWindow(QMainWindow):
             self.status_label.setText("No matching faces found.")
             return
         
-        # Sort matches by distance (closest first)
-        matches.sort(key=lambda x: x[1])
-        
         # Highlight matching people in the UI
         self.highlight_matching_people([p for p, _ in matches])
         
@@ -629,29 +653,9 @@ class MainWindow(QMainWindow):
 
     def highlight_matching_people(self, matching_people):
         """Highlight the matching people in the UI"""
-        # Clear all selections first
-        for card in self.person_cards:
-            card.selected_checkbox.setChecked(False)
-            card.setStyleSheet("""
-                QFrame {
-                    background-color: white;
-                    border-radius: 10px;
-                    padding: 10px;
-                }
-            """)
-        
-        # Highlight matching people
-        for card in self.person_cards:
-            if card.person in matching_people:
-                card.setStyleSheet("""
-                    QFrame {
-                        background-color: #e3f2fd;
-                        border: 2px solid #2196F3;
-                        border-radius: 10px;
-                        padding: 10px;
-                    }
-                """)
-                # Scroll to the first match
-                if card.person == matching_people[0]:
-                    self.people_layout.update()
-                    self.scroll_area.ensureWidgetVisible(card)
\ No newline at end of file
+        self.people_model.set_highlighted([p.id for p in matching_people])
+        # Scroll to the first match
+        row = self.people_model.rows.get(matching_people[0].id)
+        if row is not None:
+            index = self.people_sort_model.mapFromSource(self.people_model.index(row))
+            self.people_view.scrollTo(index)
@@ -0,0 +1,243 @@
+from PyQt5.QtWidgets import QStyledItemDelegate, QStyle
+from PyQt5.QtCore import (
+    Qt, QAbstractListModel, QModelIndex, QSortFilterProxyModel, QRect, QSize, QEvent, pyqtSignal
+)
+from PyQt5.QtGui import QPixmap, QImage, QFont, QColor, QPen, QPainter, QPainterPath
+from typing import Dict, List, Set
+import numpy as np
+from ..core.face_recognizer import (
+    FaceRecognizer, Person, PERSON_ADDED, PERSON_UPDATED, PERSON_REMOVED, PEOPLE_RESET
+)
+
+PersonIdRole = Qt.UserRole
+PhotoCountRole = Qt.UserRole + 1
+HighlightRole = Qt.UserRole + 2
+
+ROW_HEIGHT = 88
+THUMB_SIZE = 64
+
+class PeopleModel(QAbstractListModel):
+    """
+    One row per person, kept in sync with the recognizer through its change events.
+    """
+    # Recognizer events can come from worker threads; re-emitting them through
+    # a signal queues them onto the GUI thread that owns the model.
+    person_event = pyqtSignal(str, int)
+
+    def __init__(self, recognizer: FaceRecognizer, parent=None):
+        super().__init__(parent)
+        self.recognizer = recognizer
+        self.person_ids: List[int] = []
+        self.rows: Dict[int, int] = {}  # person id -> row
+        self.checked: Set[int] = set()
+        self.highlighted: Set[int] = set()
+        self.thumbnails: Dict[int, QPixmap] = {}
+        self.person_event.connect(self.apply_event)
+        recognizer.add_listener(lambda event, person_id: self.person_event.emit(event, person_id))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.person_ids)
+
+    def person_at(self, row: int) -> Person:
+        return self.recognizer.people.get(self.person_ids[row])
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        person_id = self.person_ids[index.row()]
+        person = self.recognizer.people.get(person_id)
+        if person is None:
+            return None
+        if role == Qt.DisplayRole:
+            return person.name
+        if role == Qt.DecorationRole:
+            return self.thumbnail(person)
+        if role == Qt.CheckStateRole:
+            return Qt.Checked if person_id in self.checked else Qt.Unchecked
+        if role == PersonIdRole:
+            return person_id
+        if role == PhotoCountRole:
+            return len(person.photo_paths)
+        if role == HighlightRole:
+            return person_id in self.highlighted
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.CheckStateRole or not index.isValid():
+            return False
+        person_id = self.person_ids[index.row()]
+        if value == Qt.Checked:
+            self.checked.add(person_id)
+        else:
+            self.checked.discard(person_id)
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        return True
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+
+    def thumbnail(self, person: Person):
+        # Only rows that are actually painted ever get here
+        pixmap = self.thumbnails.get(person.id)
+        if pixmap is not None or not len(person.face_indices):
+            return pixmap
+        # Use the most central face in the cluster as thumbnail
+        encs = self.recognizer.encodings_of(person.face_indices)
+        if len(encs) == 1:
+            idx = 0
+        else:
+            center = np.mean(encs, axis=0)
+            idx = int(np.argmin(np.linalg.norm(encs - center, axis=1)))
+        rgb = self.recognizer.face_thumbnail(person.face_indices[idx])
+        if rgb is None:
+            return None
+        rgb = np.ascontiguousarray(rgb)
+        h, w, ch = rgb.shape
+        qimg = QImage(rgb.data, w, h, ch * w, QImage.Format_RGB888)
+        pixmap = QPixmap.fromImage(qimg).scaled(THUMB_SIZE, THUMB_SIZE, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        self.thumbnails[person.id] = pixmap
+        return pixmap
+
+    def apply_event(self, event: str, person_id: int):
+        if event == PEOPLE_RESET:
+            self.reset_people()
+        elif event == PERSON_ADDED:
+            if person_id in self.rows or person_id not in self.recognizer.people:
+                return
+            row = len(self.person_ids)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.person_ids.append(person_id)
+            self.rows[person_id] = row
+            self.endInsertRows()
+        elif event == PERSON_UPDATED:
+            row = self.rows.get(person_id)
+            if row is None:
+                self.apply_event(PERSON_ADDED, person_id)
+                return
+            self.thumbnails.pop(person_id, None)
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+        elif event == PERSON_REMOVED:
+            row = self.rows.get(person_id)
+            if row is None:
+                return
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self.person_ids[row]
+            del self.rows[person_id]
+            for later_id in self.person_ids[row:]:
+                self.rows[later_id] -= 1
+            self.checked.discard(person_id)
+            self.highlighted.discard(person_id)
+            self.thumbnails.pop(person_id, None)
+            self.endRemoveRows()
+
+    def reset_people(self):
+        self.beginResetModel()
+        self.person_ids = list(self.recognizer.people.keys())
+        self.rows = {person_id: row for row, person_id in enumerate(self.person_ids)}
+        self.checked.clear()
+        self.highlighted.clear()
+        self.thumbnails.clear()
+        self.endResetModel()
+
+    def checked_ids(self) -> List[int]:
+        return [person_id for person_id in self.person_ids if person_id in self.checked]
+
+    def set_highlighted(self, person_ids: List[int]):
+        """
+        Highlight the given people and clear all check marks.
+        """
+        changed = self.highlighted | set(person_ids) | self.checked
+        self.highlighted = set(person_ids)
+        self.checked.clear()
+        for person_id in changed:
+            row = self.rows.get(person_id)
+            if row is not None:
+                index = self.index(row)
+                self.dataChanged.emit(index, index, [Qt.CheckStateRole, HighlightRole])
+
+class PeopleSortModel(QSortFilterProxyModel):
+    """
+    Keeps people ordered by photo count, most photographed first.
+    """
+    def __init__(self, source: PeopleModel, parent=None):
+        super().__init__(parent)
+        self.setSourceModel(source)
+        self.setSortRole(PhotoCountRole)
+        self.setDynamicSortFilter(True)
+        self.sort(0, Qt.DescendingOrder)
+
+class PersonDelegate(QStyledItemDelegate):
+    """
+    Paints a person row (checkbox, face, name, photo count, rename button).
+    """
+    rename_requested = pyqtSignal(int)
+    open_requested = pyqtSignal(int)
+
+    def sizeHint(self, option, index):
+        return QSize(option.rect.width(), ROW_HEIGHT)
+
+    def _rects(self, rect: QRect):
+        card = rect.adjusted(4, 4, -4, -4)
+        checkbox = QRect(card.left() + 12, card.center().y() - 9, 18, 18)
+        thumb = QRect(checkbox.right() + 12, card.center().y() - THUMB_SIZE // 2, THUMB_SIZE, THUMB_SIZE)
+        rename = QRect(card.right() - 88, card.center().y() - 14, 76, 28)
+        text = QRect(thumb.right() + 12, card.top(), rename.left() - thumb.right() - 24, card.height())
+        return card, checkbox, thumb, rename, text
+
+    def paint(self, painter, option, index):
+        card, checkbox, thumb, rename, text = self._rects(option.rect)
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        highlighted = index.data(HighlightRole)
+        path = QPainterPath()
+        path.addRoundedRect(card.x(), card.y(), card.width(), card.height(), 10, 10)
+        painter.fillPath(path, QColor('#e3f2fd') if highlighted else QColor('white'))
+        painter.setPen(QPen(QColor('#2196F3'), 2) if highlighted else QPen(QColor('#e9ecef'), 1))
+        painter.drawPath(path)
+
+        # Checkbox
+        checked = index.data(Qt.CheckStateRole) == Qt.Checked
+        painter.setPen(QPen(QColor('#4361ee' if checked else '#bdc3c7'), 1))
+        painter.setBrush(QColor('#4361ee') if checked else QColor('white'))
+        painter.drawRoundedRect(checkbox, 3, 3)
+
+        # Face thumbnail
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor('#eee'))
+        painter.drawRoundedRect(thumb, 32, 32)
+        pixmap = index.data(Qt.DecorationRole)
+        if pixmap is not None:
+            target = QRect(0, 0, pixmap.width(), pixmap.height())
+            target.moveCenter(thumb.center())
+            painter.drawPixmap(target, pixmap)
+
+        # Name and photo count
+        painter.setPen(QColor('#2d3436'))
+        painter.setFont(QFont("Arial", 12, QFont.Bold))
+        painter.drawText(text.adjusted(0, 0, 0, -text.height() // 2), Qt.AlignLeft | Qt.AlignBottom,
+                         index.data(Qt.DisplayRole) or "")
+        painter.setFont(QFont("Arial", 10))
+        painter.drawText(text.adjusted(0, text.height() // 2 + 4, 0, 0), Qt.AlignLeft | Qt.AlignTop,
+                         f"{index.data(PhotoCountRole) or 0} photos")
+
+        # Rename button
+        painter.setBrush(QColor('#45a049' if option.state & QStyle.State_MouseOver else '#4CAF50'))
+        painter.drawRoundedRect(rename, 4, 4)
+        painter.setPen(QColor('white'))
+        painter.setFont(QFont("Arial", 9))
+        painter.drawText(rename, Qt.AlignCenter, "Rename")
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() != QEvent.MouseButtonRelease or event.button() != Qt.LeftButton:
+            return False
+        _, checkbox, _, rename, _ = self._rects(option.rect)
+        if checkbox.adjusted(-4, -4, 4, 4).contains(event.pos()):
+            state = Qt.Unchecked if index.data(Qt.CheckStateRole) == Qt.Checked else Qt.Checked
+            model.setData(index, state, Qt.CheckStateRole)
+        elif rename.contains(event.pos()):
+            self.rename_requested.emit(index.data(PersonIdRole))
+        else:
+            self.open_requested.emit(index.data(PersonIdRole))
+        return True
@@ -64,6 +64,10 @@ class TrayIcon(QSystemTrayIcon):
         if hasattr(self.main_window, 'folder_monitor') and self.main_window.folder_monitor:
             if self.main_window.folder_monitor.is_active():
                 self.main_window.folder_monitor.stop()
+        if hasattr(self.main_window, 'ingestion'):
+            self.main_window.ingestion.stop()
+        if getattr(self.main_window, 'metrics_writer', None):
+            self.main_window.metrics_writer.stop()
         
         # Then quit the application
         QApplication.quit()
\ No newline at end of file